@@ -54,7 +54,9 @@ def create_app(config_name=None):
     from app.routes.assessment import assessment_bp
     from app.routes.analytics import analytics_bp
     from app.routes.dashboard import dashboard_bp
+    from app.routes.metrics import metrics_bp
     from app.routes import terminal_ws
+    from app.routes import jobs_ws
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(generator_bp, url_prefix='/api/generator')
@@ -63,6 +65,7 @@ def create_app(config_name=None):
     app.register_blueprint(assessment_bp, url_prefix='/api/assessment')
     app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
     app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+    app.register_blueprint(metrics_bp)
     
     # Error handlers
     @app.errorhandler(404)
@@ -0,0 +1,185 @@
+"""
+ASGI front end: the whole backend on one asyncio event loop (entry point: asgi.py).
+
+/ws/terminal is served natively by TerminalGateway, so thousands of open
+terminals cost coroutines instead of threads. /ws/jobs is ported the same way.
+Every HTTP request goes to the unchanged Flask app on a thread pool, with
+streamed (SSE) responses forwarded chunk by chunk. Terminal sessions live in
+process memory, so the API that starts them and the gateway that serves them
+must be the same process; that is why this wraps Flask rather than running
+next to it.
+"""
+import asyncio
+import io
+import json
+import sys
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+from app import create_app
+from app.config import Config
+from app.middleware.auth import resolve_token_user
+from app.services.job_queue import get_job_queue
+from app.services.terminal_gateway import TerminalGateway, query_param
+
+def wsgi_environ(scope, body: bytes) -> dict:
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').lower()
+        value = raw_value.decode('latin-1')
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'content-length':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class WsgiBridge:
+    """Runs a WSGI app for ASGI HTTP requests; each call of the app and of its iterator happens on `executor`"""
+
+    def __init__(self, wsgi_app, executor: Executor):
+        self.wsgi_app = wsgi_app
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                   for name, value in headers]
+
+        loop = asyncio.get_running_loop()
+        iterable = await loop.run_in_executor(
+            self.executor, self.wsgi_app, wsgi_environ(scope, bytes(body)), start_response)
+        try:
+            await send({'type': 'http.response.start', 'status': response['status'],
+                        'headers': response['headers']})
+            iterator = iter(iterable)
+            while True:
+                # Views that stream (SSE) block between chunks, so every chunk is fetched off the loop
+                chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(iterable, 'close'):
+                await loop.run_in_executor(self.executor, iterable.close)
+
+
+class AsgiApp:
+    """Routes ASGI connections: the two WebSockets natively, everything else to Flask"""
+
+    def __init__(self, flask_app, executor: Executor, terminal_manager=None):
+        self.flask_app = flask_app
+        self.executor = executor
+        self.terminal = TerminalGateway(flask_app, executor, terminal_manager)
+        self.http = WsgiBridge(flask_app.wsgi_app, executor)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        elif scope['type'] == 'websocket':
+            if scope['path'] == '/ws/terminal':
+                await self.terminal(scope, receive, send)
+            elif scope['path'] == '/ws/jobs':
+                await self._job_socket(scope, receive, send)
+            else:
+                await receive()
+                await send({'type': 'websocket.close', 'code': 1008})
+        elif scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _job_socket(self, scope, receive, send):
+        """Same protocol as app/routes/jobs_ws.py"""
+        if (await receive())['type'] != 'websocket.connect':
+            return
+        await send({'type': 'websocket.accept'})
+        loop = asyncio.get_running_loop()
+        job, error = await loop.run_in_executor(
+            self.executor, self._find_job, query_param(scope, 'jobId'), query_param(scope, 'token'))
+        if error:
+            await send({'type': 'websocket.send', 'text': json.dumps({"error": error})})
+        else:
+            await send({'type': 'websocket.send', 'text': json.dumps(job.to_dict())})
+            # The job's worker thread wakes this coroutine; no executor thread waits on the job
+            finished = asyncio.Event()
+            on_done = lambda: loop.call_soon_threadsafe(finished.set)
+            job.add_done_callback(on_done)
+            waiter = asyncio.ensure_future(finished.wait())
+            disconnected = asyncio.ensure_future(self._wait_disconnect(receive))
+            try:
+                await asyncio.wait({waiter, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    return
+                await send({'type': 'websocket.send', 'text': json.dumps(job.to_dict())})
+            finally:
+                job.remove_done_callback(on_done)
+                waiter.cancel()
+                disconnected.cancel()
+        await send({'type': 'websocket.close', 'code': 1000})
+
+    def _find_job(self, job_id, token):
+        if not job_id:
+            return None, "Missing jobId"
+        job = get_job_queue().get(job_id)
+        if not job:
+            return None, "Job not found"
+        with self.flask_app.app_context():
+            user = resolve_token_user(token)
+            if not user or user.id != job.user_id:
+                self.flask_app.logger.warning(f"jobs.ws reject unauthorized job_id={job_id}")
+                return None, "Unauthorized"
+        return job, None
+
+    @staticmethod
+    async def _wait_disconnect(receive):
+        while (await receive())['type'] != 'websocket.disconnect':
+            pass
+
+
+def create_asgi_app(config_name=None, terminal_manager=None) -> AsgiApp:
+    executor = ThreadPoolExecutor(max_workers=Config.ASGI_WORKER_THREADS, thread_name_prefix='asgi')
+    return AsgiApp(create_app(config_name), executor, terminal_manager)
@@ -36,19 +36,62 @@ class Config:
     
     # Java Execution
     USE_DOCKER = os.getenv('USE_DOCKER', 'true').lower() == 'true'
+    JAVA_BACKEND = os.getenv('JAVA_BACKEND', '').lower()  # docker | subprocess | namespace (empty: USE_DOCKER)
+    JAVA_NAMESPACE_CGROUP = os.getenv('JAVA_NAMESPACE_CGROUP', '')
+    JAVA_NAMESPACE_HIDE = os.getenv('JAVA_NAMESPACE_HIDE', '')
     DOCKER_IMAGE = os.getenv('DOCKER_IMAGE', 'codemaster-java17:local')
+    JAVA_COMPILE_IMAGE = os.getenv('JAVA_COMPILE_IMAGE', '')  # empty: DOCKER_IMAGE
+    JAVA_RUNTIME_IMAGE = os.getenv('JAVA_RUNTIME_IMAGE', '')  # empty: DOCKER_IMAGE
     JAVA_TIMEOUT = int(os.getenv('JAVA_TIMEOUT', 10))
+    JAVA_COMPILE_TIMEOUT = int(os.getenv('JAVA_COMPILE_TIMEOUT', os.getenv('JAVA_TIMEOUT', 10)))
+    JAVA_EXECUTION_MODE = os.getenv('JAVA_EXECUTION_MODE', 'split').lower()  # split | single | crac
+    JAVA_CRAC_IMAGE = os.getenv('JAVA_CRAC_IMAGE', 'codemaster-java17-crac:local')
+    JAVA_CRAC_CHECKPOINT_DIR = os.getenv('JAVA_CRAC_CHECKPOINT_DIR', '')
+    # crac mode weakens the run containers' isolation; it only starts with this set
+    JAVA_CRAC_ALLOW_UNSAFE = os.getenv('JAVA_CRAC_ALLOW_UNSAFE', 'false').lower() == 'true'
     JAVA_MEMORY_LIMIT = os.getenv('JAVA_MEMORY_LIMIT', '128m')
     JAVA_CPU_LIMIT = float(os.getenv('JAVA_CPU_LIMIT', 0.5))
     OPENJDK_VERSION = os.getenv('OPENJDK_VERSION', '17')
     JAVAC_PATH = os.getenv('JAVAC_PATH', 'javac')
     JAVA_PATH = os.getenv('JAVA_PATH', 'java')
     MAX_CODE_LENGTH = int(os.getenv('MAX_CODE_LENGTH', 20000))
+    JAVA_WARM_POOL_SIZE = int(os.getenv('JAVA_WARM_POOL_SIZE', 0))
+    JAVA_POOL_MAX_USES = int(os.getenv('JAVA_POOL_MAX_USES', 50))
+    JAVA_POOL_WORKSPACE_SIZE = os.getenv('JAVA_POOL_WORKSPACE_SIZE', '64m')
+    JAVA_CLASS_CACHE_BYTES = int(os.getenv('JAVA_CLASS_CACHE_BYTES', 64 * 1024 * 1024))
+    JAVA_CHECK_CONCURRENCY = int(os.getenv('JAVA_CHECK_CONCURRENCY', 2))
+    JAVA_DIAGNOSTICS_CACHE_SIZE = int(os.getenv('JAVA_DIAGNOSTICS_CACHE_SIZE', 1024))
+    JAVA_RESULT_CACHE_SIZE = int(os.getenv('JAVA_RESULT_CACHE_SIZE', 1024))
+    JAVA_RESULT_CACHE_TTL = int(os.getenv('JAVA_RESULT_CACHE_TTL', 300))
+    JAVA_COALESCE_EXECUTIONS = os.getenv('JAVA_COALESCE_EXECUTIONS', 'true').lower() == 'true'
+    JAVA_COMPILE_SERVER = os.getenv('JAVA_COMPILE_SERVER', 'false').lower() == 'true'
+    JAVA_COMPILE_SERVER_MAX_JOBS = int(os.getenv('JAVA_COMPILE_SERVER_MAX_JOBS', 500))
+    JAVA_COMPILE_SERVER_THREADS = int(os.getenv('JAVA_COMPILE_SERVER_THREADS', 4))
+    JAVA_COMPILE_SERVER_MEMORY = os.getenv('JAVA_COMPILE_SERVER_MEMORY', '512m')
     ALERT_WEBHOOK_URL = os.getenv('ALERT_WEBHOOK_URL', '')
+    JAVA_JOB_WORKERS = int(os.getenv('JAVA_JOB_WORKERS', 8))
+    JAVA_JOB_QUEUE_LIMIT = int(os.getenv('JAVA_JOB_QUEUE_LIMIT', 500))
+    JAVA_JOB_RESULT_TTL = int(os.getenv('JAVA_JOB_RESULT_TTL', 600))
+    JAVA_MAX_CONCURRENT_EXECUTIONS = int(os.getenv('JAVA_MAX_CONCURRENT_EXECUTIONS', 8))
+    JAVA_ADMISSION_QUEUE_LIMIT = int(os.getenv('JAVA_ADMISSION_QUEUE_LIMIT', 64))
+    JAVA_ADMISSION_QUEUE_TIMEOUT = float(os.getenv('JAVA_ADMISSION_QUEUE_TIMEOUT', 30))
+    JAVA_BATCH_MAX_ITEMS = int(os.getenv('JAVA_BATCH_MAX_ITEMS', 200))
+    JAVA_OUTPUT_LIMIT = int(os.getenv('JAVA_OUTPUT_LIMIT', 1048576))
+    JAVA_TEST_CASE_TIMEOUT = float(os.getenv('JAVA_TEST_CASE_TIMEOUT', 2))
+    JAVA_TEST_CASES_MAX = int(os.getenv('JAVA_TEST_CASES_MAX', 50))
+    JAVA_WORKSPACE = os.getenv('JAVA_WORKSPACE', 'host').lower()  # host | tmpfs | container
+    JAVA_WORKSPACE_TMPFS_DIR = os.getenv('JAVA_WORKSPACE_TMPFS_DIR', '/dev/shm/codemaster')
+    JAVA_WORKSPACE_QUOTA = os.getenv('JAVA_WORKSPACE_QUOTA', '64m')
+    JAVA_JVM_PROFILE = os.getenv('JAVA_JVM_PROFILE', 'default').lower()  # default | fast-start
+    JAVA_CDS_ARCHIVE = os.getenv('JAVA_CDS_ARCHIVE', '')
     TERMINAL_IDLE_TIMEOUT = int(os.getenv('TERMINAL_IDLE_TIMEOUT', 300))
     TERMINAL_MAX_RUNTIME = int(os.getenv('TERMINAL_MAX_RUNTIME', 300))
     TERMINAL_OUTPUT_LIMIT = int(os.getenv('TERMINAL_OUTPUT_LIMIT', 200000))
+    TERMINAL_BUFFER_SIZE = int(os.getenv('TERMINAL_BUFFER_SIZE', 65536))  # bytes of output (scrollback) held per session
+    TERMINAL_RECONNECT_GRACE = int(os.getenv('TERMINAL_RECONNECT_GRACE', 60))  # seconds a disconnected session waits
     TERMINAL_REQUIRE_AUTH = os.getenv('TERMINAL_REQUIRE_AUTH', 'false').lower() == 'true'
+    ASGI_WORKER_THREADS = int(os.getenv('ASGI_WORKER_THREADS', 64))  # Flask views and blocking steps under asgi.py
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # bearer token for GET /metrics; empty = open
     
     # Google OAuth Configuration
     GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID', '')
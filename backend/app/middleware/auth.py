@@ -1,7 +1,7 @@
 """Authentication middleware and decorators"""
 from functools import wraps
 from flask import jsonify, request
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt, decode_token
 from app import db
 from app.models.user import User
 
@@ -26,6 +26,17 @@ def token_required(f):
     
     return decorated
 
+def resolve_token_user(token):
+    """Get user from a raw JWT (e.g. a WebSocket query parameter)"""
+    if not token:
+        return None
+    try:
+        identity = decode_token(token).get('sub')
+        user_id = int(identity) if isinstance(identity, str) and identity.isdigit() else identity
+        return db.session.get(User, user_id)
+    except Exception:
+        return None
+
 def get_current_user():
     """Get current user from JWT token"""
     try:
@@ -1,17 +1,146 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from app import db
 from app.models.code_submission import CodeSubmission
 from app.middleware.auth import token_required
 from app.services.java_executor import get_java_executor
 from app.services.ai_service import get_ai_service
 from app.services.terminal_sessions import get_terminal_manager
+from app.services.job_queue import get_job_queue, JobQueueFull
+from app.services.admission import get_admission_controller, AdmissionRejected
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from typing import Optional
 from app.config import Config
+import json
+import time
 import uuid
 import requests
 
 compiler_bp = Blueprint('compiler', __name__)
 
+def _validate_code_payload(data) -> Optional[str]:
+    """Return an error message if an execute-style payload is invalid"""
+    if not data:
+        return 'No data provided'
+    java_code = (data.get('code') or '').strip()
+    language = (data.get('language') or 'java').strip().lower()
+    if not java_code:
+        return 'Java code is required'
+    if language != 'java':
+        return 'Unsupported language'
+    if len(java_code) > Config.MAX_CODE_LENGTH:
+        return 'Code exceeds maximum length'
+    stdin = data.get('stdin')
+    if stdin is not None and (not isinstance(stdin, str) or len(stdin) > Config.MAX_CODE_LENGTH):
+        return 'Input must be text within the maximum length'
+    return None
+
+def _run_execution(user_id, java_code, request_id, stdin=None):
+    """Compile and run code, attach AI suggestions and store the submission; returns the response body"""
+    # Execute Java code; a slot from the admission controller is taken only if it actually runs
+    executor = get_java_executor()
+    controller = get_admission_controller()
+    result = executor.compile_and_execute(java_code, stdin=stdin, admit=lambda: controller.admit(user_id))
+    queue_wait_time = result.get("queue_wait_time", 0.0)
+    
+    # Get AI suggestions if there are errors
+    ai_suggestions = None
+    improvements = None
+    
+    if not result["success"] and result.get("errors"):
+        # Get AI fix suggestions for first error
+        first_error = result["errors"][0]
+        ai_service = get_ai_service()
+        
+        try:
+            ai_suggestions = ai_service.suggest_error_fix(
+                error_message=first_error["message"],
+                code_context=java_code,
+                error_type=first_error.get("type", "compilation_error")
+            )
+            
+            # Add AI suggestions to error object
+            first_error["ai_fix_suggestion"] = ai_suggestions.get("fix_suggestion", "")
+            first_error["corrected_code"] = ai_suggestions.get("corrected_code", "")
+            first_error["explanation"] = ai_suggestions.get("explanation", "")
+        except Exception as e:
+            # AI service failed, continue without suggestions
+            current_app.logger.warning(f'compiler.ai_suggestion request_id={request_id} error={e}')
+    
+    # Get code improvements (always try to improve)
+    try:
+        ai_service = get_ai_service()
+        improvements = ai_service.improve_code(java_code)
+    except Exception as e:
+        current_app.logger.warning(f'compiler.ai_improve request_id={request_id} error={e}')
+        improvements = []
+    
+    # Save submission to database
+    submission = _submission_from_result(user_id, java_code, stdin, result)
+    db.session.add(submission)
+    db.session.commit()
+    
+    # Build response
+    response = {
+        "success": result["success"],
+        "output": result.get("output", ""),
+        "errors": result.get("errors", []),
+        "improvements": improvements or [],
+        "execution_time": result.get("execution_time", 0),
+        "compilation_time": result.get("compilation_time", 0),
+        "compilation_cached": result.get("compilation_cached", False),
+        "result_cached": result.get("result_cached", False),
+        "coalesced": result.get("coalesced", False),
+        "truncated": result.get("truncated", False),
+        "output_bytes": result.get("output_bytes", 0),
+        "queue_wait_time": queue_wait_time,
+        "submission_id": submission.id,
+        "request_id": request_id
+    }
+    current_app.logger.info(f'compiler.execute done request_id={request_id} success={result["success"]}')
+    return response
+
+def _submission_from_result(user_id, java_code, stdin, result) -> CodeSubmission:
+    return CodeSubmission(
+        user_id=user_id,
+        code=java_code,
+        language='java',
+        input_data=stdin,
+        output=result.get("output", ""),
+        status='success' if result["success"] else 'error',
+        execution_time=result.get("execution_time", 0),
+        compilation_time=result.get("compilation_time", 0)
+    )
+
+def _admitted_execution(user_id, java_code, stdin):
+    """Batch worker: run one item through admission control without AI or DB work"""
+    controller = get_admission_controller()
+    try:
+        result = get_java_executor().compile_and_execute(
+            java_code, stdin=stdin, admit=lambda: controller.admit(user_id))
+    except AdmissionRejected as e:
+        result = {
+            "success": False,
+            "output": "",
+            "errors": [{"type": "system_error", "line": 0, "column": 0, "message": f"Not admitted: {e}"}],
+            "execution_time": 0,
+            "compilation_time": 0,
+            "queue_wait_time": 0
+        }
+    return result
+
+def _execution_job(app, user_id, java_code, request_id, stdin=None):
+    """Job queue entry point: run an execution inside its own app context"""
+    with app.app_context():
+        try:
+            return _run_execution(user_id, java_code, request_id, stdin)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f'compiler.job error request_id={request_id} error={e}')
+            raise
+        finally:
+            db.session.remove()
+
 @compiler_bp.route('/execute', methods=['POST'])
 @token_required
 def execute_code(current_user):
@@ -20,94 +149,26 @@ def execute_code(current_user):
     try:
         data = request.get_json()
         
-        if not data:
-            response = jsonify({'error': 'No data provided', 'request_id': request_id})
+        validation_error = _validate_code_payload(data)
+        if validation_error:
+            response = jsonify({'error': validation_error, 'request_id': request_id})
             response.headers['X-Request-Id'] = request_id
             return response, 400
         
         java_code = data.get('code', '').strip()
-        language = (data.get('language') or 'java').strip().lower()
-        
-        if not java_code:
-            response = jsonify({'error': 'Java code is required', 'request_id': request_id})
-            response.headers['X-Request-Id'] = request_id
-            return response, 400
-        if language != 'java':
-            response = jsonify({'error': 'Unsupported language', 'request_id': request_id})
-            response.headers['X-Request-Id'] = request_id
-            return response, 400
-        if len(java_code) > Config.MAX_CODE_LENGTH:
-            response = jsonify({'error': 'Code exceeds maximum length', 'request_id': request_id})
-            response.headers['X-Request-Id'] = request_id
-            return response, 400
-        
         current_app.logger.info(f'compiler.execute request_id={request_id} user_id={current_user.id} code_length={len(java_code)}')
         
-        # Execute Java code
-        executor = get_java_executor()
-        result = executor.compile_and_execute(java_code)
-        
-        # Get AI suggestions if there are errors
-        ai_suggestions = None
-        improvements = None
-        
-        if not result["success"] and result.get("errors"):
-            # Get AI fix suggestions for first error
-            first_error = result["errors"][0]
-            ai_service = get_ai_service()
-            
-            try:
-                ai_suggestions = ai_service.suggest_error_fix(
-                    error_message=first_error["message"],
-                    code_context=java_code,
-                    error_type=first_error.get("type", "compilation_error")
-                )
-                
-                # Add AI suggestions to error object
-                first_error["ai_fix_suggestion"] = ai_suggestions.get("fix_suggestion", "")
-                first_error["corrected_code"] = ai_suggestions.get("corrected_code", "")
-                first_error["explanation"] = ai_suggestions.get("explanation", "")
-            except Exception as e:
-                # AI service failed, continue without suggestions
-                current_app.logger.warning(f'compiler.ai_suggestion request_id={request_id} error={e}')
-        
-        # Get code improvements (always try to improve)
-        try:
-            ai_service = get_ai_service()
-            improvements = ai_service.improve_code(java_code)
-        except Exception as e:
-            current_app.logger.warning(f'compiler.ai_improve request_id={request_id} error={e}')
-            improvements = []
-        
-        # Save submission to database
-        submission = CodeSubmission(
-            user_id=current_user.id,
-            code=java_code,
-            language='java',
-            output=result.get("output", ""),
-            status='success' if result["success"] else 'error',
-            execution_time=result.get("execution_time", 0),
-            compilation_time=result.get("compilation_time", 0)
-        )
-        db.session.add(submission)
-        db.session.commit()
-        
-        # Build response
-        response = {
-            "success": result["success"],
-            "output": result.get("output", ""),
-            "errors": result.get("errors", []),
-            "improvements": improvements or [],
-            "execution_time": result.get("execution_time", 0),
-            "compilation_time": result.get("compilation_time", 0),
-            "submission_id": submission.id,
-            "request_id": request_id
-        }
-        current_app.logger.info(f'compiler.execute done request_id={request_id} success={result["success"]}')
+        response = _run_execution(current_user.id, java_code, request_id, data.get('stdin'))
         response_obj = jsonify(response)
         response_obj.headers['X-Request-Id'] = request_id
         return response_obj, 200
         
+    except AdmissionRejected as e:
+        current_app.logger.info(f'compiler.execute rejected request_id={request_id} user_id={current_user.id} reason={e}')
+        response = jsonify({'error': 'Too many executions in progress, try again shortly', 'request_id': request_id})
+        response.headers['X-Request-Id'] = request_id
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f'compiler.execute error request_id={request_id} error={e}')
@@ -124,6 +185,276 @@ def execute_code(current_user):
         response.headers['X-Request-Id'] = request_id
         return response, 500
 
+@compiler_bp.route('/execute/batch', methods=['POST'])
+@token_required
+def execute_batch(current_user):
+    """
+    Run many sources in one request, streaming NDJSON results as they finish.
+    
+    Each line is {"index", "id", "success", "output", "errors", ...}; the last
+    line is {"done": true, "submission_ids": [...]} once every row is stored.
+    """
+    request_id = request.headers.get('X-Request-Id') or str(uuid.uuid4())
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        response = jsonify({'error': 'A non-empty items list is required', 'request_id': request_id})
+        response.headers['X-Request-Id'] = request_id
+        return response, 400
+    if len(items) > Config.JAVA_BATCH_MAX_ITEMS:
+        response = jsonify({'error': f'At most {Config.JAVA_BATCH_MAX_ITEMS} items per batch', 'request_id': request_id})
+        response.headers['X-Request-Id'] = request_id
+        return response, 400
+    for index, item in enumerate(items):
+        validation_error = _validate_code_payload(item) if isinstance(item, dict) else 'Item must be an object'
+        if validation_error:
+            response = jsonify({'error': validation_error, 'index': index, 'request_id': request_id})
+            response.headers['X-Request-Id'] = request_id
+            return response, 400
+    
+    user_id = current_user.id
+    sources = [(item['code'].strip(), item.get('stdin')) for item in items]
+    current_app.logger.info(f'compiler.batch request_id={request_id} user_id={user_id} items={len(items)}')
+    
+    def generate():
+        results = [None] * len(sources)
+        # Never ask for more slots than the admission controller can grant at once
+        workers = min(len(sources), get_admission_controller().max_concurrent)
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='execution-batch')
+        try:
+            futures = {
+                pool.submit(_admitted_execution, user_id, java_code, stdin): index
+                for index, (java_code, stdin) in enumerate(sources)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # One failed item must not cut off the stream, the summary or the other rows
+                    current_app.logger.error(f'compiler.batch item error request_id={request_id} index={index} error={e}')
+                    yield json.dumps({
+                        "index": index,
+                        "id": items[index].get('id'),
+                        "success": False,
+                        "output": "",
+                        "errors": [{"type": "system_error", "line": 0, "column": 0, "message": "Execution failed"}]
+                    }) + "\n"
+                    continue
+                results[index] = result
+                yield json.dumps({
+                    "index": index,
+                    "id": items[index].get('id'),
+                    "success": result["success"],
+                    "output": result.get("output", ""),
+                    "errors": result.get("errors", []),
+                    "execution_time": result.get("execution_time", 0),
+                    "compilation_time": result.get("compilation_time", 0),
+                    "compilation_cached": result.get("compilation_cached", False),
+                    "result_cached": result.get("result_cached", False),
+                    "coalesced": result.get("coalesced", False),
+                    "truncated": result.get("truncated", False),
+                    "output_bytes": result.get("output_bytes", 0),
+                    "queue_wait_time": result.get("queue_wait_time", 0)
+                }) + "\n"
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        # One INSERT for the whole batch (SQLAlchemy batches add_all into insertmanyvalues);
+        # items that failed have no row and a null submission id
+        submissions = [
+            _submission_from_result(user_id, java_code, stdin, result) if result is not None else None
+            for (java_code, stdin), result in zip(sources, results)
+        ]
+        try:
+            db.session.add_all([submission for submission in submissions if submission is not None])
+            db.session.commit()
+            summary = {"done": True, "submission_ids": [
+                submission.id if submission is not None else None for submission in submissions
+            ]}
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'compiler.batch save error request_id={request_id} error={e}')
+            summary = {"done": True, "submission_ids": [], "error": "Failed to save submissions"}
+        summary["request_id"] = request_id
+        current_app.logger.info(f'compiler.batch done request_id={request_id} items={len(sources)}')
+        yield json.dumps(summary) + "\n"
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['X-Request-Id'] = request_id
+    return response
+
+@compiler_bp.route('/execute/stream', methods=['POST'])
+@token_required
+def execute_code_stream(current_user):
+    """
+    Compile and execute Java code, streaming output as Server-Sent Events.
+    
+    Events: `compiled`, then `output` ({"stream", "data"}) as the program
+    writes, then `result` with timings, parsed errors and the submission id.
+    """
+    request_id = request.headers.get('X-Request-Id') or str(uuid.uuid4())
+    data = request.get_json(silent=True)
+    validation_error = _validate_code_payload(data)
+    if validation_error:
+        response = jsonify({'error': validation_error, 'request_id': request_id})
+        response.headers['X-Request-Id'] = request_id
+        return response, 400
+    
+    user_id = current_user.id
+    java_code = data['code'].strip()
+    stdin = data.get('stdin')
+    controller = get_admission_controller()
+    try:
+        queue_wait_time = controller.acquire(user_id)
+    except AdmissionRejected as e:
+        response = jsonify({'error': 'Too many executions in progress, try again shortly', 'request_id': request_id})
+        response.headers['X-Request-Id'] = request_id
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    started = time.time()
+    current_app.logger.info(f'compiler.execute_stream request_id={request_id} user_id={user_id} code_length={len(java_code)}')
+    
+    def generate():
+        for event in get_java_executor().stream_execute(java_code, stdin=stdin):
+            name = event.pop("event")
+            if name == "result":
+                event["queue_wait_time"] = queue_wait_time
+                event["request_id"] = request_id
+                try:
+                    submission = _submission_from_result(user_id, java_code, stdin, event)
+                    db.session.add(submission)
+                    db.session.commit()
+                    event["submission_id"] = submission.id
+                except Exception as e:
+                    db.session.rollback()
+                    current_app.logger.error(f'compiler.execute_stream save error request_id={request_id} error={e}')
+            yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    # The slot is held until the stream is closed, including client disconnects
+    response.call_on_close(lambda: controller.release(time.time() - started))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['X-Request-Id'] = request_id
+    return response
+
+def _validate_test_cases(test_cases) -> Optional[str]:
+    """Return an error message if a test-case list is invalid"""
+    if not isinstance(test_cases, list) or not test_cases:
+        return 'A non-empty test_cases list is required'
+    if len(test_cases) > Config.JAVA_TEST_CASES_MAX:
+        return f'At most {Config.JAVA_TEST_CASES_MAX} test cases per run'
+    for case in test_cases:
+        if not isinstance(case, dict):
+            return 'Each test case must be an object'
+        for key in ('stdin', 'expected_output'):
+            value = case.get(key, '')
+            if not isinstance(value, str) or len(value) > Config.MAX_CODE_LENGTH:
+                return f'Test case {key} must be text within the maximum length'
+    return None
+
+@compiler_bp.route('/execute/tests', methods=['POST'])
+@token_required
+def execute_test_cases(current_user):
+    """
+    Run a program against a list of test cases in one JVM, streaming verdicts as Server-Sent Events.
+    
+    Body: {"code", "test_cases": [{"stdin", "expected_output"}, ...]}.
+    Events: `compiled`, then one `case` per test case in order ({"index",
+    "verdict", "output", "diff", ...}), then `result` with the pass count.
+    """
+    request_id = request.headers.get('X-Request-Id') or str(uuid.uuid4())
+    data = request.get_json(silent=True)
+    validation_error = _validate_code_payload(data) or _validate_test_cases(data.get('test_cases'))
+    if validation_error:
+        response = jsonify({'error': validation_error, 'request_id': request_id})
+        response.headers['X-Request-Id'] = request_id
+        return response, 400
+    
+    user_id = current_user.id
+    java_code = data['code'].strip()
+    test_cases = data['test_cases']
+    controller = get_admission_controller()
+    try:
+        queue_wait_time = controller.acquire(user_id)
+    except AdmissionRejected as e:
+        response = jsonify({'error': 'Too many executions in progress, try again shortly', 'request_id': request_id})
+        response.headers['X-Request-Id'] = request_id
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    started = time.time()
+    current_app.logger.info(
+        f'compiler.execute_tests request_id={request_id} user_id={user_id} cases={len(test_cases)}')
+    
+    def generate():
+        for event in get_java_executor().stream_test_cases(java_code, test_cases):
+            name = event.pop("event")
+            if name == "result":
+                event["queue_wait_time"] = queue_wait_time
+                event["request_id"] = request_id
+                current_app.logger.info(
+                    f'compiler.execute_tests done request_id={request_id} passed={event["passed"]}/{event["total"]}')
+            yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.call_on_close(lambda: controller.release(time.time() - started))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['X-Request-Id'] = request_id
+    return response
+
+@compiler_bp.route('/jobs', methods=['POST'])
+@token_required
+def submit_execution_job(current_user):
+    """Queue an execution and return its job id immediately"""
+    request_id = request.headers.get('X-Request-Id') or str(uuid.uuid4())
+    try:
+        data = request.get_json()
+        validation_error = _validate_code_payload(data)
+        if validation_error:
+            response = jsonify({'error': validation_error, 'request_id': request_id})
+            response.headers['X-Request-Id'] = request_id
+            return response, 400
+        
+        java_code = data.get('code', '').strip()
+        current_app.logger.info(f'compiler.job submit request_id={request_id} user_id={current_user.id} code_length={len(java_code)}')
+        job = get_job_queue().submit(
+            current_user.id, _execution_job,
+            current_app._get_current_object(), current_user.id, java_code, request_id, data.get('stdin')
+        )
+        ws_scheme = 'wss' if request.scheme == 'https' else 'ws'
+        response = jsonify({
+            'job_id': job.job_id,
+            'status': job.status,
+            'poll_url': f"/api/compiler/jobs/{job.job_id}",
+            'ws_url': f"{ws_scheme}://{request.host}/ws/jobs?jobId={job.job_id}",
+            'request_id': request_id
+        })
+        response.headers['X-Request-Id'] = request_id
+        return response, 202
+    except JobQueueFull:
+        response = jsonify({'error': 'Execution queue is full, try again shortly', 'request_id': request_id})
+        response.headers['X-Request-Id'] = request_id
+        response.headers['Retry-After'] = '5'
+        return response, 429
+    except Exception as e:
+        current_app.logger.error(f'compiler.job submit error request_id={request_id} error={e}')
+        response = jsonify({'error': 'Job submission failed', 'message': str(e), 'request_id': request_id})
+        response.headers['X-Request-Id'] = request_id
+        return response, 500
+
+@compiler_bp.route('/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_execution_job(current_user, job_id):
+    """Poll an execution job"""
+    job = get_job_queue().get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(job.to_dict()), 200
+
 @compiler_bp.route('/check', methods=['POST'])
 @token_required
 def check_syntax(current_user):
@@ -137,13 +468,14 @@ def check_syntax(current_user):
         
         executor = get_java_executor()
         # For syntax check, we only compile (don't execute)
-        # This is a simplified version - in production, you'd have a separate compile-only method
-        result = executor.compile_and_execute(java_code)
+        result = executor.compile_only(java_code)
         
         return jsonify({
             "is_valid": result["success"],
             "errors": result.get("errors", []),
-            "warnings": []
+            "warnings": [],
+            "compilation_time": result.get("compilation_time", 0),
+            "compilation_cached": result.get("compilation_cached", False)
         }), 200
         
     except Exception as e:
@@ -192,6 +524,7 @@ def start_terminal_session(current_user):
             'session_id': result['session_id'],
             'ws_url': ws_url,
             'compilation_time': result.get("compilation_time", 0),
+            'compilation_cached': result.get("compilation_cached", False),
             'request_id': request_id
         })
         response.headers['X-Request-Id'] = request_id
@@ -288,7 +621,7 @@ def analyze_code(current_user):
         
         # Compile to check for errors
         executor = get_java_executor()
-        result = executor.compile_and_execute(java_code)
+        result = executor.compile_only(java_code)
         
         # Get improvements
         ai_service = get_ai_service()
@@ -325,3 +658,16 @@ def get_submissions(current_user):
         
     except Exception as e:
         return jsonify({'error': 'Failed to fetch submissions', 'message': str(e)}), 500
+
+@compiler_bp.route('/stats', methods=['GET'])
+@token_required
+def executor_stats(current_user):
+    """Get executor backend, container pool and admission counters"""
+    try:
+        executor = get_java_executor()
+        stats = executor.stats()
+        stats['admission'] = get_admission_controller().stats()
+        stats['jobs'] = get_job_queue().stats()
+        return jsonify(stats), 200
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch executor stats', 'message': str(e)}), 500
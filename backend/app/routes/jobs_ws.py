@@ -0,0 +1,32 @@
+import json
+from flask import request, current_app
+from app import sock
+from app.middleware.auth import resolve_token_user
+from app.services.job_queue import get_job_queue
+
+
+@sock.route("/ws/jobs")
+def job_socket(ws):
+    """Push an execution job's status now and its result once it finishes"""
+    logger = current_app.logger
+    job_id = request.args.get("jobId")
+    if not job_id:
+        ws.send(json.dumps({"error": "Missing jobId"}))
+        return
+    job = get_job_queue().get(job_id)
+    if not job:
+        ws.send(json.dumps({"error": "Job not found"}))
+        return
+    user = resolve_token_user(request.args.get("token"))
+    if not user or user.id != job.user_id:
+        logger.warning(f"jobs.ws reject unauthorized job_id={job_id}")
+        ws.send(json.dumps({"error": "Unauthorized"}))
+        return
+
+    ws.send(json.dumps(job.to_dict()))
+    if job.finished:
+        return
+    while not job.wait(timeout=5):
+        if not ws.connected:
+            return
+    ws.send(json.dumps(job.to_dict()))
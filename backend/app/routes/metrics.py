@@ -0,0 +1,53 @@
+from flask import Blueprint, Response, request
+from app.config import Config
+from app.services import admission, java_executor, job_queue, terminal_sessions
+from app.services.metrics import REGISTRY
+
+metrics_bp = Blueprint('metrics', __name__)
+
+POOL_STATE = REGISTRY.gauge('codemaster_pool_containers', 'Warm sandbox containers by state', ['state'])
+CACHE_ENTRIES = REGISTRY.gauge('codemaster_cache_entries', 'Entries held by each executor cache', ['cache'])
+ADMISSION_STATE = REGISTRY.gauge('codemaster_admission_executions', 'Admitted and queued executions', ['state'])
+JOB_STATE = REGISTRY.gauge('codemaster_jobs', 'Background execution jobs by state', ['state'])
+TERMINAL_ACTIVE = REGISTRY.gauge('codemaster_terminal_sessions_active', 'Open terminal sessions')
+
+
+def _authorized() -> bool:
+    if not Config.METRICS_TOKEN:
+        return True
+    return request.headers.get('Authorization', '') == f'Bearer {Config.METRICS_TOKEN}'
+
+
+def _collect_service_gauges():
+    """Refresh gauges from services that are already running; a scrape never starts one"""
+    executor = java_executor._java_executor_instance
+    if executor is not None:
+        stats = executor.stats()
+        if stats['pool']:
+            for state in ('idle', 'in_use', 'creating'):
+                POOL_STATE.set(stats['pool'][state], state=state)
+        for cache in ('class_cache', 'diagnostics_cache', 'result_cache'):
+            CACHE_ENTRIES.set(stats[cache]['entries'], cache=cache)
+    controller = admission._admission_instance
+    if controller is not None:
+        stats = controller.stats()
+        ADMISSION_STATE.set(stats['running'], state='running')
+        ADMISSION_STATE.set(stats['queued_now'], state='queued')
+    jobs = job_queue._job_queue_instance
+    if jobs is not None:
+        stats = jobs.stats()
+        JOB_STATE.set(stats['pending'], state='pending')
+        JOB_STATE.set(stats['running'], state='running')
+    terminals = terminal_sessions._terminal_manager_instance
+    if terminals is not None:
+        with terminals.lock:
+            TERMINAL_ACTIVE.set(len(terminals.sessions))
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of executor and terminal metrics"""
+    if not _authorized():
+        return {'error': 'Unauthorized'}, 401
+    _collect_service_gauges()
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,151 @@
+"""Admission control in front of the Java executor"""
+import heapq
+import itertools
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.config import Config
+
+
+class AdmissionRejected(Exception):
+    """Raised when an execution cannot be admitted; `retry_after` is a hint in seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ('user_id', 'start_tag', 'granted')
+
+    def __init__(self, user_id, start_tag: float):
+        self.user_id = user_id
+        self.start_tag = start_tag
+        self.granted = False
+
+
+class AdmissionController:
+    """
+    Cap concurrent executions and share the slots fairly between users.
+
+    Waiting requests are ordered by weighted fair queuing: every request gets a
+    virtual finish tag of max(virtual time, the user's previous finish tag) +
+    1 / weight, and a free slot goes to the smallest tag. A user who submits
+    many runs at once therefore queues behind everyone else's next run
+    instead of in front of it. Requests beyond `max_queue_depth` are rejected
+    immediately, and waits longer than `queue_timeout` give up.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue_depth: int, queue_timeout: float):
+        self.logger = logging.getLogger('admission')
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue_depth = max_queue_depth
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[float, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._virtual_time = 0.0
+        self._finish_tags: Dict[object, float] = {}
+        self._avg_service_time = 1.0
+        self._stats = {'admitted': 0, 'queued': 0, 'rejected': 0, 'timed_out': 0}
+
+    @contextmanager
+    def admit(self, user_id, weight: float = 1.0) -> Iterator[float]:
+        """Hold an execution slot for the duration of the block; yields the queue wait in seconds"""
+        queue_wait_time = self.acquire(user_id, weight)
+        started = time.time()
+        try:
+            yield queue_wait_time
+        finally:
+            self.release(time.time() - started)
+
+    def acquire(self, user_id, weight: float = 1.0) -> float:
+        """Block until a slot is granted and return the time spent queued"""
+        enqueued = time.time()
+        with self._cond:
+            if not self._heap and self._running < self.max_concurrent:
+                self._virtual_time = self._next_tags(user_id, weight)[0]
+                self._running += 1
+                self._stats['admitted'] += 1
+                return 0.0
+            if len(self._heap) >= self.max_queue_depth:
+                self._stats['rejected'] += 1
+                raise AdmissionRejected(f"{len(self._heap)} executions already queued",
+                                        self._retry_after_locked())
+
+            start_tag, finish_tag = self._next_tags(user_id, weight)
+            waiter = _Waiter(user_id, start_tag)
+            entry = (finish_tag, next(self._seq), waiter)
+            heapq.heappush(self._heap, entry)
+            self._stats['queued'] += 1
+            deadline = enqueued + self.queue_timeout
+            while not waiter.granted:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self._heap.remove(entry)
+                    heapq.heapify(self._heap)
+                    self._stats['timed_out'] += 1
+                    raise AdmissionRejected(f"no execution slot within {self.queue_timeout}s",
+                                            self._retry_after_locked())
+                self._cond.wait(remaining)
+            self._stats['admitted'] += 1
+        return time.time() - enqueued
+
+    def release(self, service_time: Optional[float] = None):
+        with self._cond:
+            self._running -= 1
+            if service_time is not None:
+                self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * service_time
+            while self._heap and self._running < self.max_concurrent:
+                _, _, waiter = heapq.heappop(self._heap)
+                waiter.granted = True
+                self._virtual_time = max(self._virtual_time, waiter.start_tag)
+                self._running += 1
+            if len(self._finish_tags) > 4096:
+                # Tags at or below virtual time behave exactly like a fresh user
+                self._finish_tags = {user: tag for user, tag in self._finish_tags.items()
+                                     if tag > self._virtual_time}
+            self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'running': self._running,
+                'queued_now': len(self._heap),
+                'max_concurrent': self.max_concurrent,
+                'max_queue_depth': self.max_queue_depth,
+                'avg_service_time': round(self._avg_service_time, 3)
+            })
+        return stats
+
+    def _next_tags(self, user_id, weight: float) -> Tuple[float, float]:
+        start_tag = max(self._virtual_time, self._finish_tags.get(user_id, 0.0))
+        finish_tag = start_tag + 1.0 / max(weight, 0.01)
+        self._finish_tags[user_id] = finish_tag
+        return start_tag, finish_tag
+
+    def _retry_after_locked(self) -> int:
+        """Rough time until the current queue drains through the available slots"""
+        backlog = len(self._heap) + self._running
+        return max(1, int(round(backlog * self._avg_service_time / self.max_concurrent)))
+
+
+_admission_instance: Optional[AdmissionController] = None
+_admission_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get singleton admission controller for code execution"""
+    global _admission_instance
+    with _admission_lock:
+        if _admission_instance is None:
+            _admission_instance = AdmissionController(
+                max_concurrent=Config.JAVA_MAX_CONCURRENT_EXECUTIONS,
+                max_queue_depth=Config.JAVA_ADMISSION_QUEUE_LIMIT,
+                queue_timeout=Config.JAVA_ADMISSION_QUEUE_TIMEOUT
+            )
+    return _admission_instance
@@ -0,0 +1,144 @@
+"""Test-case runs: one JVM runs a program against many inputs (CodeMasterTestHarness.java)"""
+import difflib
+import os
+import secrets
+from typing import Dict, List, Optional, Sequence
+
+HARNESS_CLASS = 'CodeMasterTestHarness'
+HARNESS_SOURCE = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', '..', 'docker_env', 'java17', f'{HARNESS_CLASS}.java'))
+# Unified diff lines returned per wrong answer
+MAX_DIFF_LINES = 60
+# Generous bound on one frame header line (the status may name an exception class)
+FRAME_HEADER_LIMIT = 512
+
+_harness_source: Optional[str] = None
+
+
+def with_harness(java_code: str) -> str:
+    """The submission with the harness class appended; line numbers of the program are unchanged"""
+    global _harness_source
+    if _harness_source is None:
+        with open(HARNESS_SOURCE, encoding='utf-8') as f:
+            _harness_source = f.read()
+    return java_code.rstrip('\n') + '\n\n' + _harness_source
+
+
+def program_errors(errors: List[Dict], java_code: str) -> List[Dict]:
+    """Compile errors inside the submission itself, or all of them if every one is in the harness"""
+    last_line = java_code.rstrip('\n').count('\n') + 1
+    own = [error for error in errors if error.get('line', 0) <= last_line]
+    return own or errors
+
+
+def new_nonce() -> str:
+    return secrets.token_hex(8)
+
+
+def encode_cases(inputs: Sequence[str], nonce: str) -> str:
+    """Harness stdin: a header line, then each input prefixed by its UTF-8 byte length"""
+    parts = [f'{nonce} {len(inputs)}\n']
+    for text in inputs:
+        parts.append(f"{len(text.encode('utf-8'))}\n{text}")
+    return ''.join(parts)
+
+
+def harness_output_limit(case_count: int, case_output_limit: int) -> int:
+    """Most stdout bytes the harness can write: per case a header plus capped stdout and stderr"""
+    return case_count * (FRAME_HEADER_LIMIT + 2 * case_output_limit)
+
+
+class CaseFrameReader:
+    """Splits the harness's stdout into per-case frames as chunks arrive"""
+
+    def __init__(self, nonce: str):
+        self.nonce = nonce.encode('ascii')
+        self._buffer = bytearray()
+        self._header = None
+
+    def feed(self, data: bytes) -> List[Dict]:
+        self._buffer += data
+        frames = []
+        while True:
+            if self._header is None:
+                end = self._buffer.find(b'\n')
+                if end < 0:
+                    break
+                fields = bytes(self._buffer[:end]).split(b' ')
+                del self._buffer[:end + 1]
+                if len(fields) != 6 or fields[0] != self.nonce:
+                    continue  # not a frame header, e.g. bytes written straight to file descriptor 1
+                self._header = (int(fields[1]), fields[2].decode('ascii'), int(fields[3]),
+                                int(fields[4]), int(fields[5]))
+            index, status, micros, stdout_length, stderr_length = self._header
+            if len(self._buffer) < stdout_length + stderr_length:
+                break
+            frames.append({
+                "index": index,
+                "status": status,
+                "elapsed": micros / 1_000_000,
+                "stdout": bytes(self._buffer[:stdout_length]),
+                "stderr": bytes(self._buffer[stdout_length:stdout_length + stderr_length])
+            })
+            del self._buffer[:stdout_length + stderr_length]
+            self._header = None
+        return frames
+
+
+def normalize_output(text: str) -> List[str]:
+    """Lines as the judge compares them: trailing whitespace and trailing blank lines ignored"""
+    lines = [line.rstrip() for line in text.replace('\r\n', '\n').split('\n')]
+    while lines and not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def judge_case(frame: Dict, expected_output: str, time_limit: float) -> Dict:
+    """Verdict of one reported case: accepted, wrong_answer, runtime_error, timeout or output_limit"""
+    output = frame["stdout"].decode('utf-8', errors='replace')
+    stderr = frame["stderr"].decode('utf-8', errors='replace')
+    status = frame["status"]
+    message = ""
+    diff = []
+    if status == 'timeout':
+        verdict = 'timeout'
+        message = f"Test case timeout ({time_limit:g}s)"
+    elif status == 'output_limit':
+        verdict = 'output_limit'
+        message = "Output limit exceeded"
+    elif status.startswith('exception:') or (status.startswith('exit:') and status != 'exit:0'):
+        verdict = 'runtime_error'
+        message = stderr.strip() or f"Program exited with status {status.split(':', 1)[1]}"
+    else:
+        expected_lines = normalize_output(expected_output)
+        actual_lines = normalize_output(output)
+        if actual_lines == expected_lines:
+            verdict = 'accepted'
+        else:
+            verdict = 'wrong_answer'
+            diff = list(difflib.unified_diff(expected_lines, actual_lines, 'expected', 'actual', lineterm=''))
+            diff = diff[:MAX_DIFF_LINES]
+    return {
+        "index": frame["index"],
+        "verdict": verdict,
+        "passed": verdict == 'accepted',
+        "output": output,
+        "stderr": stderr,
+        "execution_time": frame["elapsed"],
+        "message": message,
+        "diff": diff
+    }
+
+
+def unreported_case(index: int, verdict: str, message: str) -> Dict:
+    """A case the harness never reported, because the run was stopped or failed first"""
+    return {
+        "index": index,
+        "verdict": verdict,
+        "passed": False,
+        "output": "",
+        "stderr": "",
+        "execution_time": 0,
+        "message": message,
+        "diff": []
+    }
@@ -0,0 +1,301 @@
+"""Client for the persistent javac compile server (docker_env/java17/CompileServer.java)"""
+import os
+import socket
+import struct
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import logging
+from typing import Dict, List, Optional
+
+
+COMPILE_SERVER_SOURCE = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', '..', 'docker_env', 'java17', 'CompileServer.java'))
+CONTAINER_SOCKET_DIR = '/run/codemaster'
+SOCKET_NAME = 'javac.sock'
+# The server answers a compile that outlives its deadline itself; the client waits this much longer
+RESPONSE_GRACE = 5.0
+
+
+class CompileServerUnavailable(Exception):
+    """The compile server could not be started or reached"""
+
+
+class _ProcessHandle:
+    """Compile server running as a host process (subprocess backend)"""
+
+    def __init__(self, java_path: str, socket_path: str, max_jobs: int, threads: int, compile_timeout: float):
+        # Source-file launch mode compiles CompileServer.java in memory on start
+        self.process = subprocess.Popen(
+            [java_path, '-XX:+UseSerialGC', COMPILE_SERVER_SOURCE, socket_path, str(max_jobs), str(threads),
+             str(compile_timeout)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def retire(self):
+        """Let the server drain its remaining jobs and reap it"""
+        threading.Thread(target=self._reap, daemon=True).start()
+
+    def _reap(self):
+        try:
+            self.process.wait(timeout=120)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+    def stop(self):
+        if self.alive():
+            self.process.kill()
+
+
+class _ContainerHandle:
+    """Compile server running in a sandbox container with the socket bind-mounted"""
+
+    def __init__(self, docker_client, image: str, socket_dir: str, max_jobs: int, threads: int,
+                 compile_timeout: float, memory_limit: str, cpu_limit: float):
+        nano_cpus = int(cpu_limit * 1_000_000_000) if cpu_limit > 0 else None
+        self.container = docker_client.containers.create(
+            image=image,
+            command=["/opt/jdk-17.0.12/bin/java", "-XX:+UseSerialGC", "-cp", "/opt/codemaster", "CompileServer",
+                     f"{CONTAINER_SOCKET_DIR}/{SOCKET_NAME}", str(max_jobs), str(threads), str(compile_timeout)],
+            volumes={socket_dir: {'bind': CONTAINER_SOCKET_DIR, 'mode': 'rw'}},
+            mem_limit=memory_limit,
+            nano_cpus=nano_cpus,
+            network_disabled=True,
+            read_only=True,
+            tmpfs={'/tmp': 'size=50m'},
+            user="0",
+            labels={'codemaster.compile-server': 'java'},
+            detach=True
+        )
+        self.container.start()
+
+    def alive(self) -> bool:
+        try:
+            self.container.reload()
+            return self.container.status == 'running'
+        except Exception:
+            return False
+
+    def retire(self):
+        threading.Thread(target=self._reap, daemon=True).start()
+
+    def _reap(self):
+        try:
+            self.container.wait(timeout=120)
+        except Exception:
+            pass
+        self.stop()
+
+    def stop(self):
+        try:
+            self.container.remove(force=True)
+        except Exception:
+            pass
+
+
+class CompileServerClient:
+    """
+    Start, recycle and talk to a long-lived compile server.
+
+    Each compilation opens its own connection, so compiles run concurrently
+    up to the server's worker threads. The client hands out at most `max_jobs`
+    connections per server generation (the server exits after that many) and
+    launches the next generation on demand. `compile` returns None whenever
+    the server cannot be used, so callers fall back to spawning javac.
+
+    A compile that times out retires its generation: javac can't be
+    interrupted, so the stuck compile would otherwise hold a server worker and
+    every later compile would queue behind it.
+    """
+
+    def __init__(self, max_jobs: int, threads: int, compile_timeout: float,
+                 java_path: str = 'java', docker_client=None, image: Optional[str] = None,
+                 memory_limit: str = '512m', cpu_limit: float = 1.0,
+                 startup_timeout: float = 20.0, retry_after: float = 30.0):
+        self.logger = logging.getLogger('compile_server')
+        self.max_jobs = max_jobs
+        self.threads = threads
+        self.compile_timeout = compile_timeout
+        self.java_path = java_path
+        self.docker_client = docker_client
+        self.image = image
+        self.memory_limit = memory_limit
+        self.cpu_limit = cpu_limit
+        self.startup_timeout = startup_timeout
+        self.retry_after = retry_after
+        self._handle = None
+        self._socket_dir: Optional[str] = None
+        self._jobs = 0
+        self._launching = False
+        self._unavailable_until = 0.0
+        self._lock = threading.Lock()
+        self._stats = {'compiles': 0, 'failures': 0, 'timeouts': 0, 'restarts': 0}
+
+    def start(self):
+        """Launch the first server generation in the background"""
+        threading.Thread(target=self._warm_up, daemon=True).start()
+
+    def compile(self, class_name: str, java_code: str) -> Optional[Dict]:
+        """
+        Compile one source file.
+
+        Returns {"success": bool, "diagnostics": str, "classes": {path: bytes},
+        "timed_out": bool} or None if the server is unavailable.
+        """
+        try:
+            socket_path = self._checkout()
+        except CompileServerUnavailable as e:
+            self.logger.debug(f"Compile server unavailable: {e}")
+            return None
+        try:
+            result = self._request(socket_path, class_name, java_code)
+        except socket.timeout:
+            # The server missed its own deadline; fall back to javac on a fresh generation
+            self.logger.warning("Compile server did not answer in time")
+            with self._lock:
+                self._stats['failures'] += 1
+                self._stats['timeouts'] += 1
+                self._jobs = self.max_jobs
+            return None
+        except (OSError, struct.error, ValueError) as e:
+            self.logger.warning(f"Compile server request failed: {e}")
+            with self._lock:
+                self._stats['failures'] += 1
+                self._jobs = self.max_jobs  # force a fresh generation on the next request
+            return None
+        with self._lock:
+            self._stats['compiles'] += 1
+            if result["timed_out"]:
+                self._stats['timeouts'] += 1
+                self._jobs = self.max_jobs  # the abandoned compile still runs in this generation
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['generation_jobs'] = self._jobs
+            stats['running'] = self._handle is not None
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            handle, self._handle = self._handle, None
+            socket_dir, self._socket_dir = self._socket_dir, None
+        if handle:
+            handle.stop()
+        if socket_dir:
+            shutil.rmtree(socket_dir, ignore_errors=True)
+
+    def _warm_up(self):
+        try:
+            self._checkout(count=False)
+        except CompileServerUnavailable as e:
+            self.logger.warning(f"Compile server did not start: {e}")
+
+    def _checkout(self, count: bool = True) -> str:
+        """Reserve one job on a running server generation and return its socket path"""
+        with self._lock:
+            if not hasattr(socket, 'AF_UNIX'):
+                raise CompileServerUnavailable('unix domain sockets are not supported here')
+            if time.time() < self._unavailable_until:
+                raise CompileServerUnavailable('waiting before retrying start-up')
+            if self._launching:
+                raise CompileServerUnavailable('compile server is starting')
+            if (self._handle is not None and self._jobs < self.max_jobs
+                    and os.path.exists(os.path.join(self._socket_dir, SOCKET_NAME))):
+                if count:
+                    self._jobs += 1
+                return os.path.join(self._socket_dir, SOCKET_NAME)
+            self._launching = True
+            retiring, self._handle = self._handle, None
+            retiring_dir, self._socket_dir = self._socket_dir, None
+
+        if retiring is not None:
+            # The old generation exits by itself once its accepted jobs are done
+            retiring.retire()
+            cleanup = threading.Timer(120, shutil.rmtree, args=(retiring_dir, True))
+            cleanup.daemon = True
+            cleanup.start()
+        try:
+            handle, socket_dir = self._launch()
+        except Exception as e:
+            with self._lock:
+                self._launching = False
+                self._unavailable_until = time.time() + self.retry_after
+            raise CompileServerUnavailable(str(e))
+        with self._lock:
+            self._launching = False
+            self._handle = handle
+            self._socket_dir = socket_dir
+            self._jobs = 1 if count else 0
+            if retiring is not None:
+                self._stats['restarts'] += 1
+        return os.path.join(socket_dir, SOCKET_NAME)
+
+    def _launch(self):
+        """Start a new server generation and wait for its socket to appear"""
+        socket_dir = tempfile.mkdtemp(prefix='codemaster-javac-')
+        socket_path = os.path.join(socket_dir, SOCKET_NAME)
+        if self.docker_client is not None:
+            # The server runs as root in its container; make the socket reachable for us
+            os.chmod(socket_dir, 0o777)
+            handle = _ContainerHandle(self.docker_client, self.image, socket_dir, self.max_jobs,
+                                      self.threads, self.compile_timeout, self.memory_limit, self.cpu_limit)
+        else:
+            handle = _ProcessHandle(self.java_path, socket_path, self.max_jobs, self.threads,
+                                    self.compile_timeout)
+
+        deadline = time.time() + self.startup_timeout
+        while time.time() < deadline:
+            if os.path.exists(socket_path):
+                return handle, socket_dir
+            if not handle.alive():
+                break
+            time.sleep(0.05)
+        handle.stop()
+        shutil.rmtree(socket_dir, ignore_errors=True)
+        raise CompileServerUnavailable('compile server did not create its socket')
+
+    def _request(self, socket_path: str, class_name: str, java_code: str) -> Dict:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.compile_timeout + RESPONSE_GRACE)
+            sock.connect(socket_path)
+            sock.sendall(_pack_string(class_name) + _pack_string(java_code))
+            status = _recv_int(sock)
+            diagnostics = _recv_string(sock)
+            classes = {}
+            for _ in range(_recv_int(sock)):
+                path = _recv_string(sock)
+                classes[path] = _recv_exact(sock, _recv_int(sock))
+        return {"success": status == 0, "diagnostics": diagnostics, "classes": classes, "timed_out": status == 2}
+
+
+def _pack_string(value: str) -> bytes:
+    data = value.encode('utf-8')
+    return struct.pack('>i', len(data)) + data
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks: List[bytes] = []
+    remaining = size
+    while remaining > 0:
+        chunk = sock.recv(min(remaining, 65536))
+        if not chunk:
+            raise ValueError('compile server closed the connection early')
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv_int(sock: socket.socket) -> int:
+    return struct.unpack('>i', _recv_exact(sock, 4))[0]
+
+
+def _recv_string(sock: socket.socket) -> str:
+    return _recv_exact(sock, _recv_int(sock)).decode('utf-8', errors='replace')
@@ -0,0 +1,212 @@
+"""Warm pool of pre-started sandbox containers for the Docker execution backend"""
+import threading
+import time
+import logging
+from typing import Dict, List
+from app.services.metrics import POOL_ACQUIRES_TOTAL
+from app.services.workspaces import (
+    SANDBOX_WORKSPACE, ContainerWorkspace, create_sandbox_container, parse_size
+)
+
+
+POOL_WORKSPACE = SANDBOX_WORKSPACE
+POOL_LABEL = 'codemaster.pool'
+
+
+class PooledContainer:
+    """A started sandbox container owned by the pool"""
+
+    def __init__(self, container, workspace_quota: int = 0):
+        self.container = container
+        self.workspace = ContainerWorkspace(container, workspace_quota)
+        self.uses = 0
+        self.created_at = time.time()
+
+    @property
+    def id(self) -> str:
+        return self.container.id
+
+
+class ContainerPool:
+    """
+    Keep a fixed number of idle, already-started sandbox containers.
+
+    Containers run an idle `sleep infinity` with a tmpfs workspace; callers
+    check one out, write sources through its `workspace` (a ContainerWorkspace),
+    `exec_run` javac/java and hand it back with `release`. Released containers get their workspace wiped
+    and stray processes killed before they are reused, and are replaced after
+    `max_uses` executions or a failed health check.
+    """
+
+    def __init__(self, docker_client, image: str, size: int, max_uses: int,
+                 memory_limit: str, cpu_limit: float, workspace_size: str = '64m'):
+        self.logger = logging.getLogger('container_pool')
+        self.docker_client = docker_client
+        self.image = image
+        self.size = size
+        self.max_uses = max_uses
+        self.memory_limit = memory_limit
+        self.cpu_limit = cpu_limit
+        self.workspace_size = workspace_size
+        self._idle: List[PooledContainer] = []
+        self._in_use = 0
+        self._creating = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'created': 0,
+            'retired': 0,
+            'create_failures': 0,
+            'health_check_failures': 0,
+            'reset_failures': 0
+        }
+
+    def start(self):
+        """Fill the pool in the background"""
+        self._replenish()
+
+    def acquire(self) -> PooledContainer:
+        """Check out a healthy container, creating one on a pool miss"""
+        while True:
+            with self._lock:
+                pooled = self._idle.pop() if self._idle else None
+                if pooled is not None:
+                    self._in_use += 1
+            if pooled is None:
+                break
+            if self._is_healthy(pooled):
+                with self._lock:
+                    self._stats['hits'] += 1
+                POOL_ACQUIRES_TOTAL.inc(result='hit')
+                self._replenish()
+                return pooled
+            with self._lock:
+                self._in_use -= 1
+                self._stats['health_check_failures'] += 1
+            self._retire(pooled)
+
+        with self._lock:
+            self._stats['misses'] += 1
+            self._in_use += 1
+        POOL_ACQUIRES_TOTAL.inc(result='miss')
+        self._replenish()
+        try:
+            return self._create()
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+            raise
+
+    def release(self, pooled: PooledContainer, healthy: bool = True):
+        """Return a container to the pool, recycling or replacing it"""
+        pooled.uses += 1
+        with self._lock:
+            self._in_use -= 1
+            keep = (healthy and not self._closed and pooled.uses < self.max_uses
+                    and len(self._idle) + self._creating < self.size)
+        if keep and self._reset(pooled):
+            with self._lock:
+                if not self._closed and len(self._idle) < self.size:
+                    self._idle.append(pooled)
+                    return
+        self._retire(pooled)
+        self._replenish()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'creating': self._creating,
+                'max_uses': self.max_uses
+            })
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._retire(pooled)
+
+    def _create(self) -> PooledContainer:
+        try:
+            container = create_sandbox_container(
+                self.docker_client, self.image, self.memory_limit, self.cpu_limit,
+                self.workspace_size, labels={POOL_LABEL: 'java'}
+            )
+        except Exception:
+            with self._lock:
+                self._stats['create_failures'] += 1
+            raise
+        with self._lock:
+            self._stats['created'] += 1
+        return PooledContainer(container, parse_size(self.workspace_size))
+
+    def _is_healthy(self, pooled: PooledContainer) -> bool:
+        try:
+            pooled.container.reload()
+            return pooled.container.status == 'running'
+        except Exception as e:
+            self.logger.warning(f"Pool health check failed for {pooled.id[:12]}: {e}")
+            return False
+
+    def _reset(self, pooled: PooledContainer) -> bool:
+        """Kill leftover user processes and wipe the workspace"""
+        try:
+            # kill -1 signals every process of the runner user except PID 1 (sleep) and itself
+            exit_code, _ = pooled.container.exec_run(
+                ['sh', '-c', f'kill -9 -1 2>/dev/null; find {POOL_WORKSPACE} /tmp -mindepth 1 -delete'],
+                user='runner'
+            )
+            if exit_code == 0:
+                pooled.workspace.reset_usage()
+                return True
+        except Exception as e:
+            self.logger.warning(f"Pool workspace reset failed for {pooled.id[:12]}: {e}")
+        with self._lock:
+            self._stats['reset_failures'] += 1
+        return False
+
+    def _retire(self, pooled: PooledContainer):
+        with self._lock:
+            self._stats['retired'] += 1
+
+        def remove():
+            try:
+                pooled.container.remove(force=True)
+            except Exception:
+                pass
+        threading.Thread(target=remove, daemon=True).start()
+
+    def _replenish(self):
+        """Start background creation of containers until the pool is full"""
+        with self._lock:
+            if self._closed:
+                return
+            missing = self.size - len(self._idle) - self._in_use - self._creating
+            if missing <= 0:
+                return
+            self._creating += missing
+
+        def fill(count: int):
+            for _ in range(count):
+                pooled = None
+                try:
+                    pooled = self._create()
+                except Exception as e:
+                    self.logger.error(f"Pool container creation failed: {e}")
+                with self._lock:
+                    self._creating -= 1
+                    if pooled is not None and not self._closed and len(self._idle) < self.size:
+                        self._idle.append(pooled)
+                        pooled = None
+                if pooled is not None:
+                    self._retire(pooled)
+        threading.Thread(target=fill, args=(missing,), daemon=True).start()
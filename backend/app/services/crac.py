@@ -0,0 +1,141 @@
+"""Experimental checkpoint/restore of a pre-booted JVM (CRaC) for program runs"""
+import os
+import shutil
+import tempfile
+import threading
+import logging
+from typing import Dict, List, Optional
+
+
+# Built into the `crac` target of docker_env/java17 from CracLauncher.java
+LAUNCHER_DIR = '/opt/codemaster/crac'
+LAUNCHER_CLASS = 'CracLauncher'
+CHECKPOINT_MOUNT = '/opt/codemaster/checkpoint'
+# Written into the workspace by the backend / by the launcher after a restore
+MAIN_CLASS_FILE = '.crac-main'
+RESTORED_FILE = '.crac-restored'
+# CRIU needs these to dump and restore a process tree inside a container
+CRAC_CAPABILITIES = ['CHECKPOINT_RESTORE', 'SYS_PTRACE']
+CRAC_SECURITY_OPT = ['seccomp=unconfined']
+# The launcher is checkpointed, and so restored, as this user; the image's setuid-root
+# criu does the privileged part, so student code never runs as root
+CRAC_USER = 'runner'
+
+
+class CheckpointUnavailable(Exception):
+    """Raised when no usable checkpoint exists and one could not be taken"""
+
+
+class CracCheckpoint:
+    """
+    A checkpoint of the launcher JVM, taken once and restored for every run.
+
+    The checkpoint is taken lazily by running CracLauncher with
+    -XX:CRaCCheckpointTo in a container that has the same limits as the run
+    containers; the image files land in `checkpoint_dir` on the host, which
+    run containers mount read-only. `invalidate` drops a checkpoint that
+    failed to restore so the next run takes a fresh one.
+
+    Both containers run as CRAC_USER. CRIU restores a process with the
+    credentials it was dumped with, so the restored launcher, and the
+    program it loads, run unprivileged.
+    """
+
+    def __init__(self, docker_client, image: str, memory_limit: str, cpu_limit: float,
+                 checkpoint_dir: Optional[str] = None, jvm_flags: Optional[List[str]] = None,
+                 timeout: int = 60):
+        self.logger = logging.getLogger('crac')
+        self.docker_client = docker_client
+        self.image = image
+        self.memory_limit = memory_limit
+        self.cpu_limit = cpu_limit
+        self.checkpoint_dir = checkpoint_dir or tempfile.mkdtemp(prefix='codemaster-crac-')
+        self.jvm_flags = jvm_flags or []
+        self.timeout = timeout
+        self._ready = False
+        self._lock = threading.Lock()
+        self._stats = {'checkpoints': 0, 'checkpoint_failures': 0, 'invalidated': 0}
+
+    def ensure(self):
+        """Take the checkpoint if there is none yet; raises CheckpointUnavailable"""
+        with self._lock:
+            if self._ready:
+                return
+            try:
+                self._checkpoint()
+            except CheckpointUnavailable:
+                self._stats['checkpoint_failures'] += 1
+                raise
+            except Exception as e:
+                self._stats['checkpoint_failures'] += 1
+                raise CheckpointUnavailable(str(e))
+            self._ready = True
+            self._stats['checkpoints'] += 1
+
+    def invalidate(self):
+        with self._lock:
+            if self._ready:
+                self._ready = False
+                self._stats['invalidated'] += 1
+
+    def restore_command(self) -> List[str]:
+        return ['/opt/jdk-17.0.12/bin/java', f'-XX:CRaCRestoreFrom={CHECKPOINT_MOUNT}']
+
+    def container_options(self) -> Dict:
+        """Extra containers.create() arguments for a restoring container"""
+        return {
+            'cap_add': CRAC_CAPABILITIES,
+            'security_opt': CRAC_SECURITY_OPT,
+            'user': CRAC_USER,
+        }
+
+    def volumes(self, code_dir: str) -> Dict:
+        return {
+            code_dir: {'bind': '/app/workspace', 'mode': 'rw'},
+            self.checkpoint_dir: {'bind': CHECKPOINT_MOUNT, 'mode': 'ro'}
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, ready=self._ready)
+
+    def _checkpoint(self):
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+        os.makedirs(self.checkpoint_dir)
+        # The launcher's workspace is left empty; it only reads it after a restore
+        workspace = tempfile.mkdtemp(prefix='codemaster-crac-ws-')
+        os.chmod(self.checkpoint_dir, 0o777)  # written by the launcher, as CRAC_USER
+        container = None
+        try:
+            nano_cpus = int(self.cpu_limit * 1_000_000_000) if self.cpu_limit > 0 else None
+            container = self.docker_client.containers.create(
+                image=self.image,
+                command=['/opt/jdk-17.0.12/bin/java', *self.jvm_flags,
+                         f'-XX:CRaCCheckpointTo={CHECKPOINT_MOUNT}', '-cp', LAUNCHER_DIR, LAUNCHER_CLASS],
+                volumes={
+                    workspace: {'bind': '/app/workspace', 'mode': 'rw'},
+                    self.checkpoint_dir: {'bind': CHECKPOINT_MOUNT, 'mode': 'rw'}
+                },
+                working_dir='/app/workspace',
+                mem_limit=self.memory_limit,
+                nano_cpus=nano_cpus,
+                network_disabled=True,
+                read_only=True,
+                tmpfs={'/tmp': 'size=50m'},
+                detach=True,
+                **self.container_options()
+            )
+            container.start()
+            # CRIU kills the JVM once the dump is written, so any exit status is expected
+            container.wait(timeout=self.timeout)
+            if not os.listdir(self.checkpoint_dir):
+                logs = container.logs(stdout=True, stderr=True).decode('utf-8', errors='replace')
+                raise CheckpointUnavailable(f"Checkpoint produced no image files: {logs.strip()[-500:]}")
+            self.logger.info(f"CRaC checkpoint written to {self.checkpoint_dir}")
+        finally:
+            if container:
+                try:
+                    container.remove(force=True)
+                except Exception:
+                    pass
+            shutil.rmtree(workspace, ignore_errors=True)
@@ -0,0 +1,230 @@
+"""In-memory caches shared by the Java executor and terminal sessions"""
+import os
+import re
+import copy
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+from app.config import Config
+from app.services.metrics import CACHE_LOOKUPS_TOTAL
+
+
+def class_cache_key(java_code: str, toolchain: str, flags: Iterable[str] = ()) -> str:
+    """Content address of a compilation: source, JDK version/toolchain and javac flags"""
+    digest = hashlib.sha256()
+    for part in (Config.OPENJDK_VERSION, toolchain, ' '.join(flags)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    digest.update(java_code.encode('utf-8'))
+    return digest.hexdigest()
+
+
+# Source patterns that make a program's output depend on more than its code: clock,
+# randomness, scheduling, input, environment, files and the network. A false positive
+# only costs a cache miss.
+_NONDETERMINISTIC_SOURCE = re.compile(
+    r'currentTimeMillis|nanoTime|java\.time|\b(?:Date|Calendar|Instant|Clock|LocalDate|LocalDateTime|LocalTime)\b'
+    r'|\bRandom\b|Math\.random|SecureRandom|ThreadLocalRandom|\bUUID\b|identityHashCode'
+    r'|\bThread\b|Runnable|Executors?\b|ExecutorService|CompletableFuture|java\.util\.concurrent'
+    r'|parallelStream|\.parallel\(|\bTimer\b|ForkJoin'
+    r'|System\.in\b|\bScanner\b|BufferedReader|InputStreamReader|\bConsole\b|System\.console'
+    r'|getenv|\bRuntime\b|ProcessBuilder|ProcessHandle|\bFiles?\b|\bPaths?\b|Socket|\bURL\b|HttpClient'
+)
+_COMMENTS = re.compile(r'//[^\n]*|/\*.*?\*/', re.DOTALL)
+
+
+def is_deterministic(java_code: str) -> bool:
+    """Cheap static scan: False when the program may behave differently between identical runs"""
+    return not _NONDETERMINISTIC_SOURCE.search(_COMMENTS.sub('', java_code))
+
+
+def result_cache_key(class_key: str, stdin: Optional[str], settings: Iterable) -> str:
+    """Key of a full execution: the compilation, program input and run limits/JVM flags"""
+    digest = hashlib.sha256(class_key.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(repr(list(settings)).encode('utf-8'))
+    digest.update(b'\0' if stdin is None else b'\1' + stdin.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def read_class_files(directory: str) -> Dict[str, bytes]:
+    """Collect compiled .class files below a directory as {relative_path: bytes}"""
+    classes = {}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith('.class'):
+                path = os.path.join(root, name)
+                with open(path, 'rb') as f:
+                    classes[os.path.relpath(path, directory).replace(os.sep, '/')] = f.read()
+    return classes
+
+
+def write_class_files(directory: str, classes: Dict[str, bytes]):
+    """Restore cached .class files into a workspace directory"""
+    for relative_path, content in classes.items():
+        path = os.path.join(directory, *relative_path.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+
+class CompiledClassCache:
+    """LRU cache of compiled class files bounded by total size in bytes"""
+
+    # Label in codemaster_cache_lookups_total
+    metric_label = 'class_cache'
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, Dict[str, bytes]]' = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: str) -> Optional[Dict[str, bytes]]:
+        with self._lock:
+            classes = self._entries.get(key)
+            if classes is None:
+                self._stats['misses'] += 1
+                CACHE_LOOKUPS_TOTAL.inc(cache=self.metric_label, result='miss')
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            CACHE_LOOKUPS_TOTAL.inc(cache=self.metric_label, result='hit')
+            return classes
+
+    def put(self, key: str, classes: Dict[str, bytes]):
+        size = sum(len(content) for content in classes.values())
+        if not classes or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = dict(classes)
+            self._sizes[key] = size
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                evicted, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(evicted)
+                self._stats['evictions'] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes
+            })
+        return stats
+
+
+class DiagnosticsCache:
+    """LRU cache of compile-only results (errors and success) by compilation key"""
+
+    # Label in codemaster_cache_lookups_total
+    metric_label = 'diagnostics_cache'
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self._stats['misses'] += 1
+                CACHE_LOOKUPS_TOTAL.inc(cache=self.metric_label, result='miss')
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            CACHE_LOOKUPS_TOTAL.inc(cache=self.metric_label, result='hit')
+            return copy.deepcopy(result)
+
+    def put(self, key: str, result: Dict):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = copy.deepcopy(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({'entries': len(self._entries), 'max_entries': self.max_entries})
+        return stats
+
+
+class ExecutionResultCache:
+    """LRU cache of complete execution results whose entries expire after `ttl` seconds"""
+
+    # Label in codemaster_cache_lookups_total
+    metric_label = 'result_cache'
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self._stats['expired'] += 1
+                entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+                CACHE_LOOKUPS_TOTAL.inc(cache=self.metric_label, result='miss')
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            CACHE_LOOKUPS_TOTAL.inc(cache=self.metric_label, result='hit')
+            return copy.deepcopy(entry[1])
+
+    def put(self, key: str, result: Dict):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({'entries': len(self._entries), 'max_entries': self.max_entries, 'ttl': self.ttl})
+        return stats
+
+
+_class_cache_instance: Optional[CompiledClassCache] = None
+_class_cache_lock = threading.Lock()
+
+
+def get_class_cache() -> CompiledClassCache:
+    """Get the process-wide compiled class cache"""
+    global _class_cache_instance
+    with _class_cache_lock:
+        if _class_cache_instance is None:
+            _class_cache_instance = CompiledClassCache(Config.JAVA_CLASS_CACHE_BYTES)
+    return _class_cache_instance
@@ -1,15 +1,58 @@
 """Java code execution service using OpenJDK (Docker or Subprocess)"""
 import os
+import queue
 import subprocess
-import tempfile
 import re
+import shlex
+import shutil
+import tempfile
 import time
+import threading
+from contextlib import nullcontext
 import docker
 import requests
-from typing import Dict, List, Optional
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional, Sequence, Tuple
 from app.config import Config
+from app.services.container_pool import ContainerPool
+from app.services.workspaces import (
+    SANDBOX_WORKSPACE, ContainerWorkspace, ContainerWorkspaceProvider, HostWorkspace,
+    HostWorkspaceProvider, WorkspaceQuotaExceeded, parse_size
+)
+from app.services.execution_cache import (
+    DiagnosticsCache, ExecutionResultCache, class_cache_key, get_class_cache, is_deterministic,
+    read_class_files, result_cache_key, write_class_files
+)
+from app.services.compile_server import CompileServerClient
+from app.services.output_capture import BoundedOutput
+from app.services.jvm_options import container_run_flags, host_run_flags
+from app.services.single_flight import SingleFlight
+from app.services.namespace_sandbox import NAMESPACE_WORKSPACE, NamespaceSandbox
+from app.services.metrics import (
+    DOCKER_CALL_SECONDS, EXECUTION_PHASE_SECONDS, EXECUTIONS_TOTAL, SUBPROCESS_CALL_SECONDS
+)
+from app.services.case_runner import (
+    HARNESS_CLASS, CaseFrameReader, encode_cases, harness_output_limit, judge_case, new_nonce, program_errors,
+    unreported_case, with_harness
+)
+from app.services.crac import MAIN_CLASS_FILE, RESTORED_FILE, CheckpointUnavailable, CracCheckpoint
 import logging
 
+# Program input is written next to the sources and redirected into the JVM
+STDIN_FILE = '.stdin'
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+def _stdin_from_file(path: str) -> str:
+    """
+    Shell prefix that opens `path` as stdin and unlinks it before the next exec,
+    so the program cannot reread its input (a test-case run's holds the harness nonce)
+    """
+    return f"exec < {path} && rm -f {path} && "
+
+
+def _docker_timer(phase: str, call: str):
+    """Time one Docker API call into codemaster_docker_call_seconds"""
+    return DOCKER_CALL_SECONDS.time(component='executor', phase=phase, call=call)
+
 def _create_docker_client() -> docker.DockerClient:
     try:
         client = docker.from_env()
@@ -23,23 +66,120 @@ class JavaExecutor:
     
     def __init__(self):
         self.logger = logging.getLogger('java_executor')
-        self.use_docker = os.getenv('USE_DOCKER', 'true').lower() == 'true'
+        # docker | subprocess | namespace; USE_DOCKER picks between the first two when unset
+        self.backend = Config.JAVA_BACKEND or (
+            'docker' if os.getenv('USE_DOCKER', 'true').lower() == 'true' else 'subprocess')
+        self.use_docker = self.backend == 'docker'
         self.timeout = int(os.getenv('JAVA_TIMEOUT', 10))
+        self.compile_timeout = Config.JAVA_COMPILE_TIMEOUT
+        self.execution_mode = Config.JAVA_EXECUTION_MODE
+        self.output_limit = Config.JAVA_OUTPUT_LIMIT
+        self.test_case_timeout = Config.JAVA_TEST_CASE_TIMEOUT
         self.memory_limit = os.getenv('JAVA_MEMORY_LIMIT', '128m')
         self.cpu_limit = float(os.getenv('JAVA_CPU_LIMIT', 0.5))
+        self.class_cache = get_class_cache()
+        self.diagnostics_cache = DiagnosticsCache(Config.JAVA_DIAGNOSTICS_CACHE_SIZE)
+        self.result_cache = ExecutionResultCache(Config.JAVA_RESULT_CACHE_SIZE, Config.JAVA_RESULT_CACHE_TTL)
+        # Identical runs submitted at the same moment share one sandbox run
+        self.single_flight = SingleFlight() if Config.JAVA_COALESCE_EXECUTIONS else None
+        # Syntax checks get their own lane so typing in the editor cannot starve /execute
+        self.check_lane = threading.BoundedSemaphore(max(Config.JAVA_CHECK_CONCURRENCY, 1))
         
         if self.use_docker:
             try:
                 self.docker_client = _create_docker_client()
                 self.docker_image = os.getenv('DOCKER_IMAGE', 'codemaster-java17:local').lower()
+                # javac may run in a full JDK image and programs in a jlink-trimmed runtime image
+                self.compile_image = (Config.JAVA_COMPILE_IMAGE or self.docker_image).lower()
+                self.runtime_image = (Config.JAVA_RUNTIME_IMAGE or self.docker_image).lower()
             except Exception as e:
                 self.logger.warning(f"Docker not available: {e}. Falling back to subprocess.")
                 self.use_docker = False
+                self.backend = 'subprocess'
+        if self.use_docker and self.split_images and self.execution_mode == 'single':
+            self.logger.warning("JAVA_EXECUTION_MODE=single needs one image with javac and java; "
+                                "compiling and running in separate containers instead")
+        
+        self.pool = None
+        if self.use_docker and Config.JAVA_WARM_POOL_SIZE > 0:
+            self.pool = ContainerPool(
+                self.docker_client,
+                image=self.runtime_image,
+                size=Config.JAVA_WARM_POOL_SIZE,
+                max_uses=Config.JAVA_POOL_MAX_USES,
+                memory_limit=self.memory_limit,
+                cpu_limit=self.cpu_limit,
+                workspace_size=Config.JAVA_POOL_WORKSPACE_SIZE
+            )
+            self.pool.start()
+        
+        # Host directories (optionally on a tmpfs mount) or fresh containers' tmpfs
+        self.workspaces = HostWorkspaceProvider(
+            Config.JAVA_WORKSPACE_TMPFS_DIR if Config.JAVA_WORKSPACE in ('tmpfs', 'container') else None,
+            parse_size(Config.JAVA_WORKSPACE_QUOTA)
+        )
+        self.sandbox_workspaces = None
+        if self.use_docker and Config.JAVA_WORKSPACE == 'container':
+            self.sandbox_workspaces = ContainerWorkspaceProvider(
+                self.docker_client, self.runtime_image, self.memory_limit, self.cpu_limit,
+                Config.JAVA_WORKSPACE_QUOTA
+            )
+        
+        # Host JDK processes confined to namespaces, cgroup v2 and rlimits
+        self.sandbox = None
+        if self.backend == 'namespace':
+            sandbox = NamespaceSandbox(
+                parse_size(self.memory_limit), self.cpu_limit,
+                cgroup_root=Config.JAVA_NAMESPACE_CGROUP or None,
+                hidden_paths=[BACKEND_DIR, self.workspaces.base_dir or tempfile.gettempdir()]
+                + [path for path in Config.JAVA_NAMESPACE_HIDE.split(',') if path],
+                visible_paths=[shutil.which(path) or path for path in (Config.JAVAC_PATH, Config.JAVA_PATH)]
+            )
+            if sandbox.available():
+                self.sandbox = sandbox
+            else:
+                self.logger.warning("User namespaces not available. Falling back to subprocess.")
+                self.backend = 'subprocess'
         
         if not self.use_docker:
             self.javac_path = os.getenv('JAVAC_PATH', 'javac')
             self.java_path = os.getenv('JAVA_PATH', 'java')
             self._verify_openjdk()
+        # Extra flags for running (not compiling) student programs, per JAVA_JVM_PROFILE
+        self.jvm_flags = container_run_flags() if self.use_docker else host_run_flags()
+        if self.sandbox:
+            self.jvm_flags += self.sandbox.jvm_memory_flags()
+        
+        # Experimental: restore a checkpointed, already booted launcher JVM for every run
+        self.crac = None
+        if self.use_docker and self.execution_mode == 'crac':
+            if not Config.JAVA_CRAC_ALLOW_UNSAFE:
+                raise RuntimeError("JAVA_EXECUTION_MODE=crac runs programs with CHECKPOINT_RESTORE and "
+                                   "SYS_PTRACE and without seccomp; set JAVA_CRAC_ALLOW_UNSAFE=true to use it")
+            self.logger.warning("JAVA_EXECUTION_MODE=crac is experimental and unsafe: run containers get "
+                                "CHECKPOINT_RESTORE, SYS_PTRACE and no seccomp profile")
+            self.crac = CracCheckpoint(
+                self.docker_client, Config.JAVA_CRAC_IMAGE.lower(), self.memory_limit, self.cpu_limit,
+                checkpoint_dir=Config.JAVA_CRAC_CHECKPOINT_DIR or None, jvm_flags=self.jvm_flags
+            )
+        
+        self.compile_server = None
+        if Config.JAVA_COMPILE_SERVER:
+            self.compile_server = CompileServerClient(
+                max_jobs=Config.JAVA_COMPILE_SERVER_MAX_JOBS,
+                threads=Config.JAVA_COMPILE_SERVER_THREADS,
+                compile_timeout=self.compile_timeout,
+                java_path=getattr(self, 'java_path', 'java'),
+                docker_client=self.docker_client if self.use_docker else None,
+                image=self.compile_image if self.use_docker else None,
+                memory_limit=Config.JAVA_COMPILE_SERVER_MEMORY
+            )
+            self.compile_server.start()
+    
+    @property
+    def split_images(self) -> bool:
+        """True when programs run in an image without javac (JAVA_RUNTIME_IMAGE)"""
+        return self.use_docker and self.compile_image != self.runtime_image
     
     def _verify_openjdk(self):
         """Verify OpenJDK installation"""
@@ -51,9 +191,10 @@ class JavaExecutor:
         except (FileNotFoundError, subprocess.CalledProcessError):
             raise Exception(f"OpenJDK not found. Install OpenJDK 17+ or use Docker.")
     
-    def compile_and_execute(self, java_code: str) -> Dict:
+    def compile_and_execute(self, java_code: str, stdin: Optional[str] = None,
+                            admit: Optional[Callable[[], ContextManager[float]]] = None) -> Dict:
         """
-        Compile and execute Java code
+        Compile and execute Java code, feeding `stdin` (if given) to the program
         
         Returns:
         {
@@ -61,13 +202,677 @@ class JavaExecutor:
             "output": str,
             "errors": List[Dict],
             "execution_time": float,
-            "compilation_time": float
+            "compilation_time": float,
+            "compilation_cached": bool,
+            "truncated": bool,  # output cut at JAVA_OUTPUT_LIMIT and the program stopped
+            "output_bytes": int,  # bytes the program wrote before it exited or was stopped
+            "result_cached": bool,  # replayed from an identical earlier run
+            "coalesced": bool,  # served by an identical run that was already in flight
+            "queue_wait_time": float  # seconds `admit` queued the run
+        }
+        
+        Results of programs that pass the `is_deterministic` scan are cached
+        by compilation, stdin and run settings; concurrent identical requests
+        are coalesced into one run whatever the program does.
+        
+        `admit` (such as AdmissionController.admit for the user) is entered
+        around the actual run only, so cache hits and coalesced followers
+        never take an execution slot.
+        """
+        result_key = None
+        if self.result_cache.enabled and is_deterministic(java_code):
+            result_key = self._result_cache_key(java_code, stdin)
+            cached = self.result_cache.get(result_key)
+            if cached is not None:
+                cached.update({"result_cached": True, "coalesced": False, "queue_wait_time": 0.0})
+                self._count_execution(cached, 'result_cache')
+                return cached
+        
+        if not self.single_flight:
+            result = self._execute_and_cache(java_code, stdin, result_key, admit)
+            result["coalesced"] = False
+        else:
+            result, shared = self.single_flight.do(
+                result_key or self._result_cache_key(java_code, stdin),
+                lambda: self._execute_and_cache(java_code, stdin, result_key, admit)
+            )
+            result["coalesced"] = shared
+        self._count_execution(result, 'coalesced' if result["coalesced"] else 'executed')
+        return result
+    
+    def _count_execution(self, result: Dict, source: str):
+        """Record a served request in codemaster_executions_total (and phase times for real runs)"""
+        errors = result.get("errors") or []
+        failed_cases = [case["verdict"] for case in result.get("cases", []) if not case["passed"]]
+        if result["success"]:
+            outcome = "success"
+        elif errors:
+            outcome = errors[0].get("type", "unknown")
+        else:
+            # A test-case run reports its first failing verdict (wrong_answer, ...)
+            outcome = failed_cases[0] if failed_cases else "runtime_error"
+        EXECUTIONS_TOTAL.inc(backend=self.backend, outcome=outcome, source=source)
+        if source not in ('result_cache', 'coalesced'):
+            if not result.get("compilation_cached"):
+                EXECUTION_PHASE_SECONDS.observe(result.get("compilation_time", 0), backend=self.backend, phase='compile')
+            if result.get("execution_time"):
+                EXECUTION_PHASE_SECONDS.observe(result["execution_time"], backend=self.backend, phase='run')
+    
+    def _execute_and_cache(self, java_code: str, stdin: Optional[str], result_key: Optional[str],
+                           admit: Optional[Callable[[], ContextManager[float]]] = None) -> Dict:
+        """Run on the configured backend and store the result under `result_key` when cacheable"""
+        queue_wait_time = 0.0
+        try:
+            with (admit() if admit else nullcontext(0.0)) as queue_wait_time:
+                if self.pool:
+                    result = self._execute_with_pool(java_code, stdin)
+                elif self.use_docker:
+                    result = self._execute_with_docker(java_code, stdin)
+                else:
+                    result = self._execute_with_subprocess(java_code, stdin)
+        except WorkspaceQuotaExceeded as e:
+            result = {
+                "success": False,
+                "output": "",
+                "errors": [{"type": "system_error", "line": 0, "column": 0, "message": str(e)}],
+                "execution_time": 0,
+                "compilation_time": 0
+            }
+        result.setdefault("compilation_cached", False)
+        result.setdefault("truncated", False)
+        result.setdefault("output_bytes", len(result.get("output", "").encode('utf-8')))
+        result["result_cached"] = False
+        result["queue_wait_time"] = queue_wait_time
+        if result_key and not any(error.get("type") in ("timeout", "system_error") for error in result["errors"]):
+            self.result_cache.put(result_key, result)
+        return result
+    
+    def compile_only(self, java_code: str) -> Dict:
+        """
+        Compile Java code without running it
+        
+        Returns:
+        {
+            "success": bool,
+            "errors": List[Dict],
+            "compilation_time": float,
+            "compilation_cached": bool
+        }
+        """
+        cache_key = self._class_cache_key(java_code)
+        cached = self.diagnostics_cache.get(cache_key)
+        if cached is not None:
+            cached["compilation_cached"] = True
+            return cached
+        if self.class_cache.enabled and self.class_cache.get(cache_key) is not None:
+            return self._cached_compile_result()
+        
+        if not self.check_lane.acquire(timeout=self.compile_timeout):
+            return {
+                "success": False,
+                "errors": [{"type": "system_error", "line": 0, "column": 0,
+                           "message": "Too many syntax checks in progress, try again"}],
+                "compilation_time": 0,
+                "compilation_cached": False
+            }
+        try:
+            result = self._compile_uncached(java_code, cache_key)
+        finally:
+            self.check_lane.release()
+        
+        result.pop("classes", None)
+        result["compilation_cached"] = False
+        if result["success"] or all(e.get("type") == "compilation_error" for e in result["errors"]):
+            self.diagnostics_cache.put(cache_key, result)
+        return result
+    
+    def _compile_uncached(self, java_code: str, cache_key: str) -> Dict:
+        class_name = self._extract_class_name(java_code)
+        server_result = self._compile_with_server(java_code, class_name)
+        if server_result is not None:
+            if server_result["success"] and self.class_cache.enabled:
+                self.class_cache.put(cache_key, server_result["classes"])
+            return server_result
+        
+        if self.pool:
+            try:
+                pooled = self.pool.acquire()
+            except Exception as e:
+                self.logger.error(f"Container pool checkout failed: {e}. Using a fresh container.")
+            else:
+                healthy = True
+                try:
+                    return self._sandbox_compile(pooled.workspace, java_code, class_name)
+                except Exception as e:
+                    self.logger.error(f"Pooled container error: {e}")
+                    healthy = False
+                    return {
+                        "success": False,
+                        "errors": [{"type": "system_error", "line": 0, "column": 0, "message": str(e)}],
+                        "compilation_time": 0
+                    }
+                finally:
+                    self.pool.release(pooled, healthy)
+        
+        if self.sandbox_workspaces:
+            with self.sandbox_workspaces.create() as workspace:
+                return self._sandbox_compile(workspace, java_code, class_name)
+        
+        with self._source_workspace(java_code, class_name) as workspace:
+            temp_dir = workspace.path
+            if self.use_docker:
+                result = self._docker_compile(temp_dir, class_name)
+            else:
+                result = self._subprocess_compile(temp_dir, class_name)
+            if result["success"]:
+                self._store_compiled_classes(cache_key, temp_dir)
+            return result
+    
+    def stream_execute(self, java_code: str, stdin: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Compile and execute Java code, yielding program output as it is produced
+        
+        Yields, in order:
+        {"event": "compiled", "compilation_time": float, "compilation_cached": bool}
+        {"event": "output", "stream": "stdout" | "stderr", "data": str}  (any number)
+        {"event": "result", ...same keys as compile_and_execute}
+        
+        Compile failures skip straight to the result event. Closing the
+        generator early kills the program.
+        """
+        class_name = self._extract_class_name(java_code)
+        with self._stream_workspace(java_code, class_name, stdin) as workspace:
+            compile_result = self._compile_in_workspace(workspace, java_code, class_name)
+            compilation_time = compile_result["compilation_time"]
+            compilation_cached = compile_result.get("compilation_cached", False)
+            if not compile_result["success"]:
+                result = {
+                    "event": "result",
+                    "success": False,
+                    "output": "",
+                    "errors": compile_result["errors"],
+                    "execution_time": 0,
+                    "compilation_time": compilation_time,
+                    "compilation_cached": False
+                }
+                self._count_execution(result, 'stream')
+                yield result
+                return
+            yield {"event": "compiled", "compilation_time": compilation_time, "compilation_cached": compilation_cached}
+            
+            outcome = self._new_outcome()
+            chunks = self._workspace_output_chunks(workspace, class_name, stdin, outcome)
+            capture = BoundedOutput(self.output_limit)
+            try:
+                for stream, data in chunks:
+                    text = capture.feed(data, stream)
+                    if text:
+                        yield {"event": "output", "stream": stream, "data": text}
+                    if capture.truncated:
+                        break
+            finally:
+                chunks.close()
+            
+            result = self._program_result(capture, outcome)
+            result.update({
+                "event": "result",
+                "compilation_time": compilation_time,
+                "compilation_cached": compilation_cached
+            })
+            self._count_execution(result, 'stream')
+            yield result
+    
+    def run_test_cases(self, java_code: str, test_cases: List[Dict]) -> Dict:
+        """
+        Run a program against many inputs in one JVM and judge each output
+        
+        `test_cases` is a list of {"stdin": str, "expected_output": str}.
+        
+        Returns:
+        {
+            "success": bool,  # every case accepted
+            "passed": int,
+            "total": int,
+            "cases": List[Dict],  # per case: index, verdict, passed, output, stderr,
+                                  # execution_time, message, diff (unified, expected vs actual)
+            "errors": List[Dict],  # compile errors, or a system error / timeout of the whole run
+            "execution_time": float,
+            "compilation_time": float,
+            "compilation_cached": bool
         }
+        
+        Verdicts are accepted, wrong_answer, runtime_error, timeout,
+        output_limit and not_run.
         """
+        result = None
+        for event in self.stream_test_cases(java_code, test_cases):
+            if event["event"] == "result":
+                result = event
+        result.pop("event")
+        return result
+    
+    def stream_test_cases(self, java_code: str, test_cases: List[Dict]) -> Iterator[Dict]:
+        """
+        Like run_test_cases, yielding verdicts as the harness finishes each case
+        
+        Yields {"event": "compiled", ...}, then {"event": "case", ...} per case
+        (in order), then {"event": "result", ...same keys as run_test_cases}.
+        Each case has JAVA_TEST_CASE_TIMEOUT seconds and an equal share of
+        JAVA_OUTPUT_LIMIT; the whole run stays within JAVA_TIMEOUT.
+        """
+        class_name = self._extract_class_name(java_code)
+        total = len(test_cases)
+        nonce = new_nonce()
+        stdin = encode_cases([case.get("stdin") or "" for case in test_cases], nonce)
+        case_limit = min(self.test_case_timeout, self.timeout)
+        case_output_limit = max(self.output_limit // max(total, 1), 1024)
+        program_args = [class_name, str(int(case_limit * 1000)), str(case_output_limit)]
+        summary = {"event": "result", "success": False, "passed": 0, "total": total, "cases": [],
+                   "errors": [], "execution_time": 0, "compilation_time": 0, "compilation_cached": False}
+        
+        source = with_harness(java_code)
+        with self._stream_workspace(source, class_name, stdin) as workspace:
+            compile_result = self._compile_in_workspace(workspace, source, class_name)
+            summary["compilation_time"] = compile_result["compilation_time"]
+            if not compile_result["success"]:
+                summary["errors"] = program_errors(compile_result["errors"], java_code)
+                self._count_execution(summary, 'test_cases')
+                yield summary
+                return
+            summary["compilation_cached"] = compile_result.get("compilation_cached", False)
+            yield {"event": "compiled", "compilation_time": summary["compilation_time"],
+                   "compilation_cached": summary["compilation_cached"]}
+            
+            outcome = self._new_outcome()
+            chunks = self._workspace_output_chunks(workspace, HARNESS_CLASS, stdin, outcome, program_args)
+            reader = CaseFrameReader(nonce)
+            stderr = BoundedOutput(64 * 1024)
+            received = 0
+            frame_limit = harness_output_limit(total, case_output_limit)
+            try:
+                for stream, data in chunks:
+                    if stream == 'stderr':
+                        stderr.feed(data)
+                        continue
+                    received += len(data)
+                    for frame in reader.feed(data):
+                        if frame["index"] != len(summary["cases"]):
+                            continue
+                        case = judge_case(frame, test_cases[frame["index"]].get("expected_output") or "", case_limit)
+                        summary["cases"].append(case)
+                        yield dict(case, event="case")
+                    # The harness caps every case, so anything beyond its frames' worst case is not from it
+                    if received > frame_limit:
+                        outcome["error"] = "Program wrote outside the test harness's output capture"
+                        break
+            finally:
+                chunks.close()
+        
+        summary["execution_time"] = outcome["elapsed"]
+        if len(summary["cases"]) < total:
+            if outcome["timed_out"]:
+                message = f"Execution timeout ({self.timeout}s)"
+                summary["errors"] = [{"type": "timeout", "line": 0, "column": 0, "message": message}]
+            else:
+                message = outcome["error"] or stderr.text.strip() or "Test harness stopped before running every case"
+                summary["errors"] = [{"type": "system_error", "line": 0, "column": 0, "message": message}]
+            first_verdict = "timeout" if outcome["timed_out"] else "not_run"
+            for index in range(len(summary["cases"]), total):
+                case = unreported_case(index, first_verdict if index == len(summary["cases"]) else "not_run", message)
+                summary["cases"].append(case)
+                yield dict(case, event="case")
+        summary["passed"] = sum(1 for case in summary["cases"] if case["passed"])
+        summary["success"] = summary["passed"] == total and not summary["errors"]
+        self._count_execution(summary, 'test_cases')
+        yield summary
+    
+    def _stream_workspace(self, java_code: str, class_name: str, stdin: Optional[str]):
+        """Workspace for a compile and one run: a sandbox container if configured, else the host"""
+        if self.sandbox_workspaces:
+            return self.sandbox_workspaces.create()
+        return self._source_workspace(java_code, class_name, stdin)
+    
+    def _compile_in_workspace(self, workspace, java_code: str, class_name: str) -> Dict:
+        """Leave compiled classes in the workspace from the class cache, compile server or javac"""
+        if isinstance(workspace, ContainerWorkspace):
+            return self._sandbox_compile(workspace, java_code, class_name)
+        temp_dir = workspace.path
+        cache_key = self._class_cache_key(java_code)
+        compile_result = self._compile_without_javac(java_code, class_name, temp_dir, cache_key)
+        if compile_result is None:
+            if self.use_docker:
+                compile_result = self._docker_compile(temp_dir, class_name)
+            else:
+                compile_result = self._subprocess_compile(temp_dir, class_name)
+            if compile_result["success"]:
+                self._store_compiled_classes(cache_key, temp_dir)
+        return compile_result
+    
+    def _workspace_output_chunks(self, workspace, class_name: str, stdin: Optional[str], outcome: Dict,
+                                 program_args: Sequence[str] = ()) -> Iterator[Tuple[str, bytes]]:
+        """Run compiled classes in a workspace from _stream_workspace, yielding (stream, bytes)"""
+        if isinstance(workspace, ContainerWorkspace):
+            command = self._sandbox_run_command(workspace, class_name, stdin, program_args)
+            return self._sandbox_output_chunks(workspace, command, outcome)
         if self.use_docker:
-            return self._execute_with_docker(java_code)
+            return self._docker_output_chunks(workspace.path, class_name, stdin is not None, outcome, program_args)
+        return self._subprocess_output_chunks(workspace.path, class_name, stdin, outcome, program_args)
+    
+    def _new_outcome(self) -> Dict:
+        """Mutable status filled in by the *_output_chunks generators"""
+        return {"exit_code": None, "timed_out": False, "error": None, "elapsed": 0.0}
+    
+    def _capture(self, chunks: Iterator[Tuple[str, bytes]]) -> BoundedOutput:
+        """Read (stream, bytes) chunks until the program exits or the output limit is hit"""
+        capture = BoundedOutput(self.output_limit)
+        try:
+            for stream, data in chunks:
+                capture.feed(data, stream)
+                if capture.truncated:
+                    break
+        finally:
+            # Closing the generator early stops the program
+            chunks.close()
+        return capture
+    
+    def _program_result(self, capture: BoundedOutput, outcome: Dict) -> Dict:
+        """Result dict of a program run from its captured output and outcome"""
+        output = capture.text
+        if outcome["error"]:
+            errors = [{"type": "system_error", "line": 0, "column": 0, "message": outcome["error"]}]
+        elif capture.truncated:
+            errors = [{"type": "output_limit", "line": 0, "column": 0, "message": capture.notice()}]
+        elif outcome["timed_out"]:
+            errors = [{"type": "timeout", "line": 0, "column": 0,
+                      "message": f"Execution timeout ({self.timeout}s)"}]
+        elif outcome["exit_code"] != 0:
+            errors = [{"type": "runtime_error", "line": 0, "column": 0,
+                      "message": output.strip() or "Execution failed with non-zero exit code"}]
         else:
-            return self._execute_with_subprocess(java_code)
+            errors = []
+        return {
+            "success": not errors,
+            "output": output,
+            "errors": errors,
+            "execution_time": outcome["elapsed"],
+            "truncated": capture.truncated,
+            "output_bytes": capture.total_bytes
+        }
+    
+    def _kill_quietly(self, container, phase: str = 'run'):
+        try:
+            with _docker_timer(phase, 'kill'):
+                container.kill()
+        except Exception:
+            pass
+    
+    def _attached_output(self, container, time_limit: float, outcome: Dict,
+                         phase: str = 'run') -> Iterator[Tuple[str, bytes]]:
+        """
+        Start a created container and yield (stream, bytes) from its attached output.
+        
+        The container is killed once `time_limit` passes or when the caller
+        closes the generator before the program has exited.
+        """
+        # Attach before starting so no early output is missed
+        with _docker_timer(phase, 'attach'):
+            stream = container.attach(stdout=True, stderr=True, stream=True, logs=True, demux=True)
+        expired = threading.Event()
+        
+        def expire():
+            expired.set()
+            self._kill_quietly(container, phase)
+        
+        watchdog = threading.Timer(time_limit, expire)
+        watchdog.daemon = True
+        with _docker_timer(phase, 'start'):
+            container.start()
+        start_time = time.time()
+        watchdog.start()
+        try:
+            for stdout, stderr in stream:
+                if stdout:
+                    yield 'stdout', stdout
+                if stderr:
+                    yield 'stderr', stderr
+            # Start to end of output: the program's own run time plus JVM start-up
+            DOCKER_CALL_SECONDS.observe(time.time() - start_time, component='executor', phase=phase, call='stream')
+            with _docker_timer(phase, 'wait'):
+                outcome["exit_code"] = container.wait(timeout=5)['StatusCode']
+        finally:
+            watchdog.cancel()
+            outcome["elapsed"] = time.time() - start_time
+            outcome["timed_out"] = expired.is_set()
+            if outcome["exit_code"] is None:
+                self._kill_quietly(container, phase)
+    
+    def _docker_output_chunks(self, code_dir: str, class_name: str, with_stdin: bool, outcome: Dict,
+                              program_args: Sequence[str] = ()) -> Iterator[Tuple[str, bytes]]:
+        """Run compiled classes in a fresh container, yielding (stream, bytes) from an attached socket"""
+        command = ["/opt/jdk-17.0.12/bin/java", *self.jvm_flags, "-cp", "/app/workspace", class_name, *program_args]
+        if with_stdin:
+            command = self._with_stdin(command, "/app/workspace")
+        return self._container_output_chunks(
+            self.runtime_image, command, {code_dir: {'bind': '/app/workspace', 'mode': 'rw'}}, outcome, 'run')
+    
+    def _crac_output_chunks(self, code_dir: str, with_stdin: bool, outcome: Dict) -> Iterator[Tuple[str, bytes]]:
+        """Restore the launcher checkpoint in a fresh container; it runs the class named in MAIN_CLASS_FILE"""
+        command = self.crac.restore_command()
+        if with_stdin:
+            command = self._with_stdin(command, "/app/workspace")
+        return self._container_output_chunks(
+            self.crac.image, command, self.crac.volumes(code_dir), outcome, 'restore', **self.crac.container_options())
+    
+    def _container_output_chunks(self, image: str, command: List[str], volumes: Dict, outcome: Dict,
+                                 phase: str, user: str = "0", **options) -> Iterator[Tuple[str, bytes]]:
+        container = None
+        try:
+            nano_cpus = int(self.cpu_limit * 1_000_000_000) if self.cpu_limit > 0 else None
+            with _docker_timer(phase, 'create'):
+                container = self.docker_client.containers.create(
+                    image=image,
+                    command=command,
+                    volumes=volumes,
+                    working_dir='/app/workspace',
+                    mem_limit=self.memory_limit,
+                    nano_cpus=nano_cpus,
+                    network_disabled=True,
+                    read_only=True,
+                    tmpfs={'/tmp': 'size=50m'},
+                    user=user,
+                    detach=True,
+                    **options
+                )
+            yield from self._attached_output(container, self.timeout, outcome, phase)
+        except Exception as e:
+            self.logger.error(f"Docker execute error: {e}")
+            outcome["error"] = str(e)
+        finally:
+            if container:
+                try:
+                    with _docker_timer(phase, 'remove'):
+                        container.remove(force=True)
+                except Exception:
+                    pass
+    
+    def _sandbox_output_chunks(self, workspace: ContainerWorkspace, command: List[str],
+                               outcome: Dict) -> Iterator[Tuple[str, bytes]]:
+        """Run a command in a sandbox container through the exec API, yielding (stream, bytes)"""
+        api = self.docker_client.api
+        with _docker_timer('sandbox_run', 'exec_create'):
+            exec_id = api.exec_create(workspace.container.id, command, stdout=True, stderr=True,
+                                      user="runner", workdir=SANDBOX_WORKSPACE)['Id']
+        start_time = time.time()
+        try:
+            for stdout, stderr in api.exec_start(exec_id, stream=True, demux=True):
+                if stdout:
+                    yield 'stdout', stdout
+                if stderr:
+                    yield 'stderr', stderr
+            DOCKER_CALL_SECONDS.observe(time.time() - start_time, component='executor', phase='sandbox_run',
+                                        call='exec_start')
+            with _docker_timer('sandbox_run', 'exec_inspect'):
+                outcome["exit_code"] = api.exec_inspect(exec_id)['ExitCode']
+        finally:
+            # A program abandoned early dies with its container, or with the pool's workspace reset
+            outcome["elapsed"] = time.time() - start_time
+            if outcome["exit_code"] is not None:
+                outcome["timed_out"] = self._sandbox_timed_out(outcome["exit_code"], outcome["elapsed"], self.timeout)
+    
+    def _subprocess_output_chunks(self, code_dir: str, class_name: str, stdin: Optional[str], outcome: Dict,
+                                  program_args: Sequence[str] = ()) -> Iterator[Tuple[str, bytes]]:
+        """Run compiled classes on the host, yielding (stream, bytes) as the pipes fill"""
+        cgroup = self.sandbox.create_cgroup() if self.sandbox else None
+        try:
+            command = self._host_command(
+                [self.java_path, *self.jvm_flags, '-cp', self._host_workdir(code_dir), class_name, *program_args],
+                code_dir, self.timeout, cgroup)
+            with SUBPROCESS_CALL_SECONDS.time(backend=self.backend, phase='run', call='spawn'):
+                process = subprocess.Popen(
+                    command,
+                    stdin=subprocess.PIPE if stdin is not None else subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    cwd=code_dir,
+                    env=self._host_env()
+                )
+        except Exception as e:
+            outcome["error"] = str(e)
+            if cgroup:
+                self.sandbox.remove_cgroup(cgroup)
+            return
+        
+        chunks: 'queue.Queue[Tuple[str, Optional[bytes]]]' = queue.Queue()
+        
+        def pump(name, pipe):
+            for chunk in iter(lambda: pipe.read1(65536), b''):
+                chunks.put((name, chunk))
+            chunks.put((name, None))
+        
+        def feed():
+            try:
+                process.stdin.write(stdin.encode('utf-8'))
+                process.stdin.close()
+            except OSError:
+                pass  # program exited without reading all of its input
+        
+        for name, pipe in (('stdout', process.stdout), ('stderr', process.stderr)):
+            threading.Thread(target=pump, args=(name, pipe), daemon=True).start()
+        if stdin is not None:
+            threading.Thread(target=feed, daemon=True).start()
+        killer = threading.Timer(self.timeout, process.kill)
+        killer.daemon = True
+        killer.start()
+        start_time = time.time()
+        try:
+            open_streams = 2
+            while open_streams:
+                name, chunk = chunks.get()
+                if chunk is None:
+                    open_streams -= 1
+                    continue
+                yield name, chunk
+            with SUBPROCESS_CALL_SECONDS.time(backend=self.backend, phase='run', call='wait'):
+                outcome["exit_code"] = process.wait()
+            outcome["timed_out"] = outcome["exit_code"] != 0 and time.time() - start_time >= self.timeout
+        finally:
+            killer.cancel()
+            outcome["elapsed"] = time.time() - start_time
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            if cgroup:
+                self.sandbox.remove_cgroup(cgroup)
+    
+    def _host_workdir(self, code_dir: str) -> str:
+        """The workspace path as the compiler/JVM process sees it"""
+        return NAMESPACE_WORKSPACE if self.sandbox else code_dir
+    
+    def _host_env(self) -> Optional[Dict[str, str]]:
+        """Environment for compiler/JVM processes: inherited, or the sandbox's minimal one"""
+        return self.sandbox.environment() if self.sandbox else None
+    
+    def _host_command(self, argv: List[str], code_dir: str, time_limit: float, cgroup: Optional[str]) -> List[str]:
+        """`argv` as is for the plain subprocess backend, wrapped for the namespace backend"""
+        if not self.sandbox:
+            return argv
+        # CPU time backstop for a process that escapes the wall-clock kill; JVM threads share it
+        cpu_seconds = int(time_limit * (os.cpu_count() or 1)) + 1
+        return self.sandbox.wrap(argv, code_dir, cpu_seconds, cgroup)
+    
+    def stats(self) -> Dict:
+        """Executor backend, warm pool and cache counters"""
+        return {
+            "backend": self.backend,
+            "pool": self.pool.stats() if self.pool else None,
+            "class_cache": self.class_cache.stats(),
+            "diagnostics_cache": self.diagnostics_cache.stats(),
+            "result_cache": self.result_cache.stats(),
+            "single_flight": self.single_flight.stats() if self.single_flight else None,
+            "compile_server": self.compile_server.stats() if self.compile_server else None,
+            "crac": self.crac.stats() if self.crac else None
+        }
+    
+    def _class_cache_key(self, java_code: str) -> str:
+        toolchain = self.compile_image if self.use_docker else self.javac_path
+        return class_cache_key(java_code, toolchain)
+    
+    def _result_cache_key(self, java_code: str, stdin: Optional[str]) -> str:
+        runtime = self.runtime_image if self.use_docker else self.java_path
+        settings = (runtime, self.jvm_flags, self.timeout, self.memory_limit, self.cpu_limit, self.output_limit)
+        return result_cache_key(self._class_cache_key(java_code), stdin, settings)
+    
+    def _restore_cached_classes(self, cache_key: str, code_dir: str) -> bool:
+        """Write cached class files into the workspace; False on a cache miss"""
+        if not self.class_cache.enabled:
+            return False
+        classes = self.class_cache.get(cache_key)
+        if classes is None:
+            return False
+        write_class_files(code_dir, classes)
+        return True
+    
+    def _store_compiled_classes(self, cache_key: str, code_dir: str):
+        if self.class_cache.enabled:
+            self.class_cache.put(cache_key, read_class_files(code_dir))
+    
+    def _cached_compile_result(self) -> Dict:
+        return {"success": True, "errors": [], "compilation_time": 0.0, "compilation_cached": True}
+    
+    def _compile_with_server(self, java_code: str, class_name: str) -> Optional[Dict]:
+        """Compile through the persistent compile server; None means fall back to javac"""
+        if not self.compile_server:
+            return None
+        start_time = time.time()
+        result = self.compile_server.compile(class_name, java_code)
+        if result is None:
+            return None
+        compilation_time = time.time() - start_time
+        if result["timed_out"]:
+            return {
+                "success": False,
+                "errors": [{"type": "timeout", "line": 0, "column": 0,
+                           "message": f"Compilation timeout ({self.compile_timeout}s)"}],
+                "compilation_time": compilation_time
+            }
+        if not result["success"]:
+            errors = self._parse_compiler_errors(result["diagnostics"])
+            if not errors:
+                errors = [{"type": "compilation_error", "line": 0, "column": 0,
+                          "message": result["diagnostics"].strip() or "Compilation failed"}]
+            return {"success": False, "errors": errors, "compilation_time": compilation_time}
+        return {"success": True, "errors": [], "compilation_time": compilation_time, "classes": result["classes"]}
+    
+    def _compile_without_javac(self, java_code: str, class_name: str, code_dir: str, cache_key: str) -> Optional[Dict]:
+        """Serve a compilation from the class cache or the compile server, or return None"""
+        if self._restore_cached_classes(cache_key, code_dir):
+            return self._cached_compile_result()
+        compile_result = self._compile_with_server(java_code, class_name)
+        if compile_result is not None and compile_result["success"]:
+            write_class_files(code_dir, compile_result["classes"])
+            if self.class_cache.enabled:
+                self.class_cache.put(cache_key, compile_result["classes"])
+        return compile_result
     
     def _extract_class_name(self, java_code: str) -> str:
         """Extract class name from Java code"""
@@ -99,17 +904,30 @@ class JavaExecutor:
         
         return errors
     
-    def _execute_with_docker(self, java_code: str) -> Dict:
+    def _execute_with_docker(self, java_code: str, stdin: Optional[str] = None) -> Dict:
         """Execute Java code using Docker"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            class_name = self._extract_class_name(java_code)
-            java_file = os.path.join(temp_dir, f"{class_name}.java")
-            
-            with open(java_file, 'w', encoding='utf-8') as f:
-                f.write(java_code)
+        class_name = self._extract_class_name(java_code)
+        if self.sandbox_workspaces:
+            try:
+                workspace = self.sandbox_workspaces.create()
+            except Exception as e:
+                self.logger.error(f"Sandbox workspace creation failed: {e}. Using a host workspace.")
+            else:
+                with workspace:
+                    return self._execute_in_sandbox(workspace, java_code, class_name, stdin)[0]
+        
+        with self._source_workspace(java_code, class_name, stdin) as workspace:
+            temp_dir = workspace.path
             
-            # Compile
-            compile_result = self._docker_compile(temp_dir, class_name)
+            cache_key = self._class_cache_key(java_code)
+            compile_result = self._compile_without_javac(java_code, class_name, temp_dir, cache_key)
+            if compile_result is None:
+                if self.execution_mode == 'single' and not self.split_images:
+                    return self._docker_compile_and_run(temp_dir, class_name, cache_key, stdin is not None)
+                # Compile
+                compile_result = self._docker_compile(temp_dir, class_name)
+                if compile_result["success"]:
+                    self._store_compiled_classes(cache_key, temp_dir)
             if not compile_result["success"]:
                 return {
                     "success": False,
@@ -120,15 +938,160 @@ class JavaExecutor:
                 }
             
             # Execute
-            execute_result = self._docker_execute(temp_dir, class_name)
+            if self.crac:
+                execute_result = self._crac_execute(temp_dir, class_name, stdin is not None)
+            else:
+                execute_result = self._docker_execute(temp_dir, class_name, stdin is not None)
             
+            execute_result.update({
+                "compilation_time": compile_result["compilation_time"],
+                "compilation_cached": compile_result.get("compilation_cached", False)
+            })
+            return execute_result
+    
+    def _sandbox_timed_out(self, exit_code: int, elapsed: float, limit: float) -> bool:
+        """`timeout -s KILL` exits with 137 (or 124) once the limit is hit"""
+        return exit_code in (124, 137) and elapsed >= limit
+    
+    def _with_stdin(self, command: List[str], workspace: str) -> List[str]:
+        """Wrap a sandbox command so the program reads, and only it holds, the workspace stdin file"""
+        return ["sh", "-c", _stdin_from_file(f"{workspace}/{STDIN_FILE}") + f"exec {shlex.join(command)}"]
+    
+    def _source_workspace(self, java_code: str, class_name: str, stdin: Optional[str] = None) -> HostWorkspace:
+        """Host workspace holding the source file and, if given, the program input"""
+        workspace = self.workspaces.create()
+        try:
+            files = {f"{class_name}.java": java_code.encode('utf-8')}
+            if stdin is not None:
+                files[STDIN_FILE] = stdin.encode('utf-8')
+            workspace.write_files(files)
+        except Exception:
+            workspace.cleanup()
+            raise
+        return workspace
+    
+    def _execute_with_pool(self, java_code: str, stdin: Optional[str] = None) -> Dict:
+        """Execute Java code in a pre-started container from the warm pool"""
+        try:
+            pooled = self.pool.acquire()
+        except Exception as e:
+            self.logger.error(f"Container pool checkout failed: {e}. Using a fresh container.")
+            return self._execute_with_docker(java_code, stdin)
+        
+        healthy = True
+        try:
+            result, healthy = self._execute_in_sandbox(
+                pooled.workspace, java_code, self._extract_class_name(java_code), stdin)
+            return result
+        finally:
+            self.pool.release(pooled, healthy)
+    
+    def _execute_in_sandbox(self, workspace: ContainerWorkspace, java_code: str, class_name: str,
+                            stdin: Optional[str] = None) -> Tuple[Dict, bool]:
+        """Compile and run inside a started sandbox container; returns (result, container_healthy)"""
+        compile_start = time.time()
+        compile_result = None
+        execution_time = 0
+        try:
+            compile_result = self._sandbox_compile(workspace, java_code, class_name)
+            compilation_time = compile_result["compilation_time"]
+            compilation_cached = compile_result.get("compilation_cached", False)
+            if not compile_result["success"]:
+                return {
+                    "success": False,
+                    "output": "",
+                    "errors": compile_result["errors"],
+                    "execution_time": 0,
+                    "compilation_time": compilation_time
+                }, True
+            
+            # Execute
+            command = self._sandbox_run_command(workspace, class_name, stdin)
+            outcome = self._new_outcome()
+            capture = self._capture(self._sandbox_output_chunks(workspace, command, outcome))
+            execution_time = outcome["elapsed"]
+            result = self._program_result(capture, outcome)
+            result.update({"compilation_time": compilation_time, "compilation_cached": compilation_cached})
+            return result, True
+        except WorkspaceQuotaExceeded:
+            raise
+        except Exception as e:
+            self.logger.error(f"Sandbox container error: {e}")
             return {
-                "success": execute_result["success"],
-                "output": execute_result["output"],
-                "errors": execute_result.get("errors", []),
-                "execution_time": execute_result["execution_time"],
-                "compilation_time": compile_result["compilation_time"]
+                "success": False,
+                "output": "",
+                "errors": [{"type": "system_error", "line": 0, "column": 0, "message": str(e)}],
+                "execution_time": execution_time,
+                "compilation_time": compile_result["compilation_time"] if compile_result else time.time() - compile_start
+            }, False
+    
+    def _sandbox_run_command(self, workspace: ContainerWorkspace, class_name: str, stdin: Optional[str],
+                             program_args: Sequence[str] = ()) -> List[str]:
+        command = ["/opt/jdk-17.0.12/bin/java", *self.jvm_flags, "-cp", SANDBOX_WORKSPACE, class_name, *program_args]
+        if stdin is not None:
+            workspace.write_files({STDIN_FILE: stdin.encode('utf-8')})
+            # Inside timeout, so the JVM is the only process holding the input open
+            command = self._with_stdin(command, SANDBOX_WORKSPACE)
+        return ["timeout", "-s", "KILL", str(self.timeout), *command]
+    
+    def _sandbox_compile(self, workspace: ContainerWorkspace, java_code: str, class_name: str) -> Dict:
+        """Leave compiled classes in a sandbox container's workspace (cache, compile server or javac)"""
+        start_time = time.time()
+        cache_key = self._class_cache_key(java_code)
+        cached_classes = self.class_cache.get(cache_key) if self.class_cache.enabled else None
+        if cached_classes is not None:
+            workspace.write_files(cached_classes)
+            return self._cached_compile_result()
+        
+        server_result = self._compile_with_server(java_code, class_name)
+        if server_result is not None:
+            if server_result["success"]:
+                if self.class_cache.enabled:
+                    self.class_cache.put(cache_key, server_result["classes"])
+                workspace.write_files(server_result["classes"])
+            return server_result
+        
+        if self.split_images:
+            return self._compile_into_sandbox(workspace, java_code, class_name, cache_key)
+        
+        with _docker_timer('sandbox_compile', 'put_archive'):
+            workspace.write_files({f"{class_name}.java": java_code.encode('utf-8')})
+        with _docker_timer('sandbox_compile', 'exec_run'):
+            exit_code, logs = workspace.container.exec_run(
+                ["timeout", "-s", "KILL", str(self.compile_timeout),
+                 "/opt/jdk-17.0.12/bin/javac", "-d", SANDBOX_WORKSPACE, f"{class_name}.java"],
+                workdir=SANDBOX_WORKSPACE,
+                user="runner"
+            )
+        compilation_time = time.time() - start_time
+        logs = (logs or b'').decode('utf-8', errors='replace')
+        if self._sandbox_timed_out(exit_code, compilation_time, self.compile_timeout):
+            return {
+                "success": False,
+                "errors": [{"type": "timeout", "line": 0, "column": 0,
+                           "message": f"Compilation timeout ({self.compile_timeout}s)"}],
+                "compilation_time": compilation_time
             }
+        if exit_code != 0:
+            errors = self._parse_compiler_errors(logs)
+            if not errors:
+                errors = [{"type": "compilation_error", "line": 0, "column": 0, "message": logs.strip() or "Compilation failed"}]
+            return {"success": False, "errors": errors, "compilation_time": compilation_time}
+        if self.class_cache.enabled:
+            self.class_cache.put(cache_key, workspace.read_class_files())
+        return {"success": True, "errors": [], "compilation_time": compilation_time}
+    
+    def _compile_into_sandbox(self, workspace: ContainerWorkspace, java_code: str, class_name: str,
+                              cache_key: str) -> Dict:
+        """Compile in the compile image and copy the classes into a runtime-image sandbox"""
+        with self._source_workspace(java_code, class_name) as source:
+            compile_result = self._docker_compile(source.path, class_name)
+            if compile_result["success"]:
+                classes = source.read_class_files()
+                if self.class_cache.enabled:
+                    self.class_cache.put(cache_key, classes)
+                workspace.write_files(classes)
+        return compile_result
     
     def _docker_compile(self, code_dir: str, class_name: str) -> Dict:
         """Compile Java code in Docker container"""
@@ -137,35 +1100,41 @@ class JavaExecutor:
         
         try:
             nano_cpus = int(self.cpu_limit * 1_000_000_000) if self.cpu_limit > 0 else None
-            container = self.docker_client.containers.create(
-                image=self.docker_image,
-                command=["/opt/jdk-17.0.12/bin/javac", "-d", "/app/workspace", f"{class_name}.java"],
-                volumes={code_dir: {'bind': '/app/workspace', 'mode': 'rw'}},
-                working_dir='/app/workspace',
-                mem_limit=self.memory_limit,
-                nano_cpus=nano_cpus,
-                network_disabled=True,
-                read_only=True,
-                tmpfs={'/tmp': 'size=50m'},
-                user="0",
-                detach=True
-            )
+            with _docker_timer('compile', 'create'):
+                container = self.docker_client.containers.create(
+                    image=self.compile_image,
+                    command=["/opt/jdk-17.0.12/bin/javac", "-d", "/app/workspace", f"{class_name}.java"],
+                    volumes={code_dir: {'bind': '/app/workspace', 'mode': 'rw'}},
+                    working_dir='/app/workspace',
+                    mem_limit=self.memory_limit,
+                    nano_cpus=nano_cpus,
+                    network_disabled=True,
+                    read_only=True,
+                    tmpfs={'/tmp': 'size=50m'},
+                    user="0",
+                    detach=True
+                )
             
-            container.start()
+            with _docker_timer('compile', 'start'):
+                container.start()
             try:
-                result = container.wait(timeout=self.timeout)
+                with _docker_timer('compile', 'wait'):
+                    result = container.wait(timeout=self.compile_timeout)
                 exit_code = result['StatusCode']
             except requests.exceptions.ReadTimeout:
-                container.kill()
-                container.remove(force=True)
+                self._kill_quietly(container, 'compile')
+                with _docker_timer('compile', 'remove'):
+                    container.remove(force=True)
                 return {
                     "success": False,
                     "errors": [{"type": "timeout", "line": 0, "column": 0,
-                               "message": f"Compilation timeout ({self.timeout}s)"}],
+                               "message": f"Compilation timeout ({self.compile_timeout}s)"}],
                     "compilation_time": time.time() - start_time
                 }
-            logs = container.logs(stdout=True, stderr=True).decode('utf-8')
-            container.remove()
+            with _docker_timer('compile', 'logs'):
+                logs = container.logs(stdout=True, stderr=True).decode('utf-8')
+            with _docker_timer('compile', 'remove'):
+                container.remove()
             
             errors = self._parse_compiler_errors(logs) if exit_code != 0 else []
             if exit_code != 0 and not errors:
@@ -177,11 +1146,11 @@ class JavaExecutor:
                 "compilation_time": time.time() - start_time
             }
         except docker.errors.ImageNotFound:
-            self.logger.error(f"Docker image not found: {self.docker_image}")
+            self.logger.error(f"Docker image not found: {self.compile_image}")
             return {
                 "success": False,
                 "errors": [{"type": "system_error", "line": 0, "column": 0,
-                           "message": f"Docker image '{self.docker_image}' not found. Build it first."}],
+                           "message": f"Docker image '{self.compile_image}' not found. Build it first."}],
                 "compilation_time": time.time() - start_time
             }
         except Exception as e:
@@ -197,82 +1166,170 @@ class JavaExecutor:
                 "compilation_time": time.time() - start_time
             }
     
-    def _docker_execute(self, code_dir: str, class_name: str) -> Dict:
+    def _docker_execute(self, code_dir: str, class_name: str, with_stdin: bool = False) -> Dict:
         """Execute compiled Java code in Docker container"""
+        outcome = self._new_outcome()
+        capture = self._capture(self._docker_output_chunks(code_dir, class_name, with_stdin, outcome))
+        return self._program_result(capture, outcome)
+    
+    def _crac_execute(self, code_dir: str, class_name: str, with_stdin: bool = False) -> Dict:
+        """Run compiled classes by restoring the launcher checkpoint, falling back to a cold JVM"""
+        try:
+            self.crac.ensure()
+        except CheckpointUnavailable as e:
+            self.logger.warning(f"CRaC checkpoint unavailable: {e}. Starting a fresh JVM.")
+            return self._docker_execute(code_dir, class_name, with_stdin)
+        
+        with open(os.path.join(code_dir, MAIN_CLASS_FILE), 'w') as f:
+            f.write(class_name)
+        # The restored JVM runs as the runner user and marks the restore in the workspace
+        os.chmod(code_dir, 0o777)
+        outcome = self._new_outcome()
+        capture = self._capture(self._crac_output_chunks(code_dir, with_stdin, outcome))
+        if not os.path.exists(os.path.join(code_dir, RESTORED_FILE)) and not outcome["timed_out"]:
+            # Nothing of the program ran, so its output is CRIU's error report
+            self.logger.warning(f"CRaC restore failed: {capture.text.strip()[-500:]}. Dropping the checkpoint.")
+            self.crac.invalidate()
+            return self._docker_execute(code_dir, class_name, with_stdin)
+        return self._program_result(capture, outcome)
+    
+    def _docker_compile_and_run(self, code_dir: str, class_name: str, cache_key: Optional[str] = None,
+                                with_stdin: bool = False) -> Dict:
+        """Compile and execute in a single container, one phase after the other"""
         start_time = time.time()
         container = None
+        # javac output and per-phase status go to files in the workspace so the
+        # container log only carries program output. The program runs as the
+        # unprivileged runner user so it cannot rewrite its own class files.
+        script = (
+            'start=$(date +%s%N); '
+            f'timeout -s KILL {self.compile_timeout} /opt/jdk-17.0.12/bin/javac -d /app/workspace {class_name}.java '
+            '> .javac.log 2>&1; '
+            'rc=$?; '
+            'echo "$rc $(( ($(date +%s%N) - start) / 1000 ))" > .javac.status; '
+            '[ "$rc" -eq 0 ] || exit "$rc"; '
+            'chmod 755 /app/workspace 2>/dev/null; '
+            + (_stdin_from_file(STDIN_FILE) if with_stdin else '')
+            # timeout stays root, so no process of the runner user but the JVM holds the input open
+            + f'exec timeout -s KILL {self.timeout} setpriv --reuid=10001 --regid=10001 --clear-groups '
+            f'/opt/jdk-17.0.12/bin/java {shlex.join(self.jvm_flags)} -cp /app/workspace {class_name}'
+        )
         
         try:
             nano_cpus = int(self.cpu_limit * 1_000_000_000) if self.cpu_limit > 0 else None
-            container = self.docker_client.containers.create(
-                image=self.docker_image,
-                command=["/opt/jdk-17.0.12/bin/java", "-cp", "/app/workspace", class_name],
-                volumes={code_dir: {'bind': '/app/workspace', 'mode': 'rw'}},
-                working_dir='/app/workspace',
-                mem_limit=self.memory_limit,
-                nano_cpus=nano_cpus,
-                network_disabled=True,
-                read_only=True,
-                tmpfs={'/tmp': 'size=50m'},
-                user="0",
-                detach=True
-            )
+            with _docker_timer('single', 'create'):
+                container = self.docker_client.containers.create(
+                    image=self.compile_image,
+                    command=["sh", "-c", script],
+                    volumes={code_dir: {'bind': '/app/workspace', 'mode': 'rw'}},
+                    working_dir='/app/workspace',
+                    mem_limit=self.memory_limit,
+                    nano_cpus=nano_cpus,
+                    network_disabled=True,
+                    read_only=True,
+                    tmpfs={'/tmp': 'size=50m'},
+                    user="0",
+                    detach=True
+                )
             
-            container.start()
-            try:
-                result = container.wait(timeout=self.timeout)
-                exit_code = result['StatusCode']
-            except requests.exceptions.ReadTimeout:
-                container.kill()
+            outcome = self._new_outcome()
+            capture = self._capture(
+                self._attached_output(container, self.compile_timeout + self.timeout + 5, outcome, 'single'))
+            with _docker_timer('single', 'remove'):
                 container.remove(force=True)
+            total_time = outcome["elapsed"]
+            
+            status = self._read_phase_status(os.path.join(code_dir, '.javac.status'))
+            if status is None:
+                if outcome["timed_out"]:
+                    message = f"Execution timeout ({self.timeout}s)"
+                    error_type = "timeout"
+                else:
+                    message = capture.text.strip() or f"Sandbox exited with status {outcome['exit_code']} before compiling"
+                    error_type = "system_error"
                 return {
                     "success": False,
                     "output": "",
-                    "errors": [{"type": "timeout", "line": 0, "column": 0,
-                               "message": f"Execution timeout ({self.timeout}s)"}],
-                    "execution_time": time.time() - start_time
+                    "errors": [{"type": error_type, "line": 0, "column": 0, "message": message}],
+                    "execution_time": 0,
+                    "compilation_time": total_time
                 }
-            logs = container.logs(stdout=True, stderr=True).decode('utf-8')
-            container.remove()
-            if exit_code == 0:
+            compile_exit_code, compilation_time = status
+            if compile_exit_code == 0 and cache_key:
+                self._store_compiled_classes(cache_key, code_dir)
+            
+            if compile_exit_code != 0:
+                if self._sandbox_timed_out(compile_exit_code, compilation_time, self.compile_timeout):
+                    errors = [{"type": "timeout", "line": 0, "column": 0,
+                              "message": f"Compilation timeout ({self.compile_timeout}s)"}]
+                else:
+                    with open(os.path.join(code_dir, '.javac.log'), encoding='utf-8', errors='replace') as f:
+                        compile_logs = f.read()
+                    errors = self._parse_compiler_errors(compile_logs)
+                    if not errors:
+                        errors = [{"type": "compilation_error", "line": 0, "column": 0, "message": compile_logs.strip() or "Compilation failed"}]
                 return {
-                    "success": True,
-                    "output": logs,
-                    "execution_time": time.time() - start_time
+                    "success": False,
+                    "output": "",
+                    "errors": errors,
+                    "execution_time": 0,
+                    "compilation_time": compilation_time
                 }
             
-            error_message = logs.strip() or "Execution failed with non-zero exit code"
+            outcome["elapsed"] = max(total_time - compilation_time, 0)
+            if outcome["exit_code"] is not None:
+                outcome["timed_out"] = outcome["timed_out"] or self._sandbox_timed_out(
+                    outcome["exit_code"], outcome["elapsed"], self.timeout)
+            result = self._program_result(capture, outcome)
+            result["compilation_time"] = compilation_time
+            return result
+        except docker.errors.ImageNotFound:
+            self.logger.error(f"Docker image not found: {self.compile_image}")
             return {
                 "success": False,
-                "output": logs,
-                "errors": [{"type": "runtime_error", "line": 0, "column": 0, "message": error_message}],
-                "execution_time": time.time() - start_time
+                "output": "",
+                "errors": [{"type": "system_error", "line": 0, "column": 0,
+                           "message": f"Docker image '{self.compile_image}' not found. Build it first."}],
+                "execution_time": 0,
+                "compilation_time": time.time() - start_time
             }
         except Exception as e:
-            self.logger.error(f"Docker execute error: {e}")
+            self.logger.error(f"Docker compile-and-run error: {e}")
             if container:
                 try:
-                    container.remove()
+                    container.remove(force=True)
                 except:
                     pass
             return {
                 "success": False,
                 "output": "",
                 "errors": [{"type": "system_error", "line": 0, "column": 0, "message": str(e)}],
-                "execution_time": time.time() - start_time
+                "execution_time": 0,
+                "compilation_time": time.time() - start_time
             }
     
-    def _execute_with_subprocess(self, java_code: str) -> Dict:
+    def _read_phase_status(self, status_file: str) -> Optional[tuple]:
+        """Read `<exit_code> <elapsed_micros>` written by the single-container script"""
+        try:
+            with open(status_file, encoding='utf-8') as f:
+                exit_code, elapsed_micros = f.read().split()
+            return int(exit_code), int(elapsed_micros) / 1_000_000
+        except (OSError, ValueError):
+            return None
+    
+    def _execute_with_subprocess(self, java_code: str, stdin: Optional[str] = None) -> Dict:
         """Execute Java code using subprocess (OpenJDK on host)"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            class_name = self._extract_class_name(java_code)
-            java_file = os.path.join(temp_dir, f"{class_name}.java")
-            
-            with open(java_file, 'w', encoding='utf-8') as f:
-                f.write(java_code)
+        class_name = self._extract_class_name(java_code)
+        with self._source_workspace(java_code, class_name) as workspace:
+            temp_dir = workspace.path
             
-            # Compile
-            compile_result = self._subprocess_compile(temp_dir, class_name)
+            cache_key = self._class_cache_key(java_code)
+            compile_result = self._compile_without_javac(java_code, class_name, temp_dir, cache_key)
+            if compile_result is None:
+                # Compile
+                compile_result = self._subprocess_compile(temp_dir, class_name)
+                if compile_result["success"]:
+                    self._store_compiled_classes(cache_key, temp_dir)
             if not compile_result["success"]:
                 return {
                     "success": False,
@@ -283,31 +1340,35 @@ class JavaExecutor:
                 }
             
             # Execute
-            execute_result = self._subprocess_execute(temp_dir, class_name)
+            execute_result = self._subprocess_execute(temp_dir, class_name, stdin)
             
-            return {
-                "success": execute_result["success"],
-                "output": execute_result["output"],
-                "errors": execute_result.get("errors", []),
-                "execution_time": execute_result["execution_time"],
-                "compilation_time": compile_result["compilation_time"]
-            }
+            execute_result.update({
+                "compilation_time": compile_result["compilation_time"],
+                "compilation_cached": compile_result.get("compilation_cached", False)
+            })
+            return execute_result
     
     def _subprocess_compile(self, code_dir: str, class_name: str) -> Dict:
         """Compile Java code using subprocess"""
         start_time = time.time()
+        cgroup = self.sandbox.create_cgroup() if self.sandbox else None
         
         try:
-            compile_cmd = [self.javac_path, '-d', code_dir, f"{class_name}.java"]
-            process = subprocess.Popen(
-                compile_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                cwd=code_dir
-            )
+            compile_cmd = self._host_command(
+                [self.javac_path, '-d', self._host_workdir(code_dir), f"{class_name}.java"],
+                code_dir, self.compile_timeout, cgroup)
+            with SUBPROCESS_CALL_SECONDS.time(backend=self.backend, phase='compile', call='spawn'):
+                process = subprocess.Popen(
+                    compile_cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    cwd=code_dir,
+                    env=self._host_env()
+                )
             
-            stdout, stderr = process.communicate(timeout=self.timeout)
+            with SUBPROCESS_CALL_SECONDS.time(backend=self.backend, phase='compile', call='wait'):
+                stdout, stderr = process.communicate(timeout=self.compile_timeout)
             exit_code = process.returncode
             errors = self._parse_compiler_errors(stderr) if exit_code != 0 else []
             
@@ -321,7 +1382,7 @@ class JavaExecutor:
             return {
                 "success": False,
                 "errors": [{"type": "timeout", "line": 0, "column": 0,
-                           "message": f"Compilation timeout ({self.timeout}s)"}],
+                           "message": f"Compilation timeout ({self.compile_timeout}s)"}],
                 "compilation_time": time.time() - start_time
             }
         except Exception as e:
@@ -330,46 +1391,15 @@ class JavaExecutor:
                 "errors": [{"type": "system_error", "line": 0, "column": 0, "message": str(e)}],
                 "compilation_time": time.time() - start_time
             }
+        finally:
+            if cgroup:
+                self.sandbox.remove_cgroup(cgroup)
     
-    def _subprocess_execute(self, code_dir: str, class_name: str) -> Dict:
+    def _subprocess_execute(self, code_dir: str, class_name: str, stdin: Optional[str] = None) -> Dict:
         """Execute compiled Java code using subprocess"""
-        start_time = time.time()
-        
-        try:
-            execute_cmd = [self.java_path, '-cp', code_dir, class_name]
-            process = subprocess.Popen(
-                execute_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                cwd=code_dir
-            )
-            
-            stdout, stderr = process.communicate(timeout=self.timeout)
-            exit_code = process.returncode
-            output = stdout + (stderr if exit_code != 0 else "")
-            
-            return {
-                "success": exit_code == 0,
-                "output": output,
-                "execution_time": time.time() - start_time
-            }
-        except subprocess.TimeoutExpired:
-            process.kill()
-            return {
-                "success": False,
-                "output": "",
-                "errors": [{"type": "timeout", "line": 0, "column": 0,
-                           "message": f"Execution timeout ({self.timeout}s)"}],
-                "execution_time": time.time() - start_time
-            }
-        except Exception as e:
-            return {
-                "success": False,
-                "output": "",
-                "errors": [{"type": "system_error", "line": 0, "column": 0, "message": str(e)}],
-                "execution_time": time.time() - start_time
-            }
+        outcome = self._new_outcome()
+        capture = self._capture(self._subprocess_output_chunks(code_dir, class_name, stdin, outcome))
+        return self._program_result(capture, outcome)
 
 # Singleton instance
 _java_executor_instance = None
@@ -0,0 +1,145 @@
+"""Background job queue for code execution requests"""
+import time
+import uuid
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from app.config import Config
+
+
+class JobQueueFull(Exception):
+    """Raised when the queue already holds the maximum number of pending jobs"""
+
+
+class ExecutionJob:
+    def __init__(self, job_id: str, user_id: Optional[int]):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.status = 'queued'
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+        self._callbacks = []
+        self._callbacks_lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('completed', 'failed')
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done.wait(timeout)
+
+    def add_done_callback(self, fn: Callable[[], None]):
+        """Call `fn` once the job finishes, from the worker thread (or right away if it has)"""
+        with self._callbacks_lock:
+            if not self.done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn()
+
+    def remove_done_callback(self, fn: Callable[[], None]):
+        with self._callbacks_lock:
+            if fn in self._callbacks:
+                self._callbacks.remove(fn)
+
+    def _finish(self):
+        with self._callbacks_lock:
+            self.done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn()
+
+    def to_dict(self) -> Dict:
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'queue_time': (self.started_at or time.time()) - self.created_at,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+
+
+class ExecutionJobQueue:
+    """
+    Run execution jobs on a bounded worker pool.
+
+    `submit` returns immediately with a job the caller can poll or wait on;
+    finished jobs are kept for `result_ttl` seconds so clients can fetch them.
+    """
+
+    def __init__(self, workers: int, max_pending: int, result_ttl: int):
+        self.logger = logging.getLogger('job_queue')
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='execution-job')
+        self._jobs: Dict[str, ExecutionJob] = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, user_id: Optional[int], fn: Callable[..., Dict], *args) -> ExecutionJob:
+        self._expire_finished()
+        job = ExecutionJob(str(uuid.uuid4()), user_id)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"{self._pending} jobs already pending")
+            self._pending += 1
+            self._jobs[job.job_id] = job
+        self._pool.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id: str) -> Optional[ExecutionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == 'running')
+            return {'pending': self._pending, 'running': running, 'tracked': len(self._jobs),
+                    'max_pending': self.max_pending}
+
+    def _run(self, job: ExecutionJob, fn: Callable[..., Dict], args):
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            job.result = fn(*args)
+            job.status = 'completed'
+        except Exception as e:
+            self.logger.error(f"Execution job {job.job_id} failed: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._pending -= 1
+            job._finish()
+
+    def _expire_finished(self):
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+_job_queue_instance: Optional[ExecutionJobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> ExecutionJobQueue:
+    """Get singleton execution job queue"""
+    global _job_queue_instance
+    with _job_queue_lock:
+        if _job_queue_instance is None:
+            _job_queue_instance = ExecutionJobQueue(
+                workers=Config.JAVA_JOB_WORKERS,
+                max_pending=Config.JAVA_JOB_QUEUE_LIMIT,
+                result_ttl=Config.JAVA_JOB_RESULT_TTL
+            )
+    return _job_queue_instance
@@ -0,0 +1,40 @@
+"""JVM launch options for running student programs"""
+import os
+from typing import List, Optional
+from app.config import Config
+
+
+# Built into docker_env/java17 from the classes CdsWarmup.java loads
+CONTAINER_CDS_ARCHIVE = '/opt/codemaster/app-cds.jsa'
+
+# Student programs usually finish within milliseconds, long before C2 or a
+# parallel collector pay for their start-up cost
+FAST_START_FLAGS = [
+    '-XX:+UseSerialGC',
+    '-XX:TieredStopAtLevel=1',
+    '-XX:-UsePerfData',
+    '-Xshare:auto',
+    # A missing or mismatched archive must not print warnings into program output
+    '-Xlog:cds*=off'
+]
+
+
+def run_flags(profile: str, cds_archive: Optional[str] = None) -> List[str]:
+    """Flags placed before `-cp` when launching a student program"""
+    if profile != 'fast-start':
+        return []
+    flags = list(FAST_START_FLAGS)
+    if cds_archive:
+        flags.append(f'-XX:SharedArchiveFile={cds_archive}')
+    return flags
+
+
+def container_run_flags() -> List[str]:
+    """Run flags for the sandbox image"""
+    return run_flags(Config.JAVA_JVM_PROFILE, CONTAINER_CDS_ARCHIVE)
+
+
+def host_run_flags() -> List[str]:
+    """Run flags for the host JVM (subprocess backend); the archive must come from that same JDK"""
+    archive = Config.JAVA_CDS_ARCHIVE
+    return run_flags(Config.JAVA_JVM_PROFILE, archive if archive and os.path.exists(archive) else None)
@@ -0,0 +1,160 @@
+"""Process sandbox from Linux namespaces, cgroup v2 and rlimits (JAVA_BACKEND=namespace)"""
+import os
+import shlex
+import shutil
+import subprocess
+import uuid
+import logging
+from typing import Dict, List, Optional
+
+
+# Where the run's workspace appears inside the sandbox
+NAMESPACE_WORKSPACE = '/tmp/workspace'
+# Covered in every sandbox on top of `hidden_paths`, as is the backend user's home
+ALWAYS_HIDDEN = ['/run']
+# Remounts every mount but /tmp and the workspace read-only, failing the run if one cannot be
+READ_ONLY_MOUNTS = (
+    'for mp in $(cut -d" " -f5 /proc/self/mountinfo); do '
+    'mp=$(printf %b "$mp"); '
+    f'case "$mp" in /tmp|{NAMESPACE_WORKSPACE}) continue;; esac; '
+    'mount -o remount,bind,ro "$mp" || { echo "sandbox: cannot make $mp read-only" >&2; exit 126; }; '
+    'done'
+)
+
+
+class NamespaceSandbox:
+    """
+    Wrap commands so they run in fresh user, mount, PID, network, IPC and UTS
+    namespaces, with resource limits.
+
+    Inside, the process is root of its own user namespace (an unprivileged
+    user on the host) with only a loopback interface. /tmp is a private,
+    size-limited tmpfs holding the workspace bind mount; every other mount is
+    read-only. `hidden_paths` (such as the backend's own directory and where
+    workspaces live), /run (filesystem sockets such as docker.sock) and the
+    backend user's home are covered by empty read-only tmpfs mounts, except
+    those holding one of `visible_paths` (the JDK).
+    rlimits cap file size, open files, core dumps and CPU time. When
+    `cgroup_root` is a writable cgroup v2 directory delegated to this user,
+    every run gets a child cgroup with memory.max, cpu.max and pids.max;
+    otherwise memory is bounded only by the JVM flags from `jvm_memory_flags`.
+    Wrapped commands must be started with `environment()`, not the backend's
+    own environment, which holds its secrets.
+    """
+
+    def __init__(self, memory_limit: int, cpu_limit: float, tmpfs_size: str = '50m',
+                 cgroup_root: Optional[str] = None, hidden_paths: Optional[List[str]] = None,
+                 visible_paths: Optional[List[str]] = None,
+                 max_pids: int = 128, max_file_size: int = 16 * 1024 * 1024, max_open_files: int = 256):
+        self.logger = logging.getLogger('namespace_sandbox')
+        self.memory_limit = memory_limit
+        self.cpu_limit = cpu_limit
+        self.tmpfs_size = tmpfs_size
+        self.cgroup_root = cgroup_root if cgroup_root and self._cgroup_usable(cgroup_root) else None
+        visible = [os.path.realpath(path) for path in (visible_paths or [])]
+        self.hidden_paths = []
+        for path in ALWAYS_HIDDEN + [os.path.expanduser('~')] + (hidden_paths or []):
+            path = os.path.realpath(path)
+            if not os.path.isdir(path) or path in self.hidden_paths:
+                continue
+            if any(v == path or v.startswith(path + os.sep) for v in visible):
+                self.logger.warning(f"{path} holds the JDK, so sandboxed programs can read it")
+                continue
+            self.hidden_paths.append(path)
+        # A path under another hidden one is covered already (and its mount point gone)
+        self.hidden_paths = [path for path in self.hidden_paths
+                             if not any(path.startswith(other + os.sep) for other in self.hidden_paths)]
+        self.max_pids = max_pids
+        self.max_file_size = max_file_size
+        self.max_open_files = max_open_files
+
+    def available(self) -> bool:
+        """True when unprivileged user namespaces work on this host"""
+        if not shutil.which('unshare') or not shutil.which('prlimit'):
+            return False
+        try:
+            result = subprocess.run(self._unshare() + ['true'], capture_output=True, timeout=5)
+            return result.returncode == 0
+        except Exception:
+            return False
+
+    def environment(self) -> Dict[str, str]:
+        """The complete environment for a wrapped command: nothing of the backend's (keys, DATABASE_URL) leaks in"""
+        return {'PATH': os.environ.get('PATH', os.defpath), 'LANG': 'C.UTF-8', 'HOME': '/tmp'}
+
+    def jvm_memory_flags(self) -> List[str]:
+        """Size the JVM as if `memory_limit` were all the RAM there is, as in a container"""
+        return [f'-XX:MaxRAM={self.memory_limit}']
+
+    def wrap(self, argv: List[str], workspace: str, cpu_seconds: int, cgroup: Optional[str] = None) -> List[str]:
+        """
+        Command line running `argv` in the sandbox with NAMESPACE_WORKSPACE as cwd.
+
+        `argv` must refer to the workspace as NAMESPACE_WORKSPACE (or relative
+        paths); the host path is hidden once /tmp is replaced.
+        """
+        # cd first: the workspace may live under a path that gets covered, and
+        # --no-canonicalize makes mount resolve "." through the kept cwd
+        mounts = [f'mount -t tmpfs -o size={self.tmpfs_size},mode=1777 tmpfs /tmp']
+        mounts += [f'mount -t tmpfs -o size=4k,ro tmpfs {shlex.quote(path)}' for path in self.hidden_paths]
+        mounts += [f'mkdir {NAMESPACE_WORKSPACE}',
+                   f'mount --no-canonicalize --bind . {NAMESPACE_WORKSPACE}',
+                   READ_ONLY_MOUNTS,
+                   f'cd {NAMESPACE_WORKSPACE}']
+        inner = 'cd "$0" && ' + ' && '.join(mounts) + ' && exec "$@"'
+        command = [
+            'prlimit', f'--fsize={self.max_file_size}', f'--nofile={self.max_open_files}',
+            '--core=0', f'--cpu={cpu_seconds}', '--',
+            *self._unshare(), 'sh', '-c', inner, workspace, *argv
+        ]
+        if cgroup:
+            # Join the run's cgroup before any namespace or limit applies
+            command = ['sh', '-c', 'echo $$ > "$0/cgroup.procs" && exec "$@"', cgroup, *command]
+        return command
+
+    def create_cgroup(self) -> Optional[str]:
+        """Child cgroup for one run, or None without a usable cgroup root"""
+        if not self.cgroup_root:
+            return None
+        path = os.path.join(self.cgroup_root, f'run-{uuid.uuid4().hex[:12]}')
+        try:
+            os.mkdir(path)
+            self._write(path, 'memory.max', str(self.memory_limit))
+            self._write(path, 'memory.swap.max', '0')
+            self._write(path, 'pids.max', str(self.max_pids))
+            if self.cpu_limit > 0:
+                self._write(path, 'cpu.max', f'{int(self.cpu_limit * 100000)} 100000')
+            return path
+        except OSError as e:
+            self.logger.warning(f"cgroup setup failed: {e}")
+            self.remove_cgroup(path)
+            return None
+
+    def remove_cgroup(self, path: Optional[str]):
+        """Kill whatever is left in a run's cgroup and delete it"""
+        if not path:
+            return
+        try:
+            self._write(path, 'cgroup.kill', '1')
+        except OSError:
+            pass
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+
+    def _unshare(self) -> List[str]:
+        return ['unshare', '--user', '--map-root-user', '--mount', '--pid', '--fork', '--kill-child',
+                '--mount-proc', '--net', '--ipc', '--uts', '--']
+
+    def _cgroup_usable(self, root: str) -> bool:
+        controllers = os.path.join(root, 'cgroup.subtree_control')
+        if not os.access(root, os.W_OK) or not os.path.exists(controllers):
+            self.logger.warning(f"cgroup root {root} is not a writable cgroup v2 directory; "
+                                "running without cgroup limits")
+            return False
+        return True
+
+    def _write(self, path: str, name: str, value: str):
+        with open(os.path.join(path, name), 'w') as f:
+            f.write(value)
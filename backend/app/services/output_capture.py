@@ -0,0 +1,55 @@
+"""Bounded capture of program output"""
+import codecs
+from typing import Dict, List
+
+
+class BoundedOutput:
+    """
+    Accumulate program output up to a byte limit.
+
+    Chunks are decoded with one incremental UTF-8 decoder per stream, so a
+    multi-byte character split across reads is not mangled. Once the limit
+    is reached `truncated` is set and callers are expected to stop reading
+    and kill the program.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.total_bytes = 0
+        self.kept_bytes = 0
+        self.truncated = False
+        self._decoders: Dict[str, codecs.IncrementalDecoder] = {}
+        self._parts: List[str] = []
+
+    def feed(self, data: bytes, stream: str = 'stdout') -> str:
+        """Add a chunk and return the newly decoded text that fits within the limit"""
+        if not data:
+            return ''
+        self.total_bytes += len(data)
+        room = self.limit - self.kept_bytes
+        if len(data) > room:
+            data = data[:max(room, 0)]
+            self.truncated = True
+        if not data:
+            return ''
+        self.kept_bytes += len(data)
+        decoder = self._decoders.get(stream)
+        if decoder is None:
+            decoder = self._decoders[stream] = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        text = decoder.decode(data)
+        if text:
+            self._parts.append(text)
+        return text
+
+    @property
+    def text(self) -> str:
+        if not self.truncated:
+            # Flush incomplete trailing sequences; a truncated tail is simply dropped
+            for decoder in self._decoders.values():
+                tail = decoder.decode(b'', final=True)
+                if tail:
+                    self._parts.append(tail)
+        return ''.join(self._parts)
+
+    def notice(self) -> str:
+        return f"Output limit exceeded: stopped after {self.limit} bytes"
@@ -0,0 +1,69 @@
+"""Coalescing of identical concurrent calls into one execution"""
+import copy
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Run `fn` once per key among concurrent callers.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive with the same key while it is in flight block until it finishes
+    and receive their own deep copy of its result, or the same exception.
+    Nothing is remembered once the call completes.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'executions': 0, 'coalesced': 0, 'in_flight': 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (result, shared); `shared` is True for callers served by another caller's run"""
+        with self._lock:
+            self._stats['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats['coalesced'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._stats['executions'] += 1
+                self._stats['in_flight'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self._stats['in_flight'] -= 1
+                waiters = call.waiters
+            if waiters and call.error is None:
+                # Waiters copy from a private snapshot, so the leader's caller may mutate its result
+                call.result = copy.deepcopy(result)
+            call.done.set()
+        return result, False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats)
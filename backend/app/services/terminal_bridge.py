@@ -0,0 +1,238 @@
+"""Event-driven bridge between a terminal WebSocket and its container's Docker attach socket"""
+import selectors
+import socket
+import threading
+from typing import List, Optional, Tuple
+
+# Bytes read from the attach socket per wakeup
+CHUNK_SIZE = 64 * 1024
+# Longest a keystroke write waits for the attach socket to drain
+SEND_TIMEOUT = 5.0
+
+
+def send_all(sock, data: bytes, timeout: float = SEND_TIMEOUT):
+    """sendall() for a non-blocking socket: waits for writability instead of spinning"""
+    view = memoryview(data)
+    with selectors.DefaultSelector() as selector:
+        registered = False
+        while view:
+            try:
+                sent = sock.send(view)
+            except BlockingIOError:
+                if not registered:
+                    selector.register(sock, selectors.EVENT_WRITE)
+                    registered = True
+                if not selector.select(timeout):
+                    raise TimeoutError("Terminal input not accepted by the container")
+                continue
+            if sent == 0:
+                raise ConnectionError("Socket connection broken")
+            view = view[sent:]
+
+
+def normalize_input(message) -> bytes:
+    """WebSocket message as bytes for the program's stdin; xterm sends Enter as \\r"""
+    payload = message if isinstance(message, (bytes, bytearray)) else str(message).encode("utf-8")
+    return bytes(payload).replace(b'\r', b'\n')
+
+
+def open_terminal(manager, session_id: Optional[str], token: Optional[str],
+                  logger) -> Tuple[Optional[object], Optional[object], List[str]]:
+    """
+    Checks a /ws/terminal connection and attaches to the session's container.
+
+    Returns (session, attach socket, messages). Without an attach socket the
+    connection is refused and the messages are sent before closing it. Shared
+    by the flask-sock route and the asyncio gateway so both speak the same
+    protocol.
+    """
+    logger.info(f"[WS_DEBUG] Connection attempt sessionId={session_id} has_token={bool(token)}")
+    if not session_id:
+        logger.warning("[WS_DEBUG] Reject missing sessionId")
+        return None, None, ["Missing sessionId"]
+    session = manager.get_session(session_id)
+    if not session:
+        logger.warning("[WS_DEBUG] Reject invalid session")
+        return None, None, ["Session invalid"]
+    logger.info(f"[WS_DEBUG] Session found container_id={session.container_id} active={session.active}")
+    if manager.require_auth:
+        logger.info("[WS_DEBUG] Auth required")
+        user = manager.resolve_user(token)
+        if not user or (session.user_id and user.id != session.user_id):
+            logger.warning("[WS_DEBUG] Reject unauthorized")
+            return session, None, ["Unauthorized"]
+        logger.info(f"[WS_DEBUG] Auth ok user_id={user.id}")
+    else:
+        logger.info("[WS_DEBUG] Auth disabled")
+    session.touch()
+    if session.attach_socket is not None:
+        # A reconnect: the open attach stream carries the exit (EOF) if the program has ended
+        return session, session.attach_socket, []
+    try:
+        container = manager.docker_client.containers.get(session.container_id)
+        logger.info(f"[WS_DEBUG] Container status {container.status}")
+        if container.status != 'running':
+            messages = []
+            logs = container.logs(stdout=True, stderr=True).decode('utf-8', errors='replace')
+            if logs:
+                messages.append(logs)
+            messages.append(f"\r\nContainer exited with status: {container.status}\r\n")
+            manager.stop_session(session_id)
+            return session, None, messages
+    except Exception as e:
+        logger.error(f"[WS_DEBUG] Container check failed: {e}")
+        manager.stop_session(session_id)
+        return session, None, []
+
+    # On Windows with Docker Desktop, attach_socket returns a named pipe rather than a socket
+    attach_socket = manager.attach_socket(session_id)
+    if not attach_socket:
+        logger.error("[WS_DEBUG] Socket attach failed")
+        return session, None, ["Unable to attach to session"]
+    return session, attach_socket, []
+
+
+class TerminalBridge:
+    """
+    Copies container output to the WebSocket and keystrokes to the container.
+
+    The calling thread sleeps in a selector on the attach socket and a wakeup
+    pipe; a second thread sleeps in ws.receive(). Neither polls, so an idle
+    session costs no CPU and a keystroke is forwarded as soon as it arrives.
+
+    Output goes through the session's ring (session.record_output) and is sent
+    by the thread that read it, so a slow client stops reads from the attach
+    socket: the program blocks on write once the kernel buffers fill, and the
+    server never holds more than one ring of output per session.
+
+    `offset` is how much output the client already has (from an earlier
+    connection); the rest of what the ring holds is sent before anything new.
+    """
+
+    def __init__(self, ws, attach_socket, session, logger, offset: int = 0):
+        self.ws = ws
+        self.attach_socket = attach_socket
+        self.session = session
+        self.logger = logger
+        self._wake_reader, self._wake_writer = socket.socketpair()
+        self._wake_reader.setblocking(False)
+        self._stopped = threading.Event()
+        self._blocking = False
+        self.read_size = max(1, min(CHUNK_SIZE, session.output.capacity // 2))
+        self.sent = min(max(offset, 0), session.output.end)
+
+    def run(self) -> str:
+        """Bridge until either side closes or stop() is called; returns why it ended"""
+        input_thread = threading.Thread(target=self._forward_input, daemon=True,
+                                        name=f"terminal-input-{self.session.session_id}")
+        self.session.take_over(self.stop)
+        input_thread.start()
+        try:
+            if not self._send_pending():
+                return 'closed'
+            return self._forward_output()
+        finally:
+            self._stopped.set()
+            self._wake_reader.close()
+            self._wake_writer.close()
+
+    def stop(self):
+        """Ends run() from any thread"""
+        if not self._stopped.is_set():
+            self._stopped.set()
+            try:
+                self._wake_writer.send(b'\0')
+            except OSError:
+                pass
+
+    def _forward_output(self) -> str:
+        selector = selectors.DefaultSelector()
+        try:
+            selector.register(self.attach_socket, selectors.EVENT_READ)
+        except (ValueError, OSError, AttributeError, TypeError):
+            # Docker Desktop named pipes cannot be selected on; block in recv() instead
+            selector.close()
+            return self._forward_output_blocking()
+        selector.register(self._wake_reader, selectors.EVENT_READ)
+        with selector:
+            while not self._stopped.is_set():
+                for key, _ in selector.select():
+                    if key.fileobj is self._wake_reader:
+                        return 'closed'
+                    try:
+                        chunk = self.attach_socket.recv(self.read_size)
+                    except (BlockingIOError, InterruptedError):
+                        continue
+                    except OSError as e:
+                        self.logger.info(f"Docker attach socket error: {e}")
+                        return 'container_exited'
+                    if not chunk:
+                        return 'container_exited'
+                    reason = self._send_output(chunk)
+                    if reason:
+                        return reason
+        return 'closed'
+
+    def _forward_output_blocking(self) -> str:
+        self._blocking = True
+        if hasattr(self.attach_socket, 'settimeout'):
+            self.attach_socket.settimeout(None)
+        while not self._stopped.is_set():
+            try:
+                chunk = self.attach_socket.recv(self.read_size)
+            except Exception as e:
+                if self._stopped.is_set():
+                    break  # _forward_input closed the pipe
+                # "The pipe has been ended" (Windows error 109) once the container is gone
+                self.logger.info(f"Docker pipe ended: {e}")
+                return 'container_exited'
+            if not chunk:
+                return 'closed' if self._stopped.is_set() else 'container_exited'
+            reason = self._send_output(chunk)
+            if reason:
+                return reason
+        return 'closed'
+
+    def _send_output(self, chunk: bytes) -> Optional[str]:
+        """Records a chunk and sends everything not yet sent; returns a reason to stop, if any"""
+        within_limit = self.session.record_output(chunk)
+        if not self._send_pending():
+            return 'closed'
+        return None if within_limit else 'output_limit'
+
+    def _send_pending(self) -> bool:
+        """Sends the ring's output from self.sent on; False if the client is gone"""
+        pending, self.sent = self.session.output.read_from(self.sent)
+        if not pending:
+            return True
+        try:
+            self.ws.send(pending)
+        except Exception as e:
+            self.logger.info(f"WebSocket send failed: {e}")
+            return False
+        return True
+
+    def _forward_input(self):
+        try:
+            while not self._stopped.is_set():
+                message = self.ws.receive()
+                if message is None:
+                    continue
+                payload = normalize_input(message)
+                if payload and not self._stopped.is_set():
+                    self.session.touch()
+                    send_all(self.attach_socket, payload)
+        except Exception as e:
+            # ConnectionClosed from the WebSocket, or the container went away mid-write
+            self.logger.info(f"Terminal input closed: {e}")
+        finally:
+            self.stop()
+            if self._blocking:
+                # Nothing to wake in blocking mode; closing the pipe ends the pending recv()
+                try:
+                    self.attach_socket.close()
+                except Exception:
+                    pass
+                if self.session.attach_socket is self.attach_socket:
+                    self.session.attach_socket = None  # a reconnect attaches afresh
+
@@ -0,0 +1,157 @@
+"""asyncio terminal gateway: every /ws/terminal session multiplexed on one event loop (see app/asgi.py)"""
+import asyncio
+import socket
+from concurrent.futures import Executor
+from typing import Optional
+from urllib.parse import parse_qs
+
+from app.services.terminal_bridge import CHUNK_SIZE, normalize_input, open_terminal
+from app.services.terminal_sessions import get_terminal_manager
+
+
+def query_param(scope, name: str) -> Optional[str]:
+    values = parse_qs(scope.get('query_string', b'').decode('latin-1')).get(name)
+    return values[0] if values else None
+
+
+def query_offset(scope) -> int:
+    try:
+        return int(query_param(scope, 'offset') or 0)
+    except ValueError:
+        return 0
+
+
+class TerminalGateway:
+    """
+    ASGI handler for /ws/terminal, speaking the same protocol as the flask-sock route.
+
+    A session is two coroutines on the event loop: one copies the Docker attach
+    stream to the WebSocket, the other copies WebSocket messages to the program's
+    stdin. No thread is held while a session is open; the blocking connect-time
+    checks (database, Docker) and the container removal run on `executor`.
+
+    The attach socket belongs to the session, not the connection: a client that
+    disconnects leaves it open for a reconnect (see release_session), so it is
+    read with loop.sock_recv() rather than wrapped in a stream that would close it.
+    """
+
+    def __init__(self, flask_app, executor: Executor, manager=None):
+        self.flask_app = flask_app
+        self.executor = executor
+        self._manager = manager
+        self.active = 0
+
+    @property
+    def manager(self):
+        return self._manager or get_terminal_manager()
+
+    async def __call__(self, scope, receive, send):
+        message = await receive()
+        if message['type'] != 'websocket.connect':
+            return
+        await send({'type': 'websocket.accept'})
+        loop = asyncio.get_running_loop()
+        session, attach_socket, messages = await loop.run_in_executor(
+            self.executor, self._open, query_param(scope, 'sessionId'), query_param(scope, 'token'))
+        for text in messages:
+            await send({'type': 'websocket.send', 'text': text})
+        if attach_socket is None:
+            await send({'type': 'websocket.close', 'code': 1000})
+            return
+
+        replaced = asyncio.Event()
+
+        def stop():
+            # Called by a reconnect or stop_session, from any thread
+            try:
+                loop.call_soon_threadsafe(replaced.set)
+            except RuntimeError:
+                pass  # the event loop has shut down
+
+        self.active += 1
+        logger = self.flask_app.logger
+        reason = None
+        try:
+            reason = await self._bridge(session, attach_socket, query_offset(scope), stop, replaced, receive, send)
+            logger.info(f"[WS_DEBUG] Gateway bridge ended session={session.session_id} reason={reason}")
+            if reason != 'disconnected':
+                await send({'type': 'websocket.close', 'code': 1000})
+        except Exception as e:
+            logger.error(f"Gateway bridge error: {e}")
+        finally:
+            self.active -= 1
+            if reason in ('disconnected', 'stopped'):
+                await loop.run_in_executor(self.executor, self.manager.release_session, session.session_id, stop)
+            else:
+                await loop.run_in_executor(self.executor, self.manager.stop_session, session.session_id)
+
+    def _open(self, session_id: Optional[str], token: Optional[str]):
+        with self.flask_app.app_context():
+            session, attach_socket, messages = open_terminal(
+                self.manager, session_id, token, self.flask_app.logger)
+        if attach_socket is not None and not isinstance(attach_socket, socket.socket):
+            # A Docker Desktop named pipe; only the threaded route can drive it
+            self.manager.stop_session(session_id)
+            return session, None, ["Unable to attach to session"]
+        return session, attach_socket, messages
+
+    async def _bridge(self, session, attach_socket: socket.socket, offset: int, stop,
+                      replaced: asyncio.Event, receive, send) -> str:
+        session.take_over(stop)
+        tasks = {
+            asyncio.ensure_future(self._forward_output(session, attach_socket, offset, send)),
+            asyncio.ensure_future(self._forward_input(session, receive, attach_socket)),
+            asyncio.ensure_future(self._wait_replaced(replaced))
+        }
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return done.pop().result()
+
+    async def _forward_output(self, session, attach_socket: socket.socket, offset: int, send) -> str:
+        # The next read waits for this send, so a slow client pauses the attach socket
+        # like TerminalBridge. The first pass sends what the client missed since `offset`
+        loop = asyncio.get_running_loop()
+        read_size = max(1, min(CHUNK_SIZE, session.output.capacity // 2))
+        sent = min(max(offset, 0), session.output.end)
+        within_limit = True
+        while True:
+            pending, sent = session.output.read_from(sent)
+            if pending:
+                try:
+                    await send({'type': 'websocket.send', 'bytes': pending})
+                except OSError:
+                    return 'disconnected'
+            if not within_limit:
+                return 'output_limit'
+            try:
+                chunk = await loop.sock_recv(attach_socket, read_size)
+            except OSError:
+                return 'container_exited'
+            if not chunk:
+                return 'container_exited'
+            within_limit = session.record_output(chunk)
+
+    async def _forward_input(self, session, receive, attach_socket: socket.socket) -> str:
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                return 'disconnected'
+            payload = normalize_input(message.get('bytes') or message.get('text') or b'')
+            if not payload:
+                continue
+            session.touch()
+            try:
+                await loop.sock_sendall(attach_socket, payload)
+            except OSError:
+                return 'container_exited'
+
+    @staticmethod
+    async def _wait_replaced(replaced: asyncio.Event) -> str:
+        # A reconnect took the session over, or the session was stopped
+        await replaced.wait()
+        return 'stopped'
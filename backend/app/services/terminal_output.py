@@ -0,0 +1,58 @@
+"""Bounded per-session terminal output: a byte ring addressed by absolute stream offsets"""
+import threading
+from typing import Tuple
+
+
+class OutputRing:
+    """
+    Keeps the last `capacity` bytes of a session's output.
+
+    Offsets count every byte the program ever wrote, so a reader remembers
+    where it stopped and asks for the rest. Bytes older than `start` have been
+    overwritten; a read from before `start` returns what is still held.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._end = 0
+        self._lock = threading.Lock()
+
+    @property
+    def end(self) -> int:
+        """Offset just past the newest byte, i.e. total bytes written"""
+        return self._end
+
+    @property
+    def start(self) -> int:
+        """Offset of the oldest byte still held"""
+        return max(0, self._end - self.capacity)
+
+    def write(self, data: bytes):
+        if not data:
+            return
+        with self._lock:
+            if len(data) > self.capacity:
+                self._end += len(data) - self.capacity
+                data = data[-self.capacity:]
+            position = self._end % self.capacity
+            first = min(len(data), self.capacity - position)
+            self._buffer[position:position + first] = data[:first]
+            self._buffer[:len(data) - first] = data[first:]
+            self._end += len(data)
+
+    def read(self, offset: int) -> bytes:
+        """Everything from `offset` (or from `start`, if that is later) up to `end`"""
+        return self.read_from(offset)[0]
+
+    def read_from(self, offset: int) -> Tuple[bytes, int]:
+        """read(), plus the offset to read from next; atomic with respect to writers"""
+        with self._lock:
+            offset = min(max(offset, self.start), self._end)
+            length = self._end - offset
+            position = offset % self.capacity
+            first = min(length, self.capacity - position)
+            data = bytes(self._buffer[position:position + first]) + bytes(self._buffer[:length - first])
+            return data, self._end
@@ -1,23 +1,37 @@
 import os
 import re
+import math
+import heapq
 import time
 import uuid
 import shutil
-import tempfile
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import docker
 import requests
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from app.config import Config
-from app import db
+from app.services.execution_cache import class_cache_key, get_class_cache, read_class_files, write_class_files
+from app.services.workspaces import HostWorkspaceProvider, parse_size
+from app.services.jvm_options import container_run_flags
+from app.services.terminal_output import OutputRing
+from app.services.metrics import DOCKER_CALL_SECONDS, TERMINAL_SESSIONS_REAPED_TOTAL, TERMINAL_SESSIONS_TOTAL
+from app.middleware.auth import resolve_token_user
 from app.models.user import User
-from flask_jwt_extended import decode_token
+
+
+# Containers removed in parallel when a batch of sessions expires together
+REAP_WORKERS = 8
+OUTPUT_LIMIT_NOTICE = "\r\n[Output limit of {limit} bytes reached; the program was stopped]\r\n"
 
 
 def _extract_class_name(java_code: str) -> str:
     match = re.search(r'\bclass\s+([A-Za-z_][A-Za-z0-9_]*)', java_code)
     return match.group(1) if match else "Main"
 
+def _docker_timer(phase: str, call: str):
+    return DOCKER_CALL_SECONDS.time(component='terminal', phase=phase, call=call)
+
 def _create_docker_client() -> docker.DockerClient:
     try:
         client = docker.from_env()
@@ -28,7 +42,8 @@ def _create_docker_client() -> docker.DockerClient:
 
 
 class TerminalSession:
-    def __init__(self, session_id: str, container_id: str, temp_dir: str, user_id: Optional[int]):
+    def __init__(self, session_id: str, container_id: str, temp_dir: str, user_id: Optional[int],
+                 output_limit: int = 0, buffer_size: int = 65536):
         self.session_id = session_id
         self.container_id = container_id
         self.temp_dir = temp_dir
@@ -36,68 +51,148 @@ class TerminalSession:
         self.created_at = time.time()
         self.last_activity = time.time()
         self.output_bytes = 0
+        self.output_limit = output_limit  # 0 = unlimited
+        self.output = OutputRing(buffer_size)
         self.active = True
+        # Docker attach stream, opened on first connect and kept across reconnects
+        self.attach_socket = None
+        # Held while the attach stream is opened or closed, so concurrent connects open only one
+        self.attach_lock = threading.Lock()
+        # Set while no client is connected; the session is stopped if none returns in time
+        self.detached_at: Optional[float] = None
+        # Deadline of this session's live entry in the manager's heap
+        self.scheduled_deadline = math.inf
+        self._stop_connection: Optional[Callable[[], None]] = None
+        self._connection_lock = threading.Lock()
+
+    def record_output(self, chunk: bytes) -> bool:
+        """
+        Appends program output to the session's ring, up to the output limit.
+
+        Past the limit the rest is dropped and a truncation notice goes in its
+        place; returns False then, and the caller stops the program.
+        """
+        self.touch()
+        if self.output_limit and self.output_bytes + len(chunk) > self.output_limit:
+            chunk = chunk[:max(0, self.output_limit - self.output_bytes)]
+            self.output_bytes += len(chunk)
+            self.output.write(chunk)
+            self.output.write(OUTPUT_LIMIT_NOTICE.format(limit=self.output_limit).encode())
+            TERMINAL_SESSIONS_REAPED_TOTAL.inc(reason='output_limit')
+            return False
+        self.output_bytes += len(chunk)
+        self.output.write(chunk)
+        return True
 
     def touch(self):
+        # Just a timestamp: the reaper re-reads it when the session's old deadline comes up
         self.last_activity = time.time()
 
+    def deadline(self, max_runtime: float, idle_timeout: float, reconnect_grace: float = math.inf) -> float:
+        deadline = min(self.created_at + max_runtime, self.last_activity + idle_timeout)
+        if self.detached_at is not None:
+            deadline = min(deadline, self.detached_at + reconnect_grace)
+        return deadline
+
+    def take_over(self, stop: Callable[[], None]):
+        """Makes the calling connection the session's client; `stop` ends it. A previous client is stopped"""
+        with self._connection_lock:
+            previous, self._stop_connection = self._stop_connection, stop
+            self.detached_at = None
+        if previous is not None:
+            previous()
+
+    def end_connection(self):
+        """Stops the connected client's bridge, if any"""
+        with self._connection_lock:
+            stop = self._stop_connection
+        if stop is not None:
+            stop()
+
+    def release(self, stop: Callable[[], None]) -> bool:
+        """A connection ended; True if it was still the session's client (not replaced by a reconnect)"""
+        with self._connection_lock:
+            if self._stop_connection != stop:
+                return False
+            self._stop_connection = None
+            self.detached_at = time.time()
+            return True
+
 
 class TerminalSessionManager:
     def __init__(self):
         self.docker_client = _create_docker_client()
         self.api_client = self.docker_client.api
         self.image = Config.DOCKER_IMAGE
+        self.compile_image = Config.JAVA_COMPILE_IMAGE or self.image
+        self.runtime_image = Config.JAVA_RUNTIME_IMAGE or self.image
         self.memory_limit = Config.JAVA_MEMORY_LIMIT
         self.cpu_limit = Config.JAVA_CPU_LIMIT
         self.idle_timeout = Config.TERMINAL_IDLE_TIMEOUT
         self.max_runtime = Config.TERMINAL_MAX_RUNTIME
         self.output_limit = Config.TERMINAL_OUTPUT_LIMIT
+        self.buffer_size = Config.TERMINAL_BUFFER_SIZE
+        self.reconnect_grace = Config.TERMINAL_RECONNECT_GRACE
         self.require_auth = Config.TERMINAL_REQUIRE_AUTH
+        self.class_cache = get_class_cache()
+        self.jvm_flags = " ".join(container_run_flags())
+        # Session containers bind-mount their workspace, so only host directories apply here;
+        # "tmpfs" and "container" both keep them on the tmpfs mount
+        self.workspaces = HostWorkspaceProvider(
+            Config.JAVA_WORKSPACE_TMPFS_DIR if Config.JAVA_WORKSPACE in ('tmpfs', 'container') else None,
+            parse_size(Config.JAVA_WORKSPACE_QUOTA)
+        )
         self.sessions: Dict[str, TerminalSession] = {}
         self.lock = threading.Lock()
+        # (deadline, session_id), at most one entry per session; see _reap_expired
+        self._deadlines: List[Tuple[float, str]] = []
+        self._deadlines_changed = threading.Condition(self.lock)
+        self._reaper: Optional[threading.Thread] = None
+        self._reap_pool = ThreadPoolExecutor(max_workers=REAP_WORKERS, thread_name_prefix='terminal-reap')
 
     def resolve_user(self, token: Optional[str]) -> Optional[User]:
-        if not token:
-            return None
-        try:
-            decoded = decode_token(token)
-            identity = decoded.get("sub")
-            user_id = int(identity) if isinstance(identity, str) and str(identity).isdigit() else identity
-            return db.session.get(User, user_id)
-        except Exception:
-            return None
+        return resolve_token_user(token)
 
-    def _ensure_image(self):
+    def _ensure_image(self, image: str):
         try:
-            self.docker_client.images.get(self.image)
+            with _docker_timer('image', 'get'):
+                self.docker_client.images.get(image)
         except docker.errors.ImageNotFound:
             base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "docker_env", "java17"))
-            self.docker_client.images.build(path=base_dir, tag=self.image)
+            # A separate runtime image is the jlink target; anything else gets the full JDK
+            target = "runtime" if image == self.runtime_image != self.compile_image else "jdk"
+            with _docker_timer('image', 'build'):
+                self.docker_client.images.build(path=base_dir, tag=image, target=target)
 
     def _docker_compile(self, code_dir: str, class_name: str) -> Dict:
         start_time = time.time()
         container = None
         try:
-            self._ensure_image()
+            self._ensure_image(self.compile_image)
             nano_cpus = int(self.cpu_limit * 1_000_000_000) if self.cpu_limit > 0 else None
-            container = self.docker_client.containers.create(
-                image=self.image,
-                command=["/opt/jdk-17.0.12/bin/javac", "-d", "/app/workspace", f"{class_name}.java"],
-                volumes={code_dir: {"bind": "/app/workspace", "mode": "rw"}},
-                working_dir="/app/workspace",
-                mem_limit=self.memory_limit,
-                nano_cpus=nano_cpus,
-                network_disabled=True,
-                read_only=True,
-                tmpfs={"/tmp": "size=50m"},
-                user="runner",
-                detach=True
-            )
-            container.start()
-            result = container.wait(timeout=Config.JAVA_TIMEOUT)
+            with _docker_timer('compile', 'create'):
+                container = self.docker_client.containers.create(
+                    image=self.compile_image,
+                    command=["/opt/jdk-17.0.12/bin/javac", "-d", "/app/workspace", f"{class_name}.java"],
+                    volumes={code_dir: {"bind": "/app/workspace", "mode": "rw"}},
+                    working_dir="/app/workspace",
+                    mem_limit=self.memory_limit,
+                    nano_cpus=nano_cpus,
+                    network_disabled=True,
+                    read_only=True,
+                    tmpfs={"/tmp": "size=50m"},
+                    user="runner",
+                    detach=True
+                )
+            with _docker_timer('compile', 'start'):
+                container.start()
+            with _docker_timer('compile', 'wait'):
+                result = container.wait(timeout=Config.JAVA_TIMEOUT)
             exit_code = result.get("StatusCode", 1)
-            logs = container.logs(stdout=True, stderr=True).decode("utf-8")
-            container.remove()
+            with _docker_timer('compile', 'logs'):
+                logs = container.logs(stdout=True, stderr=True).decode("utf-8")
+            with _docker_timer('compile', 'remove'):
+                container.remove()
             if exit_code == 0:
                 return {"success": True, "errors": [], "compilation_time": time.time() - start_time}
             return {
@@ -107,8 +202,10 @@ class TerminalSessionManager:
             }
         except requests.exceptions.ReadTimeout:
             if container:
-                container.kill()
-                container.remove(force=True)
+                with _docker_timer('compile', 'kill'):
+                    container.kill()
+                with _docker_timer('compile', 'remove'):
+                    container.remove(force=True)
             return {
                 "success": False,
                 "errors": [{"type": "timeout", "line": 0, "column": 0, "message": f"Compilation timeout ({Config.JAVA_TIMEOUT}s)"}],
@@ -126,44 +223,71 @@ class TerminalSessionManager:
                 "compilation_time": time.time() - start_time
             }
 
+    def _compile_cached(self, java_code: str, code_dir: str, class_name: str) -> Dict:
+        if not self.class_cache.enabled:
+            return self._docker_compile(code_dir, class_name)
+        cache_key = class_cache_key(java_code, self.compile_image.lower())
+        classes = self.class_cache.get(cache_key)
+        if classes is not None:
+            write_class_files(code_dir, classes)
+            return {"success": True, "errors": [], "compilation_time": 0.0, "compilation_cached": True}
+        compile_result = self._docker_compile(code_dir, class_name)
+        if compile_result["success"]:
+            self.class_cache.put(cache_key, read_class_files(code_dir))
+        return compile_result
+
     def start_session(self, java_code: str, user_id: Optional[int]) -> Dict:
-        temp_dir = tempfile.mkdtemp(prefix="codemaster-java-")
+        workspace = self.workspaces.create()
+        temp_dir = workspace.path
         class_name = _extract_class_name(java_code)
-        java_file = os.path.join(temp_dir, f"{class_name}.java")
-        with open(java_file, "w", encoding="utf-8") as f:
-            f.write(java_code)
-        compile_result = self._docker_compile(temp_dir, class_name)
+        try:
+            workspace.write_files({f"{class_name}.java": java_code.encode("utf-8")})
+        except Exception as e:
+            workspace.cleanup()
+            TERMINAL_SESSIONS_TOTAL.inc(outcome="system_error")
+            return {"success": False, "errors": [{"type": "system_error", "line": 0, "column": 0, "message": str(e)}],
+                    "compilation_time": 0}
+        compile_result = self._compile_cached(java_code, temp_dir, class_name)
         if not compile_result["success"]:
             shutil.rmtree(temp_dir, ignore_errors=True)
+            TERMINAL_SESSIONS_TOTAL.inc(outcome=compile_result["errors"][0]["type"])
             return {"success": False, "errors": compile_result["errors"], "compilation_time": compile_result["compilation_time"]}
         try:
-            self._ensure_image()
+            self._ensure_image(self.runtime_image)
             nano_cpus = int(self.cpu_limit * 1_000_000_000) if self.cpu_limit > 0 else None
             # Create container with unbuffered output to ensure prompts appear immediately
-            container = self.docker_client.containers.create(
-                image=self.image,
-                command=["/usr/bin/script", "-qfc", f"/usr/bin/stdbuf -o0 -e0 /opt/jdk-17.0.12/bin/java -cp /app/workspace {class_name}", "/dev/null"],
-                volumes={temp_dir: {"bind": "/app/workspace", "mode": "rw"}},
-                working_dir="/app/workspace",
-                mem_limit=self.memory_limit,
-                nano_cpus=nano_cpus,
-                network_disabled=True,
-                read_only=True,
-                tmpfs={"/tmp": "size=50m"},
-                user="runner",
-                detach=True,
-                stdin_open=True,
-                tty=True
-            )
-            container.start()
+            with _docker_timer('session', 'create'):
+                container = self.docker_client.containers.create(
+                    image=self.runtime_image,
+                    command=["/usr/bin/script", "-qfc", f"/usr/bin/stdbuf -o0 -e0 /opt/jdk-17.0.12/bin/java {self.jvm_flags} -cp /app/workspace {class_name}", "/dev/null"],
+                    volumes={temp_dir: {"bind": "/app/workspace", "mode": "rw"}},
+                    working_dir="/app/workspace",
+                    mem_limit=self.memory_limit,
+                    nano_cpus=nano_cpus,
+                    network_disabled=True,
+                    read_only=True,
+                    tmpfs={"/tmp": "size=50m"},
+                    user="runner",
+                    detach=True,
+                    stdin_open=True,
+                    tty=True
+                )
+            with _docker_timer('session', 'start'):
+                container.start()
             session_id = str(uuid.uuid4())
-            session = TerminalSession(session_id=session_id, container_id=container.id, temp_dir=temp_dir, user_id=user_id)
-            with self.lock:
-                self.sessions[session_id] = session
-            self._start_monitor(session_id)
-            return {"success": True, "session_id": session_id, "compilation_time": compile_result["compilation_time"]}
+            session = TerminalSession(session_id=session_id, container_id=container.id, temp_dir=temp_dir, user_id=user_id,
+                                      output_limit=self.output_limit, buffer_size=self.buffer_size)
+            self._add_session(session)
+            TERMINAL_SESSIONS_TOTAL.inc(outcome="started")
+            return {
+                "success": True,
+                "session_id": session_id,
+                "compilation_time": compile_result["compilation_time"],
+                "compilation_cached": compile_result.get("compilation_cached", False)
+            }
         except Exception as e:
             shutil.rmtree(temp_dir, ignore_errors=True)
+            TERMINAL_SESSIONS_TOTAL.inc(outcome="system_error")
             return {"success": False, "errors": [{"type": "system_error", "line": 0, "column": 0, "message": str(e)}]}
 
     def get_session(self, session_id: str) -> Optional[TerminalSession]:
@@ -171,57 +295,132 @@ class TerminalSessionManager:
             return self.sessions.get(session_id)
 
     def attach_socket(self, session_id: str):
+        """The session's attach stream; opened once, so a reconnect resumes where the last client stopped"""
         session = self.get_session(session_id)
         if not session:
             return None
-        socket = self.api_client.attach_socket(
-            session.container_id,
-            params={"stdin": 1, "stdout": 1, "stderr": 1, "stream": 1, "logs": 1}
-        )
-        try:
-            if hasattr(socket, '_sock'):
-                sock = socket._sock
-            else:
-                sock = socket
-            if hasattr(sock, 'setblocking'):
-                sock.setblocking(False)
-            if hasattr(sock, 'settimeout'):
-                sock.settimeout(0.01)
+        with session.attach_lock:
+            if not session.active:
+                return None
+            if session.attach_socket is not None:
+                return session.attach_socket
+            # Docker replays the output written before this first attach (logs=1); a
+            # reopened stream must not replay what the session's ring already holds
+            logs = 0 if session.output.end else 1
+            with _docker_timer('session', 'attach'):
+                socket = self.api_client.attach_socket(
+                    session.container_id,
+                    params={"stdin": 1, "stdout": 1, "stderr": 1, "stream": 1, "logs": logs}
+                )
+            try:
+                if hasattr(socket, '_sock'):
+                    sock = socket._sock
+                else:
+                    sock = socket
+                # Non-blocking for the selector in TerminalBridge
+                if hasattr(sock, 'setblocking'):
+                    sock.setblocking(False)
+            except Exception as e:
+                print(f"Warning: Failed to make socket non-blocking: {e}")
+                sock = socket._sock if hasattr(socket, '_sock') else socket
+            session.attach_socket = sock
             return sock
-        except Exception as e:
-            print(f"Warning: Failed to set socket timeout: {e}")
-            return socket._sock if hasattr(socket, '_sock') else socket
+
+    def release_session(self, session_id: str, stop: Callable[[], None]):
+        """
+        A client disconnected. Unless it was replaced by a reconnect, the program
+        keeps running for `reconnect_grace` seconds; with no grace it is stopped now.
+        """
+        session = self.get_session(session_id)
+        if not session or not session.release(stop):
+            return
+        if self.reconnect_grace <= 0:
+            self.stop_session(session_id)
+            return
+        with self.lock:
+            self._schedule(session)
 
     def stop_session(self, session_id: str):
         session = self.get_session(session_id)
         if not session:
             return
         session.active = False
+        session.end_connection()
+        with session.attach_lock:
+            if session.attach_socket is not None:
+                try:
+                    session.attach_socket.close()
+                except Exception:
+                    pass
         try:
-            container = self.docker_client.containers.get(session.container_id)
-            container.remove(force=True)
+            with _docker_timer('session', 'remove'):
+                container = self.docker_client.containers.get(session.container_id)
+                container.remove(force=True)
         except Exception:
             pass
         shutil.rmtree(session.temp_dir, ignore_errors=True)
         with self.lock:
             self.sessions.pop(session_id, None)
 
-    def _start_monitor(self, session_id: str):
-        def monitor():
+    def _add_session(self, session: TerminalSession):
+        with self.lock:
+            self.sessions[session.session_id] = session
+            self._schedule(session)
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap_forever, daemon=True, name='terminal-reaper')
+                self._reaper.start()
+
+    def _schedule(self, session: TerminalSession):
+        """Queues the session's deadline if it moved earlier; later deadlines are found lazily. Holds self.lock"""
+        deadline = session.deadline(self.max_runtime, self.idle_timeout, self.reconnect_grace)
+        if deadline >= session.scheduled_deadline:
+            return
+        session.scheduled_deadline = deadline
+        heapq.heappush(self._deadlines, (deadline, session.session_id))
+        if self._deadlines[0][1] == session.session_id:
+            self._deadlines_changed.notify()
+
+    def _reap_forever(self):
+        while True:
+            expired = self._reap_expired()
+            # Removals are slow Docker calls; a batch that expired together is removed in parallel
+            list(self._reap_pool.map(self.stop_session, expired))
+
+    def _reap_expired(self) -> List[str]:
+        """
+        Waits for and returns the sessions past their max runtime or idle timeout.
+
+        touch() doesn't reorder the heap. When an entry comes due, its session's
+        deadline is recomputed, and the entry is pushed back if the session was
+        active since it was queued. So activity costs O(1), and each expiry or
+        re-arm costs O(log n). An entry superseded by an earlier one from
+        _schedule (a disconnect) is dropped when it comes up.
+        """
+        with self._deadlines_changed:
             while True:
-                session = self.get_session(session_id)
-                if not session or not session.active:
-                    return
                 now = time.time()
-                if now - session.created_at > self.max_runtime:
-                    self.stop_session(session_id)
-                    return
-                if now - session.last_activity > self.idle_timeout:
-                    self.stop_session(session_id)
-                    return
-                time.sleep(1)
-        thread = threading.Thread(target=monitor, daemon=True)
-        thread.start()
+                expired = []
+                while self._deadlines and self._deadlines[0][0] <= now:
+                    queued, session_id = heapq.heappop(self._deadlines)
+                    session = self.sessions.get(session_id)
+                    if not session or not session.active or queued != session.scheduled_deadline:
+                        continue
+                    deadline = session.deadline(self.max_runtime, self.idle_timeout, self.reconnect_grace)
+                    if deadline > now:
+                        session.scheduled_deadline = deadline
+                        heapq.heappush(self._deadlines, (deadline, session_id))
+                        continue
+                    if now >= session.created_at + self.max_runtime:
+                        reason = 'max_runtime'
+                    elif session.detached_at is not None and now >= session.detached_at + self.reconnect_grace:
+                        reason = 'reconnect_grace'
+                    else:
+                        reason = 'idle'
+                    TERMINAL_SESSIONS_REAPED_TOTAL.inc(reason=reason)
+                    expired.append(session_id)
+                if expired:
+                    return expired
+                self._deadlines_changed.wait(self._deadlines[0][0] - now if self._deadlines else None)
 
 
 _terminal_manager_instance: Optional[TerminalSessionManager] = None
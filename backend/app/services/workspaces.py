@@ -0,0 +1,199 @@
+"""Sandbox workspaces: where sources and class files live during a compile/run"""
+import io
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+from app.services.execution_cache import read_class_files, write_class_files
+
+
+SANDBOX_WORKSPACE = '/app/workspace'
+# The runner user of the sandbox images, which owns what is copied into a workspace
+SANDBOX_UID = 10001
+SANDBOX_LABEL = 'codemaster.sandbox'
+
+
+class WorkspaceQuotaExceeded(Exception):
+    """Raised when files written to a workspace exceed its size quota"""
+
+
+def parse_size(value: str) -> int:
+    """Parse a docker-style size ("64m", "512k", "1g" or plain bytes) into bytes"""
+    match = re.fullmatch(r'\s*(\d+)\s*([bkmg]?)b?\s*', str(value).lower())
+    if not match:
+        raise ValueError(f"Invalid size: {value!r}")
+    number, unit = match.groups()
+    return int(number) * {'': 1, 'b': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}[unit]
+
+
+def build_tar(files: Dict[str, bytes], owner: int = 0) -> bytes:
+    """Pack a {relative_path: content} mapping into an in-memory tar archive of files owned by `owner`"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w') as tar:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name=name)
+            info.size = len(content)
+            info.mode = 0o644
+            info.uid = info.gid = owner
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+def create_sandbox_container(docker_client, image: str, memory_limit: str, cpu_limit: float,
+                             workspace_size: str, labels: Optional[Dict[str, str]] = None):
+    """Start an idle sandbox container whose workspace is a size-limited tmpfs"""
+    nano_cpus = int(cpu_limit * 1_000_000_000) if cpu_limit > 0 else None
+    container = docker_client.containers.create(
+        image=image,
+        command=['sleep', 'infinity'],
+        working_dir=SANDBOX_WORKSPACE,
+        mem_limit=memory_limit,
+        nano_cpus=nano_cpus,
+        network_disabled=True,
+        read_only=True,
+        tmpfs={
+            '/tmp': 'size=50m',
+            SANDBOX_WORKSPACE: f'size={workspace_size},mode=1777'
+        },
+        user='runner',
+        labels=labels or {SANDBOX_LABEL: 'java'},
+        detach=True
+    )
+    container.start()
+    return container
+
+
+class Workspace(ABC):
+    """Base class: a set of files for one compilation or run, with a quota on what write_files adds"""
+
+    def __init__(self, quota_bytes: int):
+        self.quota_bytes = quota_bytes
+        self.used_bytes = 0
+
+    def write_files(self, files: Dict[str, bytes]):
+        size = sum(len(content) for content in files.values())
+        if self.quota_bytes and self.used_bytes + size > self.quota_bytes:
+            raise WorkspaceQuotaExceeded(
+                f"Workspace quota of {self.quota_bytes} bytes exceeded ({self.used_bytes + size} bytes)")
+        self._write(files)
+        self.used_bytes += size
+
+    @abstractmethod
+    def read_class_files(self) -> Dict[str, bytes]:
+        """The .class files in the workspace, by name"""
+
+    def cleanup(self):
+        pass
+
+    @abstractmethod
+    def _write(self, files: Dict[str, bytes]):
+        """Store `files` (name -> content); the quota is already checked"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cleanup()
+
+
+class HostWorkspace(Workspace):
+    """A directory on the host, bind-mounted into containers or used by host processes"""
+
+    def __init__(self, base_dir: Optional[str], quota_bytes: int):
+        super().__init__(quota_bytes)
+        self.path = tempfile.mkdtemp(prefix='codemaster-java-', dir=base_dir)
+
+    def read_class_files(self) -> Dict[str, bytes]:
+        return read_class_files(self.path)
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def _write(self, files: Dict[str, bytes]):
+        write_class_files(self.path, files)
+
+
+class ContainerWorkspace(Workspace):
+    """The tmpfs workspace of a running sandbox container, filled through the archive API"""
+
+    def __init__(self, container, quota_bytes: int, owned: bool = False):
+        super().__init__(quota_bytes)
+        self.container = container
+        self.owned = owned
+
+    def read_class_files(self) -> Dict[str, bytes]:
+        stream, _ = self.container.get_archive(SANDBOX_WORKSPACE)
+        classes = {}
+        with tarfile.open(fileobj=io.BytesIO(b''.join(stream)), mode='r') as tar:
+            for member in tar.getmembers():
+                # Members are rooted at the archived directory name ("workspace/Main.class")
+                if member.isfile() and member.name.endswith('.class') and '/' in member.name:
+                    classes[member.name.split('/', 1)[1]] = tar.extractfile(member).read()
+        return classes
+
+    def reset_usage(self):
+        """Forget written bytes after the container's workspace has been wiped"""
+        self.used_bytes = 0
+
+    def cleanup(self):
+        if self.owned:
+            try:
+                self.container.remove(force=True)
+            except Exception:
+                pass
+
+    def _write(self, files: Dict[str, bytes]):
+        # Owned by runner so the program's shell can unlink its input in the sticky tmpfs
+        if not self.container.put_archive(SANDBOX_WORKSPACE, build_tar(files, SANDBOX_UID)):
+            raise RuntimeError('Failed to copy sources into sandbox container')
+
+
+class HostWorkspaceProvider:
+    """
+    Workspaces as host directories.
+
+    With `base_dir` pointing at a tmpfs mount (such as /dev/shm) sources,
+    class files and their cleanup stay in RAM instead of hitting the disk.
+
+    The quota only covers files the backend writes (write_files). javac and
+    the program write into the same directory unchecked: under the subprocess
+    backend nothing limits them, and the namespace backend caps each file at
+    its fsize rlimit but not their total. A program can therefore fill the
+    mount behind `base_dir`; give it its own size-limited tmpfs rather than
+    sharing /dev/shm where that matters, or use the container workspace.
+    """
+
+    kind = 'host'
+
+    def __init__(self, base_dir: Optional[str] = None, quota_bytes: int = 0):
+        self.base_dir = base_dir
+        self.quota_bytes = quota_bytes
+        if base_dir:
+            os.makedirs(base_dir, exist_ok=True)
+
+    def create(self) -> HostWorkspace:
+        return HostWorkspace(self.base_dir, self.quota_bytes)
+
+
+class ContainerWorkspaceProvider:
+    """Workspaces inside a fresh sandbox container's tmpfs; nothing touches the host disk"""
+
+    kind = 'container'
+
+    def __init__(self, docker_client, image: str, memory_limit: str, cpu_limit: float, size: str):
+        self.docker_client = docker_client
+        self.image = image
+        self.memory_limit = memory_limit
+        self.cpu_limit = cpu_limit
+        self.size = size
+        self.quota_bytes = parse_size(size)
+
+    def create(self) -> ContainerWorkspace:
+        container = create_sandbox_container(self.docker_client, self.image, self.memory_limit,
+                                             self.cpu_limit, self.size)
+        return ContainerWorkspace(container, self.quota_bytes, owned=True)
@@ -0,0 +1,10 @@
+"""
+ASGI entry point: the backend with terminals on one asyncio event loop (app/asgi.py).
+
+    uvicorn asgi:application --host 127.0.0.1 --port 5001
+
+run.py keeps serving the same API with a thread per WebSocket.
+"""
+from app.asgi import create_asgi_app
+
+application = create_asgi_app()
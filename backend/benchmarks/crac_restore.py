@@ -0,0 +1,84 @@
+"""
+Run latency benchmark: a fresh JVM per run (`_docker_execute`) vs restoring the
+CRaC launcher checkpoint (`_crac_execute`, JAVA_EXECUTION_MODE=crac).
+
+Compiles each program once, then times complete runs through the executor,
+container creation included, since that is what a request pays. The
+checkpoint is taken before timing starts.
+
+Usage (from backend/, after building the jdk and crac targets of docker_env/java17):
+    python benchmarks/crac_restore.py [--runs 20] [--crac-image codemaster-java17-crac:local]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.crac import CracCheckpoint
+from app.services.java_executor import JavaExecutor
+
+PROGRAMS = {
+    'Hello': 'public class Hello { public static void main(String[] a) { System.out.println("Hello"); } }',
+    'Collections': (
+        'import java.util.*;\n'
+        'public class Collections2 { public static void main(String[] a) {\n'
+        '  Map<String, Integer> m = new TreeMap<>(); for (String w : "a b a c b a".split(" ")) m.merge(w, 1, Integer::sum);\n'
+        '  List<Integer> xs = new ArrayList<>(List.of(5, 3, 9)); Collections.sort(xs);\n'
+        '  System.out.println(String.format("%s %s %.2f", m, xs, Math.E));\n'
+        '} }'
+    ),
+}
+
+
+def time_runs(run, runs: int):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = run()
+        samples.append((time.perf_counter() - start) * 1000)
+        if not result['success']:
+            raise RuntimeError(result['errors'])
+    return sorted(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--crac-image', default=os.getenv('JAVA_CRAC_IMAGE', 'codemaster-java17-crac:local'))
+    args = parser.parse_args()
+
+    executor = JavaExecutor()
+    if not executor.use_docker:
+        sys.exit('Docker is required')
+    crac = CracCheckpoint(executor.docker_client, args.crac_image, executor.memory_limit,
+                          executor.cpu_limit, jvm_flags=executor.jvm_flags)
+    crac.ensure()
+    executor.crac = crac
+
+    print(f"image={executor.runtime_image} crac_image={args.crac_image} "
+          f"memory={executor.memory_limit} cpus={executor.cpu_limit} runs={args.runs}")
+    print(f"{'program':<12} {'path':<16} {'median ms':>10} {'p90 ms':>10} {'min ms':>10}")
+    for name, source in PROGRAMS.items():
+        class_name = executor._extract_class_name(source)
+        with executor._source_workspace(source, class_name) as workspace:
+            compile_result = executor._docker_compile(workspace.path, class_name)
+            if not compile_result['success']:
+                sys.exit(compile_result['errors'])
+            paths = {
+                '_docker_execute': lambda: executor._docker_execute(workspace.path, class_name),
+                '_crac_execute': lambda: executor._crac_execute(workspace.path, class_name),
+            }
+            for path, run in paths.items():
+                run()  # untimed, so both paths start with the image in the page cache
+                samples = time_runs(run, args.runs)
+                p90 = samples[min(len(samples) - 1, int(len(samples) * 0.9))]
+                print(f"{name:<12} {path:<16} {statistics.median(samples):>10.1f} {p90:>10.1f} {samples[0]:>10.1f}")
+    if crac.stats()['invalidated']:
+        print("warning: some restores failed and fell back to a fresh JVM; _crac_execute numbers are mixed")
+
+
+if __name__ == '__main__':
+    main()
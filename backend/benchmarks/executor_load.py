@@ -0,0 +1,92 @@
+"""
+Executor load test against the in-repo Docker Engine stand-in (tests/fake_docker_engine.py).
+
+Drives JavaExecutor.compile_and_execute from many threads through the real
+docker SDK, with per-call Docker latencies and failure rates injected by the
+fake engine, and reports request latency percentiles, throughput and the
+engine's container counters. Needs no Docker daemon or JDK, so it measures the
+backend's own overhead and how it behaves under a slow or flaky daemon.
+
+Usage (from backend/):
+    python benchmarks/executor_load.py [--requests 500] [--concurrency 32] \
+        [--latency create=0.02,start=0.05,java=0.1:0.3] [--failure start=0.01] [--mode split]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import docker
+from unittest.mock import patch
+from app.services.execution_cache import ExecutionResultCache
+from app.services.java_executor import JavaExecutor
+from tests.fake_docker_engine import FakeDockerEngine
+
+
+def parse_pairs(text: str, ranges: bool = False):
+    """Parse 'create=0.02,java=0.1:0.3' into {'create': 0.02, 'java': (0.1, 0.3)}"""
+    values = {}
+    for item in filter(None, (text or '').split(',')):
+        name, value = item.split('=')
+        if ranges and ':' in value:
+            low, high = value.split(':')
+            values[name] = (float(low), float(high))
+        else:
+            values[name] = float(value)
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--latency', default='create=0.02,start=0.05,remove=0.02,javac=0.3:0.6,java=0.1:0.3')
+    parser.add_argument('--failure', default='')
+    parser.add_argument('--mode', choices=['split', 'single'], default='split')
+    parser.add_argument('--distinct', type=int, default=0,
+                        help='distinct sources (0: every request unique, so no cache or coalescing hits)')
+    args = parser.parse_args()
+
+    with FakeDockerEngine(latencies=parse_pairs(args.latency, ranges=True), failures=parse_pairs(args.failure),
+                          seed=1) as engine:
+        client = docker.DockerClient(base_url=engine.base_url, timeout=120)
+        with patch('app.services.java_executor._create_docker_client', return_value=client):
+            executor = JavaExecutor()
+        executor.execution_mode = args.mode
+        executor.result_cache = ExecutionResultCache(0, 0)
+        distinct = args.distinct or args.requests
+
+        def run(index):
+            source = ('public class Main { public static void main(String[] a) { '
+                      f'System.out.println("request {index % distinct}"); }} }}')
+            start = time.perf_counter()
+            result = executor.compile_and_execute(source)
+            return (time.perf_counter() - start) * 1000, result
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            outcomes = list(pool.map(run, range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+        samples = sorted(ms for ms, _ in outcomes)
+        errors = {}
+        for _, result in outcomes:
+            for error in result['errors'][:1]:
+                errors[error['type']] = errors.get(error['type'], 0) + 1
+        percentile = lambda p: samples[min(len(samples) - 1, int(len(samples) * p))]
+        print(f"mode={args.mode} requests={args.requests} concurrency={args.concurrency} "
+              f"latency={args.latency} failure={args.failure or '-'}")
+        print(f"throughput {args.requests / elapsed:.1f} req/s  median {statistics.median(samples):.1f} ms  "
+              f"p90 {percentile(0.9):.1f} ms  p99 {percentile(0.99):.1f} ms  max {samples[-1]:.1f} ms")
+        print(f"errors {errors or '-'}")
+        stats = engine.stats()
+        print(f"engine created={stats['created']} removed={stats['removed']} live={stats['live']} "
+              f"max_running={stats['max_running']} injected_failures={stats['failures_injected']}")
+
+
+if __name__ == '__main__':
+    main()
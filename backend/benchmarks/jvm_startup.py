@@ -0,0 +1,106 @@
+"""
+JVM start-up benchmark for the sandbox image: default flags vs the fast-start profile.
+
+Starts one sandbox container with the production limits (JAVA_MEMORY_LIMIT,
+JAVA_CPU_LIMIT), compiles a few typical student programs once, then launches
+each program repeatedly under every profile and reports wall-clock time per
+launch measured inside the container, so container creation is not counted.
+
+Usage (from backend/, after `docker build -t codemaster-java17:local docker_env/java17`):
+    python benchmarks/jvm_startup.py [--runs 30] [--image codemaster-java17:local]
+"""
+import argparse
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import docker
+from app.services.jvm_options import CONTAINER_CDS_ARCHIVE, run_flags
+from app.services.workspaces import SANDBOX_WORKSPACE, ContainerWorkspace, create_sandbox_container
+
+
+# Public class name -> (source, stdin)
+PROGRAMS = {
+    'Hello': (
+        'public class Hello { public static void main(String[] a) { System.out.println("Hello"); } }',
+        ''
+    ),
+    'ScannerSum': (
+        'import java.util.*;\n'
+        'public class ScannerSum { public static void main(String[] a) {\n'
+        '  Scanner in = new Scanner(System.in); int n = in.nextInt(); List<Integer> xs = new ArrayList<>();\n'
+        '  for (int i = 0; i < n; i++) xs.add(in.nextInt());\n'
+        '  Collections.sort(xs); System.out.printf("sum=%d max=%d%n", xs.stream().mapToInt(x -> x).sum(), xs.get(n - 1));\n'
+        '} }',
+        '5\n3 1 4 1 5\n'
+    ),
+    'WordCount': (
+        'import java.util.*;\n'
+        'public class WordCount { public static void main(String[] a) {\n'
+        '  Map<String, Integer> m = new TreeMap<>(); for (String w : "a b a c b a".split(" ")) m.merge(w, 1, Integer::sum);\n'
+        '  System.out.println(String.format("%s %.2f", m, Math.PI));\n'
+        '} }',
+        ''
+    ),
+}
+
+PROFILES = {
+    'default': run_flags('default'),
+    'fast-start (no CDS)': run_flags('fast-start'),
+    'fast-start': run_flags('fast-start', CONTAINER_CDS_ARCHIVE),
+}
+
+
+def time_launches(workspace: ContainerWorkspace, class_name: str, flags, runs: int):
+    """Launch the program `runs` times in the container; returns per-launch milliseconds"""
+    java = ' '.join(['/opt/jdk-17.0.12/bin/java', *flags, '-cp', SANDBOX_WORKSPACE, class_name])
+    script = (
+        f'for i in $(seq {runs}); do '
+        's=$(date +%s%N); '
+        f'{java} < {class_name}.in > /dev/null 2>&1; '
+        'e=$(date +%s%N); echo $(( (e - s) / 1000 )); '
+        'done'
+    )
+    exit_code, output = workspace.container.exec_run(['sh', '-c', script], workdir=SANDBOX_WORKSPACE, user='runner')
+    if exit_code != 0:
+        raise RuntimeError(output.decode('utf-8', errors='replace'))
+    return [int(line) / 1000 for line in output.decode().split()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', default=os.getenv('DOCKER_IMAGE', 'codemaster-java17:local'))
+    parser.add_argument('--runs', type=int, default=30)
+    parser.add_argument('--memory', default=os.getenv('JAVA_MEMORY_LIMIT', '128m'))
+    parser.add_argument('--cpus', type=float, default=float(os.getenv('JAVA_CPU_LIMIT', 0.5)))
+    args = parser.parse_args()
+
+    client = docker.from_env()
+    container = create_sandbox_container(client, args.image, args.memory, args.cpus, '64m')
+    with ContainerWorkspace(container, quota_bytes=0, owned=True) as workspace:
+        files = {}
+        for class_name, (source, stdin) in PROGRAMS.items():
+            files[f'{class_name}.java'] = source.encode()
+            files[f'{class_name}.in'] = stdin.encode()
+        workspace.write_files(files)
+        exit_code, output = container.exec_run(
+            ['/opt/jdk-17.0.12/bin/javac', '-d', SANDBOX_WORKSPACE] + [f'{name}.java' for name in PROGRAMS],
+            workdir=SANDBOX_WORKSPACE, user='runner')
+        if exit_code != 0:
+            sys.exit(output.decode('utf-8', errors='replace'))
+
+        print(f"image={args.image} memory={args.memory} cpus={args.cpus} runs={args.runs}")
+        print(f"{'program':<12} {'profile':<22} {'median ms':>10} {'p90 ms':>10} {'min ms':>10}")
+        for name in PROGRAMS:
+            for profile, flags in PROFILES.items():
+                # One untimed launch so every profile starts with a warm page cache
+                time_launches(workspace, name, flags, 1)
+                samples = sorted(time_launches(workspace, name, flags, args.runs))
+                p90 = samples[min(len(samples) - 1, int(len(samples) * 0.9))]
+                print(f"{name:<12} {profile:<22} {statistics.median(samples):>10.1f} {p90:>10.1f} {samples[0]:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import java.util.ArrayDeque;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.Collections;
+import java.util.Deque;
+import java.util.HashMap;
+import java.util.HashSet;
+import java.util.Iterator;
+import java.util.LinkedHashMap;
+import java.util.LinkedList;
+import java.util.List;
+import java.util.Map;
+import java.util.PriorityQueue;
+import java.util.Random;
+import java.util.Scanner;
+import java.util.Set;
+import java.util.TreeMap;
+import java.util.stream.Collectors;
+import java.util.stream.IntStream;
+
+/**
+ * Training run for the sandbox image's AppCDS archive.
+ *
+ * Touches the library classes typical student programs load (Scanner input,
+ * String formatting, boxing, collections, streams and lambdas, exceptions).
+ * The Dockerfile records every class loaded here and dumps them into a shared
+ * archive, so short runs map them instead of loading and verifying them.
+ * Reads the sample input piped in by the Dockerfile.
+ */
+public class CdsWarmup {
+    public static void main(String[] args) {
+        Scanner in = new Scanner(System.in);
+        int count = in.nextInt();
+        int[] numbers = new int[count];
+        for (int i = 0; i < count; i++) {
+            numbers[i] = in.nextInt();
+        }
+        in.nextLine();
+        String line = in.hasNextLine() ? in.nextLine() : "";
+        double ratio = in.hasNextDouble() ? in.nextDouble() : 0.5;
+
+        StringBuilder text = new StringBuilder();
+        for (String word : line.trim().split("\\s+")) {
+            text.append(word.toUpperCase()).append(' ').append(word.length()).append(';');
+        }
+        System.out.println(text.reverse());
+        System.out.printf("%d numbers, ratio %.3f, %s%n", count, ratio, String.join(",", line.split(" ")));
+        System.out.println(String.format("%-8s|%8.2f|%05d|%x|%c|%b", "pad", Math.PI, 42, 255, 'c', true));
+
+        List<Integer> list = new ArrayList<>();
+        for (int n : numbers) {
+            list.add(n * n);
+        }
+        Collections.sort(list, Collections.reverseOrder());
+        LinkedList<String> linked = new LinkedList<>(Arrays.asList("b", "a", "c"));
+        Collections.sort(linked);
+        Map<String, Integer> counts = new HashMap<>();
+        for (char c : line.toCharArray()) {
+            counts.merge(String.valueOf(c), 1, Integer::sum);
+        }
+        Map<String, Integer> sorted = new TreeMap<>(counts);
+        Map<Integer, String> ordered = new LinkedHashMap<>();
+        ordered.put(1, "one");
+        Set<Integer> seen = new HashSet<>(list);
+        Deque<Integer> stack = new ArrayDeque<>();
+        stack.push(1);
+        stack.pop();
+        PriorityQueue<Integer> heap = new PriorityQueue<>(list);
+        Iterator<Integer> it = seen.iterator();
+        while (it.hasNext()) {
+            it.next();
+        }
+        System.out.println(list + " " + linked + " " + sorted + " " + ordered + " " + heap.peek());
+
+        int[] copy = Arrays.copyOf(numbers, numbers.length);
+        Arrays.sort(copy);
+        System.out.println(Arrays.toString(copy) + " " + Arrays.stream(copy).sum()
+                + " " + IntStream.rangeClosed(1, 5).boxed().collect(Collectors.toList())
+                + " " + list.stream().filter(n -> n % 2 == 0).map(String::valueOf).collect(Collectors.joining("-")));
+
+        Random random = new Random(7);
+        long total = 0;
+        for (int i = 0; i < 1000; i++) {
+            total += random.nextInt(100) + Math.max(i, 3) + (long) Math.sqrt(i) + Math.abs(-i);
+        }
+        System.out.println(total + " " + Integer.parseInt("123") + " " + Double.parseDouble("1.5")
+                + " " + Long.MAX_VALUE + " " + Character.isDigit('7') + " " + Integer.toBinaryString(10));
+
+        try {
+            Integer.parseInt("not a number");
+        } catch (NumberFormatException e) {
+            System.out.println("caught " + e.getMessage());
+        }
+        try {
+            int[] empty = new int[0];
+            System.out.println(empty[1]);
+        } catch (ArrayIndexOutOfBoundsException e) {
+            System.out.println("caught " + e.getClass().getSimpleName());
+        }
+        try {
+            Object value = null;
+            value.toString();
+        } catch (NullPointerException e) {
+            System.err.println("caught NullPointerException");
+        }
+    }
+}
@@ -0,0 +1,168 @@
+/**
+ * Runs a compiled program once per test case inside a single JVM.
+ *
+ * app/services/case_runner.py appends this class to the submitted source, so it
+ * compiles with the program's own imports in scope and therefore uses fully
+ * qualified names for everything outside java.lang.
+ *
+ * stdin:  "<nonce> <count>\n", then per case "<byte length>\n<input bytes>"
+ * args:   <main class> <per-case time limit ms> <per-case output limit bytes>
+ * stdout: per finished case, the line
+ *         "<nonce> <index> <status> <elapsed micros> <stdout bytes> <stderr bytes>\n"
+ *         followed by the case's captured stdout and stderr
+ *
+ * Every case loads the program through a fresh class loader (so static state
+ * starts over), reads its own System.in and runs main on its own thread.
+ * System.exit ends the case, not the JVM. Status is ok, exit:<code>,
+ * exception:<class>, timeout or output_limit.
+ *
+ * The whole of stdin (nonce and every input) is read, and the descriptor closed,
+ * before any program code runs. The executor unlinks its stdin file before the
+ * JVM starts, so the program cannot learn the nonce to forge a case frame.
+ */
+final class CodeMasterTestHarness {
+    private static volatile boolean finished;
+
+    static final class CaseExit extends SecurityException {
+        final int status;
+
+        CaseExit(int status) {
+            super("System.exit(" + status + ")");
+            this.status = status;
+        }
+    }
+
+    /** Keeps at most `limit` bytes and remembers whether more were written */
+    static final class Capture extends java.io.ByteArrayOutputStream {
+        private final int limit;
+        volatile boolean overflowed;
+
+        Capture(int limit) {
+            this.limit = limit;
+        }
+
+        @Override
+        public synchronized void write(int b) {
+            if (count < limit) {
+                super.write(b);
+            } else {
+                overflowed = true;
+            }
+        }
+
+        @Override
+        public synchronized void write(byte[] b, int off, int len) {
+            int room = Math.max(0, limit - count);
+            super.write(b, off, Math.min(len, room));
+            if (len > room) {
+                overflowed = true;
+            }
+        }
+    }
+
+    @SuppressWarnings({"deprecation", "removal"})
+    public static void main(String[] args) throws Exception {
+        String mainClass = args[0];
+        long caseNanos = Long.parseLong(args[1]) * 1_000_000L;
+        int outputLimit = Integer.parseInt(args[2]);
+
+        java.io.InputStream in = new java.io.BufferedInputStream(System.in);
+        String[] header = readLine(in).split(" ");
+        String nonce = header[0];
+        byte[][] inputs = new byte[Integer.parseInt(header[1])][];
+        for (int i = 0; i < inputs.length; i++) {
+            inputs[i] = in.readNBytes(Integer.parseInt(readLine(in)));
+        }
+        // Leaves /dev/null on descriptor 0, so /proc/self/fd/0 cannot reopen the input
+        new java.io.FileInputStream(java.io.FileDescriptor.in).close();
+
+        java.io.PrintStream frames = System.out;
+        java.net.URL[] classPath = {CodeMasterTestHarness.class.getProtectionDomain().getCodeSource().getLocation()};
+        System.setSecurityManager(new SecurityManager() {
+            @Override
+            public void checkExit(int status) {
+                if (!finished) {
+                    throw new CaseExit(status);
+                }
+            }
+
+            @Override
+            public void checkPermission(java.security.Permission permission) {
+            }
+        });
+
+        for (int i = 0; i < inputs.length; i++) {
+            Capture out = new Capture(outputLimit);
+            Capture err = new Capture(outputLimit);
+            System.setIn(new java.io.ByteArrayInputStream(inputs[i]));
+            System.setOut(new java.io.PrintStream(out, true));
+            System.setErr(new java.io.PrintStream(err, true));
+
+            Throwable[] failure = new Throwable[1];
+            ClassLoader loader = new java.net.URLClassLoader(classPath, ClassLoader.getPlatformClassLoader());
+            Thread worker = new Thread(() -> {
+                try {
+                    Class.forName(mainClass, true, loader)
+                        .getMethod("main", String[].class)
+                        .invoke(null, (Object) new String[0]);
+                } catch (java.lang.reflect.InvocationTargetException e) {
+                    failure[0] = e.getCause();
+                } catch (Throwable e) {
+                    failure[0] = e;
+                }
+            }, "main");
+
+            long start = System.nanoTime();
+            worker.start();
+            while (worker.isAlive() && System.nanoTime() - start < caseNanos && !out.overflowed && !err.overflowed) {
+                worker.join(5);
+            }
+            long micros = (System.nanoTime() - start) / 1000;
+
+            String status;
+            if (out.overflowed || err.overflowed) {
+                status = "output_limit";
+            } else if (worker.isAlive()) {
+                status = "timeout";
+            } else if (failure[0] instanceof CaseExit) {
+                status = "exit:" + ((CaseExit) failure[0]).status;
+            } else if (failure[0] != null) {
+                status = "exception:" + failure[0].getClass().getName();
+                System.err.print("Exception in thread \"main\" ");
+                failure[0].printStackTrace();
+            } else {
+                status = "ok";
+            }
+            boolean stuck = false;
+            if (worker.isAlive()) {
+                worker.stop();
+                worker.join(100);
+                stuck = worker.isAlive();
+            }
+
+            byte[] stdout = out.toByteArray();
+            byte[] stderr = err.toByteArray();
+            frames.print(nonce + " " + i + " " + status + " " + micros + " " + stdout.length + " " + stderr.length + "\n");
+            frames.write(stdout);
+            frames.write(stderr);
+            frames.flush();
+            if (stuck) {
+                // Still burning CPU after stop(); the remaining cases are reported as not run
+                break;
+            }
+        }
+        finished = true;
+        Runtime.getRuntime().halt(0);
+    }
+
+    private static String readLine(java.io.InputStream in) throws java.io.IOException {
+        StringBuilder line = new StringBuilder();
+        for (int c = in.read(); c != '\n'; c = in.read()) {
+            if (c < 0) {
+                throw new java.io.EOFException("Truncated test case input");
+            }
+            line.append((char) c);
+        }
+        return line.toString();
+    }
+}
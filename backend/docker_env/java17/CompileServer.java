@@ -0,0 +1,235 @@
+import javax.tools.Diagnostic;
+import javax.tools.DiagnosticCollector;
+import javax.tools.FileObject;
+import javax.tools.ForwardingJavaFileManager;
+import javax.tools.JavaCompiler;
+import javax.tools.JavaFileObject;
+import javax.tools.SimpleJavaFileObject;
+import javax.tools.StandardJavaFileManager;
+import javax.tools.ToolProvider;
+import java.io.BufferedInputStream;
+import java.io.BufferedOutputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.DataInputStream;
+import java.io.DataOutputStream;
+import java.io.IOException;
+import java.io.OutputStream;
+import java.net.StandardProtocolFamily;
+import java.net.URI;
+import java.net.UnixDomainSocketAddress;
+import java.nio.channels.Channels;
+import java.nio.channels.ServerSocketChannel;
+import java.nio.channels.SocketChannel;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.attribute.PosixFilePermissions;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Locale;
+import java.util.Map;
+import java.util.concurrent.ExecutionException;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.Future;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.TimeoutException;
+
+/**
+ * Long-lived javac service for the CodeMaster executor.
+ *
+ * Compiles single-file sources in memory through the JDK compiler API and
+ * answers over a unix domain socket, so a compilation no longer pays JVM
+ * startup and javac warm-up. The server exits after accepting max-jobs
+ * connections; the Python client starts a fresh one to keep heap growth and
+ * leaked state bounded.
+ *
+ * A compilation still running after timeout-seconds is answered with status 2
+ * so its worker takes the next connection; javac ignores interrupts, so the
+ * abandoned compile runs on in a daemon thread until the client retires this
+ * generation.
+ *
+ * Usage: java -cp /opt/codemaster CompileServer <socket-path> <max-jobs> <threads> [timeout-seconds]
+ *
+ * Wire format (big-endian ints, UTF-8 strings prefixed with their byte length):
+ *   request:  string className, string source
+ *   response: int status (0 = compiled, 1 = errors, 2 = timed out), string diagnostics,
+ *             int classCount, classCount x (string path, int length, bytes)
+ */
+public class CompileServer {
+    private static final JavaCompiler COMPILER = ToolProvider.getSystemJavaCompiler();
+    private static final ExecutorService COMPILES = Executors.newCachedThreadPool(task -> {
+        Thread thread = new Thread(task, "compile");
+        thread.setDaemon(true);
+        return thread;
+    });
+
+    public static void main(String[] args) throws Exception {
+        Path socketPath = Path.of(args[0]);
+        int maxJobs = Integer.parseInt(args[1]);
+        int threads = Integer.parseInt(args[2]);
+        long timeoutMillis = args.length > 3 ? (long) (Double.parseDouble(args[3]) * 1000) : 0;
+
+        Files.deleteIfExists(socketPath);
+        ServerSocketChannel server = ServerSocketChannel.open(StandardProtocolFamily.UNIX);
+        server.bind(UnixDomainSocketAddress.of(socketPath));
+        try {
+            Files.setPosixFilePermissions(socketPath, PosixFilePermissions.fromString("rwxrwxrwx"));
+        } catch (UnsupportedOperationException | IOException ignored) {
+            // Non-POSIX file system; the default permissions have to do
+        }
+
+        ExecutorService workers = Executors.newFixedThreadPool(threads);
+        for (int accepted = 0; accepted < maxJobs; accepted++) {
+            SocketChannel client = server.accept();
+            workers.submit(() -> handle(client, timeoutMillis));
+        }
+        server.close();
+        Files.deleteIfExists(socketPath);
+        workers.shutdown();
+        workers.awaitTermination(60, TimeUnit.SECONDS);
+    }
+
+    private static void handle(SocketChannel channel, long timeoutMillis) {
+        try (channel) {
+            DataInputStream in = new DataInputStream(new BufferedInputStream(Channels.newInputStream(channel)));
+            DataOutputStream out = new DataOutputStream(new BufferedOutputStream(Channels.newOutputStream(channel)));
+            String className = readString(in);
+            String source = readString(in);
+            out.write(compileWithin(className, source, timeoutMillis));
+            out.flush();
+        } catch (IOException ignored) {
+            // Client went away; nothing to report back
+        }
+    }
+
+    private static byte[] compileWithin(String className, String source, long timeoutMillis) throws IOException {
+        Future<byte[]> reply = COMPILES.submit(() -> {
+            ByteArrayOutputStream bytes = new ByteArrayOutputStream();
+            compile(className, source, new DataOutputStream(bytes));
+            return bytes.toByteArray();
+        });
+        ByteArrayOutputStream bytes = new ByteArrayOutputStream();
+        DataOutputStream out = new DataOutputStream(bytes);
+        try {
+            return timeoutMillis > 0 ? reply.get(timeoutMillis, TimeUnit.MILLISECONDS) : reply.get();
+        } catch (TimeoutException e) {
+            reply.cancel(true);
+            writeStatus(out, 2, "", Map.of());
+        } catch (ExecutionException e) {
+            writeResult(out, false, className + ".java:0:0: error: " + e.getCause(), Map.of());
+        } catch (InterruptedException e) {
+            Thread.currentThread().interrupt();
+            writeResult(out, false, className + ".java:0:0: error: interrupted", Map.of());
+        }
+        return bytes.toByteArray();
+    }
+
+    private static void compile(String className, String source, DataOutputStream out) throws IOException {
+        DiagnosticCollector<JavaFileObject> diagnostics = new DiagnosticCollector<>();
+        StandardJavaFileManager standard = COMPILER.getStandardFileManager(diagnostics, Locale.ROOT, StandardCharsets.UTF_8);
+        MemoryFileManager fileManager = new MemoryFileManager(standard);
+        boolean ok;
+        try {
+            ok = COMPILER.getTask(null, fileManager, diagnostics, null, null,
+                    List.of(new SourceFile(className, source))).call();
+        } catch (RuntimeException e) {
+            writeResult(out, false, className + ".java:0:0: error: " + e, Map.of());
+            return;
+        } finally {
+            fileManager.close();
+        }
+
+        // "File.java:line:column: error: message", as parsed by JavaExecutor._parse_compiler_errors
+        StringBuilder text = new StringBuilder();
+        for (Diagnostic<? extends JavaFileObject> d : diagnostics.getDiagnostics()) {
+            String kind = d.getKind() == Diagnostic.Kind.ERROR ? "error" : "warning";
+            text.append(className).append(".java:")
+                .append(Math.max(d.getLineNumber(), 0)).append(':')
+                .append(Math.max(d.getColumnNumber(), 0)).append(": ")
+                .append(kind).append(": ")
+                .append(d.getMessage(Locale.ROOT)).append('\n');
+        }
+        Map<String, byte[]> classes = new LinkedHashMap<>();
+        if (ok) {
+            for (ClassFile file : fileManager.classes.values()) {
+                classes.put(file.binaryName.replace('.', '/') + ".class", file.bytes.toByteArray());
+            }
+        }
+        writeResult(out, ok, text.toString(), classes);
+    }
+
+    private static void writeResult(DataOutputStream out, boolean ok, String diagnostics,
+                                    Map<String, byte[]> classes) throws IOException {
+        writeStatus(out, ok ? 0 : 1, diagnostics, classes);
+    }
+
+    private static void writeStatus(DataOutputStream out, int status, String diagnostics,
+                                    Map<String, byte[]> classes) throws IOException {
+        out.writeInt(status);
+        writeString(out, diagnostics);
+        out.writeInt(classes.size());
+        for (Map.Entry<String, byte[]> entry : classes.entrySet()) {
+            writeString(out, entry.getKey());
+            out.writeInt(entry.getValue().length);
+            out.write(entry.getValue());
+        }
+    }
+
+    private static String readString(DataInputStream in) throws IOException {
+        byte[] bytes = new byte[in.readInt()];
+        in.readFully(bytes);
+        return new String(bytes, StandardCharsets.UTF_8);
+    }
+
+    private static void writeString(DataOutputStream out, String value) throws IOException {
+        byte[] bytes = value.getBytes(StandardCharsets.UTF_8);
+        out.writeInt(bytes.length);
+        out.write(bytes);
+    }
+
+    private static final class SourceFile extends SimpleJavaFileObject {
+        private final String source;
+
+        SourceFile(String className, String source) {
+            super(URI.create("string:///" + className + Kind.SOURCE.extension), Kind.SOURCE);
+            this.source = source;
+        }
+
+        @Override
+        public CharSequence getCharContent(boolean ignoreEncodingErrors) {
+            return source;
+        }
+    }
+
+    private static final class ClassFile extends SimpleJavaFileObject {
+        final String binaryName;
+        final ByteArrayOutputStream bytes = new ByteArrayOutputStream();
+
+        ClassFile(String binaryName) {
+            super(URI.create("bytes:///" + binaryName.replace('.', '/') + Kind.CLASS.extension), Kind.CLASS);
+            this.binaryName = binaryName;
+        }
+
+        @Override
+        public OutputStream openOutputStream() {
+            return bytes;
+        }
+    }
+
+    private static final class MemoryFileManager extends ForwardingJavaFileManager<StandardJavaFileManager> {
+        final Map<String, ClassFile> classes = new LinkedHashMap<>();
+
+        MemoryFileManager(StandardJavaFileManager fileManager) {
+            super(fileManager);
+        }
+
+        @Override
+        public JavaFileObject getJavaFileForOutput(Location location, String className,
+                                                   JavaFileObject.Kind kind, FileObject sibling) {
+            ClassFile file = new ClassFile(className);
+            classes.put(className, file);
+            return file;
+        }
+    }
+}
@@ -0,0 +1,90 @@
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.Paths;
+import java.util.ArrayList;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.Scanner;
+import java.util.TreeMap;
+import java.util.stream.Collectors;
+
+import jdk.crac.Core;
+
+/**
+ * Launcher for the experimental checkpoint/restore execution mode
+ * (JAVA_EXECUTION_MODE=crac).
+ *
+ * First run: boot, load the library classes typical student programs use,
+ * then checkpoint (-XX:CRaCCheckpointTo). Every execution restores that
+ * checkpoint (-XX:CRaCRestoreFrom) inside a fresh container and continues
+ * here: read the main class name the backend wrote to the workspace, load it
+ * with a new class loader and run its main method.
+ *
+ * Command-line arguments are those of the checkpointed process, so
+ * everything per-run comes from files in the workspace. System.in is never
+ * touched before the checkpoint so no input is buffered across runs.
+ */
+public class CracLauncher {
+    private static final Path WORKSPACE = Paths.get("/app/workspace");
+    private static final String MAIN_CLASS_FILE = ".crac-main";
+    private static final String RESTORED_FILE = ".crac-restored";
+
+    public static void main(String[] args) throws Exception {
+        warmUp();
+        Core.checkpointRestore();
+
+        String mainClass = new String(Files.readAllBytes(WORKSPACE.resolve(MAIN_CLASS_FILE)),
+                StandardCharsets.UTF_8).trim();
+        // Tells the backend the restore worked, whatever the program does next
+        Files.write(WORKSPACE.resolve(RESTORED_FILE), new byte[0]);
+
+        URLClassLoader loader = new URLClassLoader(new URL[]{WORKSPACE.toUri().toURL()},
+                ClassLoader.getSystemClassLoader());
+        Thread.currentThread().setContextClassLoader(loader);
+        Method main;
+        try {
+            main = loader.loadClass(mainClass).getMethod("main", String[].class);
+        } catch (ClassNotFoundException | NoSuchMethodException e) {
+            System.err.println("Error: Could not find or load main class " + mainClass);
+            System.exit(1);
+            return;
+        }
+        try {
+            main.invoke(null, (Object) new String[0]);
+        } catch (InvocationTargetException e) {
+            // Same report the java launcher prints for an uncaught exception
+            System.err.print("Exception in thread \"main\" ");
+            e.getCause().printStackTrace();
+            System.exit(1);
+        }
+    }
+
+    private static void warmUp() {
+        Scanner in = new Scanner("3 4 8 15\nhello sandbox world\n");
+        int count = in.nextInt();
+        List<Integer> numbers = new ArrayList<>();
+        for (int i = 0; i < count; i++) {
+            numbers.add(in.nextInt());
+        }
+        in.nextLine();
+        String line = in.nextLine();
+        Map<String, Integer> counts = new HashMap<>();
+        for (String word : line.split("\\s+")) {
+            counts.merge(word, word.length(), Integer::sum);
+        }
+        String summary = String.format("%d %.2f %s %s", count, Math.PI, new TreeMap<>(counts),
+                numbers.stream().map(String::valueOf).collect(Collectors.joining(",")));
+        new StringBuilder(summary).reverse().append(summary.length());
+        try {
+            Integer.parseInt(line);
+        } catch (NumberFormatException e) {
+            // expected
+        }
+    }
+}
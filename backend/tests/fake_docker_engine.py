@@ -0,0 +1,556 @@
+"""
+Docker Engine API stand-in on a unix socket, for driving JavaExecutor and
+TerminalSessionManager through the real docker SDK without a daemon.
+
+Implements the subset those services use: _ping, version, image inspect and
+container create/inspect/start/wait/logs/attach/kill/remove, including the
+upgraded raw-stream attach (multiplexed for non-TTY containers, bidirectional
+for TTY ones). Containers do not run anything; each runs `program` on a
+thread, by default `emulate_jdk`, which understands the commands the backend
+issues:
+
+- javac writes a ".class" file per class in the source, holding the source
+  itself, or fails with a javac-style error when braces do not balance
+- java prints the string literals of System.out/err.println calls in the main
+  class's "class file", throws when it contains `throw new`, spins until killed
+  on `while (true)` and, if it mentions System.in, echoes its input lines
+
+Latencies (seconds, or a (min, max) range) and failure rates (0..1, answered
+with HTTP 500) are configurable per operation: ping, version, image_inspect,
+create, inspect, start, wait, logs, attach, kill, remove, plus javac and java
+for the emulated process run time.
+
+    with FakeDockerEngine(latencies={'create': 0.02}, failures={'start': 0.05}) as engine:
+        client = docker.DockerClient(base_url=engine.base_url)
+"""
+import json
+import os
+import random
+import re
+import shlex
+import socket
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+API_VERSION = '1.43'
+Latency = Union[float, Tuple[float, float]]
+
+
+class FakeContainer:
+    def __init__(self, engine: 'FakeDockerEngine', spec: Dict):
+        self.engine = engine
+        self.id = uuid.uuid4().hex + uuid.uuid4().hex
+        self.spec = spec
+        self.image = spec.get('Image', '')
+        self.command = spec.get('Cmd') or []
+        self.tty = bool(spec.get('Tty'))
+        self.interactive = bool(spec.get('OpenStdin'))
+        self.binds = {}
+        for bind in (spec.get('HostConfig') or {}).get('Binds') or []:
+            host, container_path = bind.split(':')[:2]
+            self.binds[container_path] = host
+        self.status = 'created'
+        self.exit_code = 0
+        self.killed = False
+        self.output: List[Tuple[int, bytes]] = []  # (stream: 1 stdout, 2 stderr, data)
+        self._stdin = bytearray()
+        self._stdin_closed = False
+        self.changed = threading.Condition()
+
+    # Program side
+
+    def host_path(self, path: str) -> Optional[str]:
+        """Host path of a path inside the container, if it is under a bind mount"""
+        for container_path, host in self.binds.items():
+            if path == container_path or path.startswith(container_path + '/'):
+                return host + path[len(container_path):]
+        return None
+
+    def write(self, data: bytes, stream: int = 1):
+        with self.changed:
+            self.output.append((stream, data))
+            self.changed.notify_all()
+
+    def read_line(self) -> Optional[bytes]:
+        """Next stdin line; None at EOF or once the container is killed"""
+        with self.changed:
+            while b'\n' not in self._stdin and not self._stdin_closed and not self.killed:
+                self.changed.wait()
+            if self.killed or (not self._stdin and self._stdin_closed):
+                return None
+            end = self._stdin.find(b'\n')
+            end = len(self._stdin) if end < 0 else end + 1
+            line = bytes(self._stdin[:end])
+            del self._stdin[:end]
+            return line
+
+    def sleep(self, seconds: float) -> bool:
+        """Wait `seconds` of emulated run time; False if the container was killed meanwhile"""
+        with self.changed:
+            deadline = time.time() + seconds
+            while not self.killed and time.time() < deadline:
+                self.changed.wait(deadline - time.time())
+            return not self.killed
+
+    # Engine side
+
+    def feed_stdin(self, data: bytes):
+        with self.changed:
+            if data:
+                self._stdin += data
+            else:
+                self._stdin_closed = True
+            self.changed.notify_all()
+
+    def start(self):
+        self.status = 'running'
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def kill(self):
+        with self.changed:
+            self.killed = True
+            self.changed.notify_all()
+
+    def _run(self):
+        try:
+            exit_code = self.engine.program(self)
+        except Exception as e:
+            self.write(f'fake engine: program crashed: {e}\n'.encode(), 2)
+            exit_code = 1
+        with self.changed:
+            self.exit_code = 137 if self.killed else exit_code
+            self.status = 'exited'
+            self.changed.notify_all()
+        self.engine._container_exited(self)
+
+    def inspect(self) -> Dict:
+        return {
+            'Id': self.id,
+            'Name': '/' + self.id[:12],
+            'Image': self.image,
+            'Config': {'Image': self.image, 'Cmd': self.command, 'Tty': self.tty, 'OpenStdin': self.interactive,
+                       'Labels': self.spec.get('Labels') or {}},
+            'State': {'Status': self.status, 'Running': self.status == 'running', 'ExitCode': self.exit_code},
+            'HostConfig': self.spec.get('HostConfig') or {}
+        }
+
+
+def _unwrap(command: List[str]) -> Tuple[List[str], Optional[str]]:
+    """
+    The java/javac argv inside sh -c / script -qfc / timeout wrappers, and the
+    file of a `< file` redirect (trailing, or `exec < file && ... && exec java`)
+    """
+    stdin_file = None
+    while True:
+        while command and os.path.basename(command[0]) not in ('java', 'javac', 'sh', 'script'):
+            command = command[1:]
+        if command[:2] != ['sh', '-c'] and not (command and os.path.basename(command[0]) == 'script'):
+            return command, stdin_file
+        command = shlex.split(command[2])
+        if '<' in command:
+            index = command.index('<')
+            stdin_file = command[index + 1]
+            command = command[:index] + command[index + 2:]
+        if '&&' in command:
+            command = command[len(command) - command[::-1].index('&&'):]
+
+
+def _fake_javac(container: FakeContainer, argv: List[str]) -> Tuple[int, bytes]:
+    out_dir = container.host_path(argv[argv.index('-d') + 1]) if '-d' in argv else None
+    log = b''
+    for source in (arg for arg in argv if arg.endswith('.java')):
+        path = container.host_path(source) or container.host_path(f"/app/workspace/{source}")
+        with open(path, 'rb') as f:
+            code = f.read()
+        if code.count(b'{') != code.count(b'}'):
+            line = code.count(b'\n') + 1
+            log += f"{source}:{line}:1: error: reached end of file while parsing\n1 error\n".encode()
+            continue
+        for name in re.findall(rb'\bclass\s+(\w+)', code):
+            with open(os.path.join(out_dir or os.path.dirname(path), name.decode() + '.class'), 'wb') as f:
+                f.write(code)
+    return (1 if log else 0), log
+
+
+def _fake_java(container: FakeContainer, argv: List[str], stdin_file: Optional[str]) -> int:
+    classpath = container.host_path(argv[argv.index('-cp') + 1])
+    main_class = argv[argv.index('-cp') + 2]
+    try:
+        with open(os.path.join(classpath, main_class + '.class'), 'rb') as f:
+            code = f.read().decode('utf-8', errors='replace')
+    except OSError:
+        container.write(f'Error: Could not find or load main class {main_class}\n'.encode(), 2)
+        return 1
+    for stream, text in re.findall(r'System\.(out|err)\.println\("((?:[^"\\]|\\.)*)"\)', code):
+        container.write((text.encode().decode('unicode_escape') + '\n').encode(), 1 if stream == 'out' else 2)
+    if 'while (true)' in code:
+        while container.sleep(0.05):
+            pass
+        return 137
+    if 'throw new' in code:
+        container.write(b'Exception in thread "main" java.lang.RuntimeException\n', 2)
+        return 1
+    if 'System.in' not in code:
+        return 0
+    if stdin_file:
+        with open(container.host_path(stdin_file), 'rb') as f:
+            for line in f:
+                container.write(line)
+    elif container.interactive:
+        line = container.read_line()
+        while line is not None:
+            container.write(line)
+            line = container.read_line()
+    return 0
+
+
+def emulate_jdk(container: FakeContainer) -> int:
+    """Default container program: fake javac/java, including the single-container phase script"""
+    command = container.command
+    script = command[2] if command[:2] == ['sh', '-c'] else ''
+    if '.javac.status' in script:
+        workspace = container.host_path('/app/workspace')
+        source = re.search(r'javac -d /app/workspace (\S+\.java)', script).group(1)
+        if not container.sleep(container.engine.latency('javac')):
+            return 137
+        rc, log = _fake_javac(container, ['javac', '-d', '/app/workspace', source])
+        with open(os.path.join(workspace, '.javac.log'), 'wb') as f:
+            f.write(log)
+        with open(os.path.join(workspace, '.javac.status'), 'w') as f:
+            f.write(f'{rc} 1000\n')
+        if rc:
+            return rc
+        argv, stdin_file = _unwrap(['sh', '-c', script[script.rindex('; ') + 2:]])
+        if not container.sleep(container.engine.latency('java')):
+            return 137
+        return _fake_java(container, argv, stdin_file and os.path.join('/app/workspace', stdin_file))
+
+    argv, stdin_file = _unwrap(list(command))
+    if not argv:
+        container.write(f'fake engine: cannot run {command}\n'.encode(), 2)
+        return 127
+    tool = os.path.basename(argv[0])
+    if not container.sleep(container.engine.latency(tool)):
+        return 137
+    if tool == 'javac':
+        rc, log = _fake_javac(container, argv)
+        container.write(log, 2)
+        return rc
+    return _fake_java(container, argv, stdin_file)
+
+
+class _ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Unix sockets refuse connections (EAGAIN) beyond the backlog instead of queueing SYNs
+    request_queue_size = 512
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeDocker/' + API_VERSION
+    engine: 'FakeDockerEngine'
+
+    def address_string(self):
+        return 'unix'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _dispatch(self, method: str):
+        url = urlparse(self.path)
+        path = re.sub(r'^/v[\d.]+', '', url.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        for pattern, verb, operation in self.engine.ROUTES:
+            match = re.fullmatch(pattern, path)
+            if match and verb == method:
+                break
+        else:
+            return self._json(404, {'message': f'page not found: {method} {path}'})
+        self.engine._record(operation)
+        if self.engine._inject_failure(operation):
+            return self._json(500, {'message': f'fake engine: injected {operation} failure'})
+        time.sleep(self.engine.latency(operation))
+        getattr(self, '_' + operation)(query, body, *match.groups())
+
+    def _json(self, status: int, payload, content_type='application/json'):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _no_content(self):
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _container(self, container_id: str) -> Optional[FakeContainer]:
+        container = self.engine.find(container_id)
+        if container is None:
+            self._json(404, {'message': f'No such container: {container_id}'})
+        return container
+
+    def _ping(self, query, body):
+        self._json(200, b'OK', 'text/plain')
+
+    def _version(self, query, body):
+        self._json(200, {'ApiVersion': API_VERSION, 'MinAPIVersion': '1.12', 'Version': '24.0.0-fake',
+                         'Os': 'linux', 'Arch': 'amd64'})
+
+    def _image_inspect(self, query, body, name):
+        if name in self.engine.missing_images:
+            return self._json(404, {'message': f'No such image: {name}'})
+        self._json(200, {'Id': 'sha256:' + uuid.uuid5(uuid.NAMESPACE_URL, name).hex * 2, 'RepoTags': [name]})
+
+    def _create(self, query, body):
+        spec = json.loads(body or b'{}')
+        if spec.get('Image') in self.engine.missing_images:
+            return self._json(404, {'message': f"No such image: {spec.get('Image')}"})
+        container = self.engine._add(FakeContainer(self.engine, spec))
+        self._json(201, {'Id': container.id, 'Warnings': []})
+
+    def _inspect(self, query, body, container_id):
+        container = self._container(container_id)
+        if container:
+            self._json(200, container.inspect())
+
+    def _start(self, query, body, container_id):
+        container = self._container(container_id)
+        if container:
+            if container.status == 'created':
+                self.engine._container_started(container)
+                container.start()
+            self._no_content()
+
+    def _wait(self, query, body, container_id):
+        container = self._container(container_id)
+        if container:
+            with container.changed:
+                while container.status != 'exited':
+                    container.changed.wait()
+            self._json(200, {'StatusCode': container.exit_code, 'Error': None})
+
+    def _kill(self, query, body, container_id):
+        container = self._container(container_id)
+        if container:
+            if container.status != 'running':
+                return self._json(409, {'message': f'Container {container_id} is not running'})
+            container.kill()
+            self._no_content()
+
+    def _remove(self, query, body, container_id):
+        container = self._container(container_id)
+        if container:
+            if container.status == 'running' and query.get('force') not in ('1', 'true', 'True'):
+                return self._json(409, {'message': 'You cannot remove a running container. Stop it first'})
+            container.kill()
+            self.engine._remove(container)
+            self._no_content()
+
+    def _logs(self, query, body, container_id):
+        container = self._container(container_id)
+        if container:
+            wanted = self._streams(query)
+            with container.changed:
+                chunks = [chunk for chunk in container.output if chunk[0] in wanted]
+            self._json(200, b''.join(self._frame(container, stream, data) for stream, data in chunks),
+                       'application/vnd.docker.multiplexed-stream')
+
+    def _attach(self, query, body, container_id):
+        container = self._container(container_id)
+        if not container:
+            return
+        self.send_response(101, 'UPGRADED')
+        self.send_header('Content-Type', 'application/vnd.docker.raw-stream')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Upgrade', 'tcp')
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        # Give the client time to read the headers alone; docker-py then reads the raw socket
+        time.sleep(self.engine.attach_delay)
+        if query.get('stdin') in ('1', 'true', 'True') and container.interactive:
+            threading.Thread(target=self._pump_stdin, args=(container,), daemon=True).start()
+        wanted = self._streams(query)
+        sent = 0 if query.get('logs') in ('1', 'true', 'True') else len(container.output)
+        try:
+            while True:
+                with container.changed:
+                    while sent == len(container.output) and container.status != 'exited' \
+                            and container.id in self.engine.containers:
+                        container.changed.wait(0.5)
+                    pending = container.output[sent:]
+                    sent += len(pending)
+                    done = not pending and (container.status == 'exited'
+                                            or container.id not in self.engine.containers)
+                for stream, data in pending:
+                    if stream in wanted:
+                        self.wfile.write(self._frame(container, stream, data))
+                self.wfile.flush()
+                if done:
+                    break
+            # Like Docker, hang up once the container is gone; this also ends _pump_stdin's read
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _pump_stdin(self, container: FakeContainer):
+        try:
+            while True:
+                data = self.rfile.read1(65536)
+                container.feed_stdin(data)
+                if not data:
+                    return
+        except (OSError, ValueError):
+            container.feed_stdin(b'')
+
+    def _streams(self, query) -> set:
+        wanted = set()
+        if query.get('stdout', '1') in ('1', 'true', 'True'):
+            wanted.add(1)
+        if query.get('stderr', '1') in ('1', 'true', 'True'):
+            wanted.add(2)
+        return wanted
+
+    def _frame(self, container: FakeContainer, stream: int, data: bytes) -> bytes:
+        if container.tty:
+            return data
+        return struct.pack('>BxxxL', stream, len(data)) + data
+
+
+class FakeDockerEngine:
+    ROUTES = [
+        (r'/_ping', 'GET', 'ping'),
+        (r'/version', 'GET', 'version'),
+        (r'/images/(.+)/json', 'GET', 'image_inspect'),
+        (r'/containers/create', 'POST', 'create'),
+        (r'/containers/([^/]+)/json', 'GET', 'inspect'),
+        (r'/containers/([^/]+)/start', 'POST', 'start'),
+        (r'/containers/([^/]+)/wait', 'POST', 'wait'),
+        (r'/containers/([^/]+)/kill', 'POST', 'kill'),
+        (r'/containers/([^/]+)/logs', 'GET', 'logs'),
+        (r'/containers/([^/]+)/attach', 'POST', 'attach'),
+        (r'/containers/([^/]+)', 'DELETE', 'remove'),
+    ]
+
+    def __init__(self, socket_path: Optional[str] = None, latencies: Optional[Dict[str, Latency]] = None,
+                 failures: Optional[Dict[str, float]] = None, program: Callable[[FakeContainer], int] = emulate_jdk,
+                 missing_images=(), attach_delay: float = 0.005, seed: Optional[int] = None):
+        self._socket_dir = None
+        if socket_path is None:
+            self._socket_dir = tempfile.mkdtemp(prefix='fake-docker-')
+            socket_path = os.path.join(self._socket_dir, 'docker.sock')
+        self.socket_path = socket_path
+        self.latencies = dict(latencies or {})
+        self.failures = dict(failures or {})
+        self.program = program
+        self.missing_images = set(missing_images)
+        self.attach_delay = attach_delay
+        self.containers: Dict[str, FakeContainer] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {'requests': {}, 'failures_injected': 0, 'created': 0, 'removed': 0,
+                       'running': 0, 'max_running': 0}
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return 'unix://' + self.socket_path
+
+    def start(self) -> 'FakeDockerEngine':
+        handler = type('Handler', (_Handler,), {'engine': self})
+        self._server = _ThreadingUnixHTTPServer(self.socket_path, handler)
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for container in list(self.containers.values()):
+            container.kill()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        if self._socket_dir:
+            os.rmdir(self._socket_dir)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def latency(self, operation: str) -> float:
+        value = self.latencies.get(operation, 0)
+        if isinstance(value, tuple):
+            with self._lock:
+                return self._random.uniform(*value)
+        return value
+
+    def find(self, container_id: str) -> Optional[FakeContainer]:
+        with self._lock:
+            container = self.containers.get(container_id)
+            if container is None:
+                matches = [c for key, c in self.containers.items() if key.startswith(container_id)]
+                container = matches[0] if len(matches) == 1 else None
+            return container
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats, requests=dict(self._stats['requests']))
+            stats['live'] = len(self.containers)
+        return stats
+
+    def _record(self, operation: str):
+        with self._lock:
+            self._stats['requests'][operation] = self._stats['requests'].get(operation, 0) + 1
+
+    def _inject_failure(self, operation: str) -> bool:
+        rate = self.failures.get(operation, 0)
+        with self._lock:
+            failed = rate > 0 and self._random.random() < rate
+            if failed:
+                self._stats['failures_injected'] += 1
+        return failed
+
+    def _add(self, container: FakeContainer) -> FakeContainer:
+        with self._lock:
+            self.containers[container.id] = container
+            self._stats['created'] += 1
+        return container
+
+    def _remove(self, container: FakeContainer):
+        with self._lock:
+            if self.containers.pop(container.id, None) is not None:
+                self._stats['removed'] += 1
+        with container.changed:
+            container.changed.notify_all()
+
+    def _container_started(self, container: FakeContainer):
+        with self._lock:
+            self._stats['running'] += 1
+            self._stats['max_running'] = max(self._stats['max_running'], self._stats['running'])
+
+    def _container_exited(self, container: FakeContainer):
+        with self._lock:
+            self._stats['running'] -= 1
@@ -0,0 +1,68 @@
+import unittest
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.admission import AdmissionController, AdmissionRejected
+
+
+class AdmissionControllerTestCase(unittest.TestCase):
+    def wait_for_queue(self, controller, depth):
+        deadline = time.time() + 2
+        while controller.stats()['queued_now'] < depth and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(controller.stats()['queued_now'], depth)
+
+    def test_free_slot_admits_immediately(self):
+        controller = AdmissionController(max_concurrent=2, max_queue_depth=4, queue_timeout=1)
+        with controller.admit('alice') as waited:
+            self.assertEqual(waited, 0.0)
+            self.assertEqual(controller.stats()['running'], 1)
+        self.assertEqual(controller.stats()['running'], 0)
+
+    def test_full_queue_rejected_with_retry_hint(self):
+        controller = AdmissionController(max_concurrent=1, max_queue_depth=0, queue_timeout=1)
+        controller.acquire('alice')
+        with self.assertRaises(AdmissionRejected) as ctx:
+            controller.acquire('bob')
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+        self.assertEqual(controller.stats()['rejected'], 1)
+        controller.release()
+
+    def test_queue_timeout(self):
+        controller = AdmissionController(max_concurrent=1, max_queue_depth=4, queue_timeout=0.05)
+        controller.acquire('alice')
+        with self.assertRaises(AdmissionRejected):
+            controller.acquire('bob')
+        self.assertEqual(controller.stats()['queued_now'], 0)
+        controller.release()
+
+    def test_heavy_user_does_not_starve_others(self):
+        controller = AdmissionController(max_concurrent=1, max_queue_depth=16, queue_timeout=5)
+        controller.acquire('alice')
+        order = []
+        lock = threading.Lock()
+
+        def run(user):
+            controller.acquire(user)
+            with lock:
+                order.append(user)
+            controller.release()
+
+        threads = []
+        for depth, user in enumerate(['alice', 'alice', 'alice', 'bob'], start=1):
+            thread = threading.Thread(target=run, args=(user,))
+            thread.start()
+            threads.append(thread)
+            self.wait_for_queue(controller, depth)
+        controller.release()
+        for thread in threads:
+            thread.join(timeout=2)
+        # bob arrived last but is served before alice's backlog
+        self.assertEqual(order[0], 'bob')
+        self.assertEqual(len(order), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.case_runner import (
+    HARNESS_CLASS, CaseFrameReader, encode_cases, judge_case, program_errors, with_harness
+)
+from tests.test_java_executor import FakeDockerClient, make_executor
+
+# Stands in for the JVM: reads the harness's stdin protocol and doubles each input number
+FAKE_HARNESS = r'''#!/usr/bin/env python3
+import os
+import sys
+args = sys.argv[sys.argv.index('-cp') + 2:]
+assert args[:2] == ['CodeMasterTestHarness', 'Main'], args
+stdin = sys.stdin.buffer
+nonce, count = stdin.readline().split()
+inputs = [stdin.read(int(stdin.readline())).decode() for _ in range(int(count))]
+# Like the real harness: every input read, then /dev/null on descriptor 0
+os.dup2(os.open(os.devnull, os.O_WRONLY), 0)
+out = sys.stdout.buffer
+for index, text in enumerate(inputs):
+    if text == 'snoop':
+        # The program hunts for the nonce to forge an accepted frame for itself
+        leaked = b''
+        for path in ('.stdin', '/proc/self/fd/0'):
+            try:
+                with open(path, 'rb') as f:
+                    leaked += f.read()
+            except OSError:
+                pass
+        if nonce in leaked:
+            os.write(1, b'%s %d ok 1 5 0\nnever' % (nonce, index))
+        status, stdout, stderr = 'ok', b'', b''
+    elif text == 'boom':
+        status, stdout, stderr = 'exception:java.lang.RuntimeException', b'', b'java.lang.RuntimeException: boom\n'
+    elif text == 'hang':
+        sys.exit(137)
+    elif text == 'loud':
+        limit = int(args[3])
+        status, stdout, stderr = 'output_limit', b'o' * limit, b'e' * limit
+    elif text == 'flood':
+        out.write(b'x' * 10 ** 6)
+        out.flush()
+        sys.exit(0)
+    else:
+        status, stdout, stderr = 'ok', f'{int(text) * 2}\n'.encode(), b''
+    out.write(b'%s %d %s 1500 %d %d\n' % (nonce, index, status.encode(), len(stdout), len(stderr)) + stdout + stderr)
+    out.flush()
+'''
+
+
+class CaseFrameReaderTestCase(unittest.TestCase):
+    def test_frames_split_across_chunks(self):
+        reader = CaseFrameReader('abc')
+        stream = b'noise\nabc 0 ok 250 3 1\n12\nEabc 1 timeout 2000000 0 0\n'
+        frames = []
+        for offset in range(0, len(stream), 5):
+            frames.extend(reader.feed(stream[offset:offset + 5]))
+        self.assertEqual([(f['index'], f['status'], f['stdout'], f['stderr']) for f in frames],
+                         [(0, 'ok', b'12\n', b'E'), (1, 'timeout', b'', b'')])
+        self.assertEqual(frames[0]['elapsed'], 0.00025)
+
+    def test_forged_header_without_nonce_ignored(self):
+        reader = CaseFrameReader('abc')
+        self.assertEqual(reader.feed(b'xyz 0 ok 1 0 0\n'), [])
+
+    def test_inputs_prefixed_by_utf8_length(self):
+        self.assertEqual(encode_cases(['é\n', ''], 'n'), 'n 2\n3\né\n0\n')
+
+
+class JudgeTestCase(unittest.TestCase):
+    def frame(self, status='ok', stdout=b'', stderr=b''):
+        return {'index': 0, 'status': status, 'elapsed': 0.01, 'stdout': stdout, 'stderr': stderr}
+
+    def test_trailing_whitespace_ignored(self):
+        case = judge_case(self.frame(stdout=b'1 2  \r\n3\n\n'), '1 2\n3', 1)
+        self.assertEqual(case['verdict'], 'accepted')
+
+    def test_wrong_answer_has_diff(self):
+        case = judge_case(self.frame(stdout=b'1\n3\n'), '1\n2\n', 1)
+        self.assertEqual(case['verdict'], 'wrong_answer')
+        self.assertIn('-2', case['diff'])
+        self.assertIn('+3', case['diff'])
+
+    def test_exit_status_and_exceptions(self):
+        self.assertEqual(judge_case(self.frame('exit:0', b'x\n'), 'x', 1)['verdict'], 'accepted')
+        self.assertEqual(judge_case(self.frame('exit:2'), '', 1)['verdict'], 'runtime_error')
+        case = judge_case(self.frame('exception:java.lang.ArithmeticException', stderr=b'/ by zero'), '', 1)
+        self.assertEqual((case['verdict'], case['message']), ('runtime_error', '/ by zero'))
+
+    def test_harness_errors_dropped_when_program_has_its_own(self):
+        code = 'public class Main {\n  int x = ;\n'
+        errors = [{'line': 2, 'message': 'illegal start'}, {'line': 40, 'message': 'reached end of file'}]
+        self.assertEqual(program_errors(errors, code), errors[:1])
+        self.assertTrue(with_harness(code).startswith(code))
+        self.assertIn(f'final class {HARNESS_CLASS}', with_harness(code))
+
+
+class RunTestCasesTestCase(unittest.TestCase):
+    code = 'public class Main { public static void main(String[] a) { } }'
+
+    def setUp(self):
+        self.jdk_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.jdk_dir.cleanup)
+        self.javac = self.script('javac', '#!/bin/sh\nprintf "\\312\\376\\272\\276" > "$2/Main.class"\n')
+        self.java = self.script('java', FAKE_HARNESS)
+
+    def script(self, name, body):
+        path = os.path.join(self.jdk_dir.name, name)
+        with open(path, 'w') as f:
+            f.write(body)
+        os.chmod(path, 0o755)
+        return path
+
+    def run_cases(self, inputs_and_expected, **overrides):
+        executor = make_executor(FakeDockerClient(), use_docker=False, backend='subprocess',
+                                 javac_path=self.javac, java_path=self.java, jvm_flags=[], **overrides)
+        test_cases = [{'stdin': stdin, 'expected_output': expected} for stdin, expected in inputs_and_expected]
+        return executor.run_test_cases(self.code, test_cases)
+
+    def test_verdicts_per_case(self):
+        result = self.run_cases([('2', '4\n'), ('3', '7\n'), ('boom', '')])
+        self.assertEqual([case['verdict'] for case in result['cases']], ['accepted', 'wrong_answer', 'runtime_error'])
+        self.assertEqual((result['passed'], result['total'], result['success']), (1, 3, False))
+        self.assertEqual(result['cases'][1]['output'], '6\n')
+        self.assertEqual(result['cases'][0]['execution_time'], 0.0015)
+        self.assertEqual(result['errors'], [])
+
+    def test_cases_after_a_crash_not_run(self):
+        result = self.run_cases([('1', '2'), ('hang', ''), ('5', '10')])
+        self.assertEqual([case['verdict'] for case in result['cases']], ['accepted', 'not_run', 'not_run'])
+        self.assertEqual(result['errors'][0]['type'], 'system_error')
+
+    def test_program_cannot_read_harness_input(self):
+        executor = make_executor(FakeDockerClient(), use_docker=True, jvm_flags=[])
+        executor._docker_compile = lambda code_dir, class_name: {
+            "success": True, "errors": [], "compilation_time": 0.0}
+        def run_on_host(image, command, volumes, outcome, phase, **options):
+            # The container's sh -c command, with the workspace and JDK paths mapped onto the host
+            code_dir = next(iter(volumes))
+            script = command[2].replace('/opt/jdk-17.0.12/bin/java', self.java).replace('/app/workspace', code_dir)
+            process = subprocess.run(['sh', '-c', script], cwd=code_dir, capture_output=True, timeout=10)
+            outcome["exit_code"] = process.returncode
+            yield 'stdout', process.stdout
+        executor._container_output_chunks = run_on_host
+        test_cases = [{'stdin': 'snoop', 'expected_output': 'never'}, {'stdin': '2', 'expected_output': '4'}]
+        events = list(executor.stream_test_cases(self.code, test_cases))
+        self.assertEqual([case['verdict'] for case in events[-1]['cases']], ['wrong_answer', 'accepted'])
+
+    def test_capped_output_of_many_cases_accepted(self):
+        # Every case fills its stdout and stderr share: far more than the run's limit, yet all from the harness
+        result = self.run_cases([('loud', '')] * 20, output_limit=4096)
+        self.assertEqual({case['verdict'] for case in result['cases']}, {'output_limit'})
+        self.assertEqual(result['errors'], [])
+
+    def test_output_outside_frames_stops_run(self):
+        result = self.run_cases([('flood', ''), ('1', '2')], output_limit=4096)
+        self.assertEqual(result['errors'][0]['message'], "Program wrote outside the test harness's output capture")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,15 @@
 import unittest
 import os
+import json
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from unittest.mock import patch
 from flask_jwt_extended import create_access_token
 from app import create_app, db
 from app.models.user import User
+from app.models.code_submission import CodeSubmission
+from app.services.job_queue import get_job_queue
+from app.services.admission import get_admission_controller
 
 
 class CompilerFlowTestCase(unittest.TestCase):
@@ -41,7 +45,7 @@ class CompilerFlowTestCase(unittest.TestCase):
     def test_execute_success(self):
         with patch('app.routes.compiler.get_java_executor') as get_executor:
             class StubExecutor:
-                def compile_and_execute(self, code):
+                def compile_and_execute(self, code, stdin=None, admit=None):
                     return {
                         "success": True,
                         "output": "123\n",
@@ -59,6 +63,7 @@ class CompilerFlowTestCase(unittest.TestCase):
             data = response.get_json()
             self.assertTrue(data['success'])
             self.assertEqual(data['output'], '123\n')
+            self.assertEqual(data['queue_wait_time'], 0.0)
             self.assertIn('request_id', data)
 
     def test_execute_validation_empty(self):
@@ -84,7 +89,7 @@ class CompilerFlowTestCase(unittest.TestCase):
     def test_execute_error_response(self):
         with patch('app.routes.compiler.get_java_executor') as get_executor:
             class StubExecutor:
-                def compile_and_execute(self, code):
+                def compile_and_execute(self, code, stdin=None, admit=None):
                     return {
                         "success": False,
                         "output": "",
@@ -103,6 +108,181 @@ class CompilerFlowTestCase(unittest.TestCase):
             self.assertFalse(data['success'])
             self.assertIn('request_id', data)
 
+    def test_check_compiles_without_running(self):
+        with patch('app.routes.compiler.get_java_executor') as get_executor:
+            class StubExecutor:
+                def compile_and_execute(self, code, stdin=None, admit=None):
+                    raise AssertionError('syntax check must not execute code')
+                def compile_only(self, code):
+                    return {
+                        "success": False,
+                        "errors": [{"line": 1, "column": 19, "message": "reached end of file while parsing", "type": "compilation_error"}],
+                        "compilation_time": 0.1,
+                        "compilation_cached": False
+                    }
+            get_executor.return_value = StubExecutor()
+            response = self.client.post(
+                '/api/compiler/check',
+                json={'code': 'public class Main {'},
+                headers=self.headers
+            )
+            self.assertEqual(response.status_code, 200)
+            data = response.get_json()
+            self.assertFalse(data['is_valid'])
+            self.assertEqual(data['errors'][0]['line'], 1)
+
+    def test_execution_job_submit_and_poll(self):
+        with patch('app.routes.compiler.get_java_executor') as get_executor:
+            class StubExecutor:
+                def compile_and_execute(self, code, stdin=None, admit=None):
+                    return {
+                        "success": True,
+                        "output": "42\n",
+                        "errors": [],
+                        "execution_time": 0.1,
+                        "compilation_time": 0.2
+                    }
+            get_executor.return_value = StubExecutor()
+            response = self.client.post(
+                '/api/compiler/jobs',
+                json={'code': 'public class Main { public static void main(String[] args){ System.out.println(42); } }', 'language': 'java'},
+                headers=self.headers
+            )
+            self.assertEqual(response.status_code, 202)
+            job_id = response.get_json()['job_id']
+            get_job_queue().get(job_id).wait(timeout=5)
+            response = self.client.get(f'/api/compiler/jobs/{job_id}', headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+            data = response.get_json()
+            self.assertEqual(data['status'], 'completed')
+            self.assertEqual(data['result']['output'], '42\n')
+            self.assertIn('submission_id', data['result'])
+
+    def test_execute_batch_streams_results(self):
+        with patch('app.routes.compiler.get_java_executor') as get_executor:
+            class StubExecutor:
+                def compile_and_execute(self, code, stdin=None, admit=None):
+                    return {
+                        "success": True,
+                        "output": (stdin or '').upper(),
+                        "errors": [],
+                        "execution_time": 0.1,
+                        "compilation_time": 0.2
+                    }
+            get_executor.return_value = StubExecutor()
+            code = 'public class Main { public static void main(String[] args){} }'
+            response = self.client.post(
+                '/api/compiler/execute/batch',
+                json={'items': [{'id': 'a', 'code': code, 'stdin': 'one'}, {'id': 'b', 'code': code, 'stdin': 'two'}]},
+                headers=self.headers
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+            results = {line['id']: line for line in lines[:-1]}
+            self.assertEqual(results['a']['output'], 'ONE')
+            self.assertEqual(results['b']['output'], 'TWO')
+            self.assertTrue(lines[-1]['done'])
+            self.assertEqual(len(lines[-1]['submission_ids']), 2)
+            with self.app.app_context():
+                stored = CodeSubmission.query.filter_by(user_id=self.user_id).all()
+                self.assertEqual(sorted(sub.input_data for sub in stored), ['one', 'two'])
+
+    def test_execute_batch_reports_failed_item(self):
+        with patch('app.routes.compiler.get_java_executor') as get_executor:
+            class StubExecutor:
+                def compile_and_execute(self, code, stdin=None, admit=None):
+                    if stdin == 'boom':
+                        raise RuntimeError('docker went away')
+                    return {"success": True, "output": stdin, "errors": [],
+                            "execution_time": 0.1, "compilation_time": 0.2}
+            get_executor.return_value = StubExecutor()
+            code = 'public class Main { public static void main(String[] args){} }'
+            response = self.client.post(
+                '/api/compiler/execute/batch',
+                json={'items': [{'id': 'a', 'code': code, 'stdin': 'ok'}, {'id': 'b', 'code': code, 'stdin': 'boom'}]},
+                headers=self.headers
+            )
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+            results = {line['id']: line for line in lines[:-1]}
+            self.assertTrue(results['a']['success'])
+            self.assertFalse(results['b']['success'])
+            self.assertEqual(results['b']['errors'][0]['type'], 'system_error')
+            self.assertTrue(lines[-1]['done'])
+            self.assertIsNotNone(lines[-1]['submission_ids'][0])
+            self.assertIsNone(lines[-1]['submission_ids'][1])
+            with self.app.app_context():
+                stored = CodeSubmission.query.filter_by(user_id=self.user_id).all()
+                self.assertEqual([sub.input_data for sub in stored], ['ok'])
+
+    def test_execute_batch_validates_items(self):
+        response = self.client.post(
+            '/api/compiler/execute/batch',
+            json={'items': [{'code': 'class A {}'}, {'code': ''}]},
+            headers=self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['index'], 1)
+
+    def test_execute_stream_sends_sse_events(self):
+        with patch('app.routes.compiler.get_java_executor') as get_executor:
+            class StubExecutor:
+                def stream_execute(self, code, stdin=None):
+                    yield {"event": "compiled", "compilation_time": 0.2, "compilation_cached": False}
+                    yield {"event": "output", "stream": "stdout", "data": "1\n"}
+                    yield {"event": "result", "success": True, "output": "1\n", "errors": [],
+                           "execution_time": 0.1, "compilation_time": 0.2, "compilation_cached": False}
+            get_executor.return_value = StubExecutor()
+            response = self.client.post(
+                '/api/compiler/execute/stream',
+                json={'code': 'public class Main { public static void main(String[] args){ System.out.println(1); } }'},
+                headers=self.headers
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'text/event-stream')
+            events = [block.split('\n', 1) for block in response.get_data(as_text=True).strip().split('\n\n')]
+            self.assertEqual([name for name, _ in events], ['event: compiled', 'event: output', 'event: result'])
+            result = json.loads(events[-1][1][len('data: '):])
+            self.assertTrue(result['success'])
+            self.assertIn('submission_id', result)
+            response.close()
+            self.assertEqual(get_admission_controller().stats()['running'], 0)
+
+    def test_execute_tests_streams_case_verdicts(self):
+        with patch('app.routes.compiler.get_java_executor') as get_executor:
+            class StubExecutor:
+                def stream_test_cases(self, code, test_cases):
+                    yield {"event": "compiled", "compilation_time": 0.2, "compilation_cached": False}
+                    for index, case in enumerate(test_cases):
+                        yield {"event": "case", "index": index, "verdict": "accepted", "passed": True}
+                    yield {"event": "result", "success": True, "passed": len(test_cases), "total": len(test_cases),
+                           "cases": [], "errors": [], "execution_time": 0.1, "compilation_time": 0.2}
+            get_executor.return_value = StubExecutor()
+            response = self.client.post(
+                '/api/compiler/execute/tests',
+                json={'code': 'public class Main { public static void main(String[] args){ } }',
+                      'test_cases': [{'stdin': '1\n', 'expected_output': '2\n'}, {'expected_output': ''}]},
+                headers=self.headers
+            )
+            events = [block.split('\n', 1) for block in response.get_data(as_text=True).strip().split('\n\n')]
+            self.assertEqual([name for name, _ in events],
+                             ['event: compiled', 'event: case', 'event: case', 'event: result'])
+            result = json.loads(events[-1][1][len('data: '):])
+            self.assertEqual(result['passed'], 2)
+            response.close()
+            self.assertEqual(get_admission_controller().stats()['running'], 0)
+
+    def test_execute_tests_validates_cases(self):
+        code = 'public class Main { public static void main(String[] args){ } }'
+        for test_cases in (None, [], ['1'], [{'stdin': 1, 'expected_output': ''}]):
+            response = self.client.post('/api/compiler/execute/tests', json={'code': code, 'test_cases': test_cases},
+                                        headers=self.headers)
+            self.assertEqual(response.status_code, 400)
+
+    def test_execution_job_unknown(self):
+        response = self.client.get('/api/compiler/jobs/missing', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
     def test_execute_unauthorized(self):
         response = self.client.post(
             '/api/compiler/execute',
@@ -0,0 +1,155 @@
+import unittest
+import io
+import os
+import tarfile
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.container_pool import ContainerPool
+from app.services.workspaces import (
+    ContainerWorkspace, HostWorkspaceProvider, WorkspaceQuotaExceeded, build_tar, parse_size
+)
+
+
+class FakeContainer:
+    def __init__(self, name):
+        self.id = f'{name:0>64}'
+        self.status = 'created'
+        self.removed = False
+        self.exec_calls = []
+        self.archive = {}
+
+    def start(self):
+        self.status = 'running'
+
+    def reload(self):
+        pass
+
+    def exec_run(self, cmd, **kwargs):
+        self.exec_calls.append(cmd)
+        return 0, b''
+
+    def put_archive(self, path, data):
+        with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+            for member in tar.getmembers():
+                self.archive[member.name] = tar.extractfile(member).read()
+        return True
+
+    def get_archive(self, path):
+        files = {f'workspace/{name}': content for name, content in self.archive.items()}
+        return [build_tar(files)], {}
+
+    def remove(self, force=False):
+        self.removed = True
+        self.status = 'removed'
+
+
+class FakeContainers:
+    def __init__(self):
+        self.created = []
+
+    def create(self, **kwargs):
+        container = FakeContainer(str(len(self.created) + 1))
+        self.created.append(container)
+        return container
+
+
+class FakeDockerClient:
+    def __init__(self):
+        self.containers = FakeContainers()
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class ContainerPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeDockerClient()
+        self.pool = ContainerPool(self.client, image='codemaster-java17:local', size=2, max_uses=2,
+                                  memory_limit='128m', cpu_limit=0.5)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_start_fills_pool(self):
+        self.pool.start()
+        self.assertTrue(wait_for(lambda: self.pool.stats()['idle'] == 2))
+        self.assertEqual(len(self.client.containers.created), 2)
+
+    def test_acquire_hit_and_miss(self):
+        pooled = self.pool.acquire()
+        self.assertEqual(self.pool.stats()['misses'], 1)
+        self.pool.release(pooled)
+        self.assertTrue(wait_for(lambda: self.pool.stats()['idle'] == 2))
+        again = self.pool.acquire()
+        stats = self.pool.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['in_use'], 1)
+        self.pool.release(again)
+
+    def test_release_resets_workspace(self):
+        pooled = self.pool.acquire()
+        self.pool.release(pooled)
+        self.assertTrue(any('kill -9 -1' in cmd[-1] for cmd in pooled.container.exec_calls))
+
+    def test_container_retired_after_max_uses(self):
+        pooled = self.pool.acquire()
+        self.pool.release(pooled)
+        while True:
+            again = self.pool.acquire()
+            if again is pooled:
+                break
+            self.pool.release(again)
+        self.pool.release(pooled)
+        self.assertTrue(wait_for(lambda: pooled.container.removed))
+        self.assertGreaterEqual(self.pool.stats()['retired'], 1)
+
+    def test_unhealthy_container_replaced(self):
+        self.pool.start()
+        self.assertTrue(wait_for(lambda: self.pool.stats()['idle'] == 2))
+        for container in self.client.containers.created:
+            container.status = 'exited'
+        pooled = self.pool.acquire()
+        self.assertEqual(pooled.container.status, 'running')
+        self.assertEqual(self.pool.stats()['health_check_failures'], 2)
+        self.pool.release(pooled)
+
+
+class WorkspaceTestCase(unittest.TestCase):
+    def test_parse_size(self):
+        self.assertEqual(parse_size('64m'), 64 * 1024 * 1024)
+        self.assertEqual(parse_size('512k'), 512 * 1024)
+        self.assertEqual(parse_size('100'), 100)
+        with self.assertRaises(ValueError):
+            parse_size('lots')
+
+    def test_container_workspace_round_trip(self):
+        container = FakeContainer('1')
+        workspace = ContainerWorkspace(container, quota_bytes=1024)
+        workspace.write_files({'Main.java': b'class Main {}', 'Main.class': b'\xca\xfe'})
+        self.assertEqual(container.archive['Main.java'], b'class Main {}')
+        self.assertEqual(workspace.read_class_files(), {'Main.class': b'\xca\xfe'})
+
+    def test_quota_enforced(self):
+        with HostWorkspaceProvider(quota_bytes=8).create() as workspace:
+            workspace.write_files({'A.java': b'1234'})
+            with self.assertRaises(WorkspaceQuotaExceeded):
+                workspace.write_files({'B.java': b'12345'})
+            self.assertEqual(sorted(os.listdir(workspace.path)), ['A.java'])
+        self.assertFalse(os.path.exists(workspace.path))
+
+    def test_owned_container_workspace_removed(self):
+        container = FakeContainer('2')
+        with ContainerWorkspace(container, quota_bytes=0, owned=True):
+            pass
+        self.assertTrue(container.removed)
+
+
+if __name__ == '__main__':
+    unittest.main()
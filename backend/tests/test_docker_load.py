@@ -0,0 +1,103 @@
+import unittest
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import docker
+from unittest.mock import patch
+from app.services.terminal_sessions import TerminalSessionManager
+from tests.fake_docker_engine import FakeDockerEngine
+from tests.test_java_executor import make_executor
+
+
+def program(index):
+    return ('public class Main { public static void main(String[] a) { '
+            f'System.out.println("run {index}"); }} }}')
+
+
+class ExecutorLoadTestCase(unittest.TestCase):
+    """JavaExecutor against the fake engine through the real docker SDK"""
+
+    def engine(self, **options):
+        engine = FakeDockerEngine(seed=7, **options).start()
+        self.addCleanup(engine.stop)
+        return engine, docker.DockerClient(base_url=engine.base_url)
+
+    def test_concurrent_runs_leave_no_containers(self):
+        engine, client = self.engine(latencies={'create': (0.001, 0.01), 'start': 0.005, 'java': (0.01, 0.05)})
+        executor = make_executor(client, execution_mode='split', single_flight=None)
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(lambda index: executor.compile_and_execute(program(index)), range(48)))
+        self.assertEqual([result['output'] for result in results], [f'run {index}\n' for index in range(48)])
+        stats = engine.stats()
+        # One compile and one run container per request, all removed
+        self.assertEqual((stats['created'], stats['removed'], stats['live']), (96, 96, 0))
+        self.assertGreater(stats['max_running'], 1)
+
+    def test_single_container_mode(self):
+        engine, client = self.engine()
+        executor = make_executor(client, execution_mode='single')
+        result = executor.compile_and_execute(
+            'public class Main { public static void main(String[] a) { System.in.read(); } }', stdin='typed\n')
+        self.assertEqual((result['success'], result['output']), (True, 'typed\n'))
+        broken = executor.compile_and_execute('public class Main { public static void main(String[] a) {')
+        self.assertEqual(broken['errors'][0]['type'], 'compilation_error')
+        self.assertEqual(engine.stats()['live'], 0)
+
+    def test_injected_failures_surface_as_system_errors(self):
+        engine, client = self.engine(failures={'start': 1.0})
+        executor = make_executor(client, execution_mode='split')
+        result = executor.compile_and_execute(program(0))
+        self.assertEqual(result['errors'][0]['type'], 'system_error')
+        self.assertIn('injected start failure', result['errors'][0]['message'])
+        self.assertEqual(engine.stats()['live'], 0)
+
+    def test_runaway_program_killed_at_time_limit(self):
+        engine, client = self.engine()
+        executor = make_executor(client, execution_mode='split', timeout=1)
+        started = time.time()
+        result = executor.compile_and_execute(
+            'public class Main { public static void main(String[] a) { while (true) { } } }')
+        self.assertLess(time.time() - started, 5)
+        self.assertEqual(result['errors'][0]['type'], 'timeout')
+        self.assertEqual(engine.stats()['requests'].get('kill'), 1)
+        self.assertEqual(engine.stats()['live'], 0)
+
+    def test_missing_image_reported(self):
+        engine, client = self.engine(missing_images={'codemaster-java17:local'})
+        executor = make_executor(client, execution_mode='split')
+        result = executor.compile_and_execute(program(0))
+        self.assertIn('not found', result['errors'][0]['message'])
+
+
+class TerminalLoadTestCase(unittest.TestCase):
+    code = 'public class Main { public static void main(String[] a) { System.out.println("ready"); System.in.read(); } }'
+
+    def test_sessions_echo_and_clean_up(self):
+        engine = FakeDockerEngine().start()
+        self.addCleanup(engine.stop)
+        client = docker.DockerClient(base_url=engine.base_url)
+        with patch('app.services.terminal_sessions._create_docker_client', return_value=client):
+            manager = TerminalSessionManager()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            started = list(pool.map(lambda _: manager.start_session(self.code, None), range(8)))
+        self.assertTrue(all(session['success'] for session in started))
+        for session in started:
+            sock = manager.attach_socket(session['session_id'])
+            sock.sendall(b'hello\n')
+            received = b''
+            deadline = time.time() + 5
+            while b'hello' not in received and time.time() < deadline:
+                try:
+                    received += sock.recv(4096)
+                except (BlockingIOError, TimeoutError):
+                    pass
+            self.assertEqual(received, b'ready\nhello\n')
+            sock.close()
+            manager.stop_session(session['session_id'])
+        self.assertEqual(engine.stats()['live'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
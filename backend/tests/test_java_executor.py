@@ -0,0 +1,576 @@
+import unittest
+import os
+import sys
+import shutil
+import socket
+import struct
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from unittest.mock import patch
+from app.services.java_executor import JavaExecutor
+from app.services.execution_cache import CompiledClassCache, ExecutionResultCache, is_deterministic
+from app.services.compile_server import CompileServerClient, SOCKET_NAME
+from app.services.jvm_options import CONTAINER_CDS_ARCHIVE, run_flags
+from app.services.crac import CHECKPOINT_MOUNT, RESTORED_FILE, CracCheckpoint
+from app.services.namespace_sandbox import NamespaceSandbox
+from app.services.workspaces import HostWorkspaceProvider
+from app.services.java_executor import BACKEND_DIR
+from app.services.metrics import CACHE_LOOKUPS_TOTAL, DOCKER_CALL_SECONDS, EXECUTIONS_TOTAL
+from app.services.admission import AdmissionController, AdmissionRejected
+
+
+class ScriptedContainer:
+    """Container stand-in that emulates the single-container phase script"""
+
+    def __init__(self, code_dir, compile_exit_code, compile_log, exit_code, output):
+        self.code_dir = code_dir
+        self.compile_exit_code = compile_exit_code
+        self.compile_log = compile_log
+        self.exit_code = exit_code
+        self.output = output
+        self.removed = False
+        self.killed = False
+        self.stdin = None
+
+    def start(self):
+        stdin_path = os.path.join(self.code_dir, '.stdin')
+        if os.path.exists(stdin_path):
+            with open(stdin_path) as f:
+                self.stdin = f.read()
+        with open(os.path.join(self.code_dir, '.javac.log'), 'w') as f:
+            f.write(self.compile_log)
+        with open(os.path.join(self.code_dir, '.javac.status'), 'w') as f:
+            f.write(f'{self.compile_exit_code} 250000\n')
+        if self.compile_exit_code == 0:
+            with open(os.path.join(self.code_dir, 'Main.class'), 'wb') as f:
+                f.write(b'\xca\xfe\xba\xbe')
+
+    def wait(self, timeout=None):
+        return {'StatusCode': self.exit_code if self.compile_exit_code == 0 else self.compile_exit_code}
+
+    def logs(self, stdout=True, stderr=True):
+        return self.output.encode('utf-8') if self.compile_exit_code == 0 else b''
+
+    def attach(self, **kwargs):
+        if self.compile_exit_code == 0:
+            data = self.output.encode('utf-8')
+            # Deliver in small pieces, the way a real attach socket does
+            for offset in range(0, len(data), 4):
+                if self.killed:
+                    return
+                yield data[offset:offset + 4], None
+
+    def kill(self):
+        self.killed = True
+
+    def remove(self, force=False):
+        self.removed = True
+
+
+class ScriptedContainers:
+    def __init__(self, **behaviour):
+        self.behaviour = behaviour
+        self.created = []
+
+    def create(self, **kwargs):
+        code_dir = next(iter(kwargs['volumes']))
+        container = ScriptedContainer(code_dir, **self.behaviour)
+        self.created.append((kwargs, container))
+        return container
+
+
+class FakeDockerClient:
+    def __init__(self, **behaviour):
+        self.containers = ScriptedContainers(**behaviour)
+
+
+def make_executor(client, **overrides):
+    with patch('app.services.java_executor._create_docker_client', return_value=client):
+        executor = JavaExecutor()
+    executor.class_cache = CompiledClassCache(1024 * 1024)
+    # Reruns go all the way to the fake containers unless a test enables replay
+    executor.result_cache = ExecutionResultCache(0, 0)
+    for name, value in overrides.items():
+        setattr(executor, name, value)
+    return executor
+
+
+class SingleContainerModeTestCase(unittest.TestCase):
+    code = 'public class Main { public static void main(String[] a) { System.out.println("hi"); } }'
+
+    def test_success_uses_one_container(self):
+        client = FakeDockerClient(compile_exit_code=0, compile_log='', exit_code=0, output='hi\n')
+        executor = make_executor(client, execution_mode='single')
+        result = executor.compile_and_execute(self.code)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['output'], 'hi\n')
+        self.assertEqual(len(client.containers.created), 1)
+        self.assertAlmostEqual(result['compilation_time'], 0.25)
+        self.assertTrue(client.containers.created[0][1].removed)
+
+    def test_compile_errors_are_parsed(self):
+        client = FakeDockerClient(
+            compile_exit_code=1,
+            compile_log="Main.java:1:50: error: ';' expected\n1 error\n",
+            exit_code=0, output=''
+        )
+        executor = make_executor(client, execution_mode='single')
+        result = executor.compile_and_execute(self.code)
+        self.assertFalse(result['success'])
+        self.assertEqual(result['execution_time'], 0)
+        self.assertEqual(result['errors'][0]['type'], 'compilation_error')
+        self.assertEqual(result['errors'][0]['line'], 1)
+        self.assertEqual(result['errors'][0]['column'], 50)
+
+    def test_runtime_error(self):
+        client = FakeDockerClient(compile_exit_code=0, compile_log='', exit_code=1,
+                                  output='Exception in thread "main" java.lang.RuntimeException\n')
+        executor = make_executor(client, execution_mode='single')
+        result = executor.compile_and_execute(self.code)
+        self.assertFalse(result['success'])
+        self.assertEqual(result['errors'][0]['type'], 'runtime_error')
+
+    def test_resubmission_skips_compile(self):
+        client = FakeDockerClient(compile_exit_code=0, compile_log='', exit_code=0, output='hi\n')
+        executor = make_executor(client, execution_mode='single')
+        first = executor.compile_and_execute(self.code)
+        second = executor.compile_and_execute(self.code)
+        self.assertFalse(first['compilation_cached'])
+        self.assertTrue(second['compilation_cached'])
+        self.assertEqual(second['compilation_time'], 0.0)
+        self.assertEqual(second['output'], 'hi\n')
+        second_command = client.containers.created[1][0]['command']
+        self.assertEqual(second_command[-1], 'Main')
+        self.assertNotIn('javac', ' '.join(second_command))
+
+    def test_output_capped_and_program_stopped(self):
+        client = FakeDockerClient(compile_exit_code=0, compile_log='', exit_code=0, output='é' * 100)
+        executor = make_executor(client, execution_mode='single', output_limit=11)
+        result = executor.compile_and_execute(self.code)
+        self.assertFalse(result['success'])
+        self.assertTrue(result['truncated'])
+        self.assertEqual(result['output'], 'é' * 5)
+        self.assertEqual(result['errors'][0]['type'], 'output_limit')
+        self.assertTrue(client.containers.created[0][1].killed)
+
+    def test_fast_start_flags_only_on_run_phase(self):
+        client = FakeDockerClient(compile_exit_code=0, compile_log='', exit_code=0, output='hi\n')
+        executor = make_executor(client, execution_mode='single',
+                                 jvm_flags=run_flags('fast-start', CONTAINER_CDS_ARCHIVE))
+        executor.compile_and_execute(self.code)
+        script = client.containers.created[0][0]['command'][-1]
+        compile_part, run_part = script.split('exec timeout')
+        self.assertNotIn('TieredStopAtLevel', compile_part)
+        self.assertIn(f'-XX:SharedArchiveFile={CONTAINER_CDS_ARCHIVE}', run_part)
+
+    def test_split_images_compile_and_run_separately(self):
+        client = FakeDockerClient(compile_exit_code=0, compile_log='', exit_code=0, output='hi\n')
+        executor = make_executor(client, execution_mode='single',
+                                 compile_image='java-jdk:test', runtime_image='java-runtime:test')
+        result = executor.compile_and_execute(self.code)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['output'], 'hi\n')
+        (compile_args, _), (run_args, _) = client.containers.created
+        self.assertEqual(compile_args['image'], 'java-jdk:test')
+        self.assertIn('/opt/jdk-17.0.12/bin/javac', compile_args['command'])
+        self.assertEqual(run_args['image'], 'java-runtime:test')
+        self.assertIn('/opt/jdk-17.0.12/bin/java', run_args['command'])
+
+    def test_docker_calls_and_outcomes_recorded(self):
+        client = FakeDockerClient(compile_exit_code=0, compile_log='', exit_code=1, output='boom\n')
+        executor = make_executor(client, execution_mode='single')
+        creates = DOCKER_CALL_SECONDS.count(component='executor', phase='single', call='create')
+        failures = EXECUTIONS_TOTAL.value(backend='docker', outcome='runtime_error', source='executed')
+        executor.compile_and_execute(self.code)
+        self.assertEqual(DOCKER_CALL_SECONDS.count(component='executor', phase='single', call='create'), creates + 1)
+        self.assertEqual(DOCKER_CALL_SECONDS.count(component='executor', phase='single', call='wait'),
+                         DOCKER_CALL_SECONDS.count(component='executor', phase='single', call='start'))
+        self.assertEqual(EXECUTIONS_TOTAL.value(backend='docker', outcome='runtime_error', source='executed'),
+                         failures + 1)
+
+    def test_stdin_redirected_into_program(self):
+        client = FakeDockerClient(compile_exit_code=0, compile_log='', exit_code=0, output='hi\n')
+        executor = make_executor(client, execution_mode='single')
+        executor.compile_and_execute(self.code, stdin='3 4\n')
+        kwargs, container = client.containers.created[0]
+        self.assertEqual(container.stdin, '3 4\n')
+        # The shell unlinks the input before the program starts
+        self.assertIn('exec < .stdin && rm -f .stdin && exec timeout', kwargs['command'][-1])
+
+
+class ResultCacheTestCase(unittest.TestCase):
+    code = 'public class Main { public static void main(String[] a) { System.out.println("hi"); } }'
+
+    def test_identical_run_replayed(self):
+        client = FakeDockerClient(compile_exit_code=0, compile_log='', exit_code=0, output='hi\n')
+        executor = make_executor(client, result_cache=ExecutionResultCache(8, 60))
+        first = executor.compile_and_execute(self.code)
+        second = executor.compile_and_execute(self.code)
+        third = executor.compile_and_execute(self.code, stdin='x')
+        self.assertFalse(first['result_cached'])
+        self.assertTrue(second['result_cached'])
+        self.assertEqual(second['output'], 'hi\n')
+        self.assertFalse(third['result_cached'])
+        # compile + run, then only a run for the new stdin
+        self.assertEqual(len(client.containers.created), 3)
+
+    def test_lookups_counted(self):
+        client = FakeDockerClient(compile_exit_code=0, compile_log='', exit_code=0, output='hi\n')
+        executor = make_executor(client, result_cache=ExecutionResultCache(8, 60))
+        hits = CACHE_LOOKUPS_TOTAL.value(cache='result_cache', result='hit')
+        misses = CACHE_LOOKUPS_TOTAL.value(cache='result_cache', result='miss')
+        replays = EXECUTIONS_TOTAL.value(backend='docker', outcome='success', source='result_cache')
+        executor.compile_and_execute(self.code)
+        executor.compile_and_execute(self.code)
+        self.assertEqual(CACHE_LOOKUPS_TOTAL.value(cache='result_cache', result='hit'), hits + 1)
+        self.assertEqual(CACHE_LOOKUPS_TOTAL.value(cache='result_cache', result='miss'), misses + 1)
+        self.assertEqual(EXECUTIONS_TOTAL.value(backend='docker', outcome='success', source='result_cache'),
+                         replays + 1)
+
+    def test_only_real_runs_take_an_admission_slot(self):
+        client = FakeDockerClient(compile_exit_code=0, compile_log='', exit_code=0, output='hi\n')
+        executor = make_executor(client, result_cache=ExecutionResultCache(8, 60))
+        controller = AdmissionController(max_concurrent=1, max_queue_depth=0, queue_timeout=1)
+        admit = lambda: controller.admit('user')
+        self.assertEqual(executor.compile_and_execute(self.code, admit=admit)['queue_wait_time'], 0.0)
+        # The slot is busy, yet a replay from the cache needs none
+        controller.acquire('other')
+        cached = executor.compile_and_execute(self.code, admit=admit)
+        self.assertTrue(cached['result_cached'])
+        self.assertEqual(controller.stats()['admitted'], 2)
+        with self.assertRaises(AdmissionRejected):
+            executor.compile_and_execute(self.code, stdin='x', admit=admit)
+
+    def test_nondeterministic_programs_not_cached(self):
+        self.assertFalse(is_deterministic('public class Main { long t = System.nanoTime(); }'))
+        self.assertFalse(is_deterministic('import java.util.Scanner; public class Main { }'))
+        self.assertFalse(is_deterministic('public class Main { Thread t = new Thread(); }'))
+        self.assertTrue(is_deterministic('public class Main { /* Random */ int x = 1; }'))
+        client = FakeDockerClient(compile_exit_code=0, compile_log='', exit_code=0, output='hi\n')
+        executor = make_executor(client, result_cache=ExecutionResultCache(8, 60))
+        code = 'public class Main { public static void main(String[] a) { System.out.println(Math.random()); } }'
+        executor.compile_and_execute(code)
+        self.assertFalse(executor.compile_and_execute(code)['result_cached'])
+
+    def test_entries_expire(self):
+        cache = ExecutionResultCache(8, 60)
+        cache.put('k', {'output': 'hi'})
+        with patch('app.services.execution_cache.time.monotonic', return_value=10 ** 9):
+            self.assertIsNone(cache.get('k'))
+        self.assertEqual(cache.stats()['expired'], 1)
+
+
+class CompileOnlyTestCase(unittest.TestCase):
+    code = 'public class Main { public static void main(String[] a) { while (true) {} } }'
+
+    def test_compile_only_never_runs_program(self):
+        client = FakeDockerClient(compile_exit_code=0, compile_log='', exit_code=0, output='')
+        executor = make_executor(client)
+        result = executor.compile_only(self.code)
+        self.assertTrue(result['success'])
+        self.assertEqual(len(client.containers.created), 1)
+        self.assertIn('javac', ' '.join(client.containers.created[0][0]['command']))
+
+    def test_repeated_check_served_from_cache(self):
+        client = FakeDockerClient(compile_exit_code=0, compile_log='', exit_code=1,
+                                  output="Main.java:1:70: error: ';' expected\n")
+        executor = make_executor(client)
+        first = executor.compile_only(self.code)
+        second = executor.compile_only(self.code)
+        self.assertFalse(first['success'])
+        self.assertEqual(first['errors'][0]['column'], 70)
+        self.assertTrue(second['compilation_cached'])
+        self.assertEqual(second['errors'], first['errors'])
+        self.assertEqual(len(client.containers.created), 1)
+
+
+class StreamingOutputTestCase(unittest.TestCase):
+    def test_subprocess_chunks_and_exit_code(self):
+        with tempfile.TemporaryDirectory() as code_dir:
+            fake_java = os.path.join(code_dir, 'java')
+            with open(fake_java, 'w') as f:
+                f.write('#!/bin/sh\ncat\necho oops >&2\nexit 3\n')
+            os.chmod(fake_java, 0o755)
+            executor = make_executor(FakeDockerClient(), use_docker=False, java_path=fake_java)
+            outcome = {"exit_code": None, "timed_out": False, "error": None}
+            chunks = list(executor._subprocess_output_chunks(code_dir, 'Main', 'ping\n', outcome))
+        streams = {}
+        for name, data in chunks:
+            streams[name] = streams.get(name, b'') + data
+        self.assertEqual(streams, {'stdout': b'ping\n', 'stderr': b'oops\n'})
+        self.assertEqual(outcome['exit_code'], 3)
+        self.assertFalse(outcome['timed_out'])
+
+
+    def test_streamed_runs_counted(self):
+        client = FakeDockerClient(compile_exit_code=1, compile_log="Main.java:1:1: error: class expected\n",
+                                  exit_code=0, output="")
+        executor = make_executor(client)
+        before = EXECUTIONS_TOTAL.value(backend='docker', outcome='compilation_error', source='stream')
+        events = list(executor.stream_execute('public class Main { oops }'))
+        self.assertFalse(events[-1]['success'])
+        self.assertEqual(EXECUTIONS_TOTAL.value(backend='docker', outcome='compilation_error', source='stream'),
+                         before + 1)
+
+
+class CracContainers(ScriptedContainers):
+    """Also emulates CRIU: checkpoint containers leave image files, restores run the launcher"""
+
+    def __init__(self, restore_ok=True, **behaviour):
+        super().__init__(**behaviour)
+        self.restore_ok = restore_ok
+
+    def create(self, **kwargs):
+        command = ' '.join(kwargs['command'])
+        if '-XX:CRaCCheckpointTo' in command:
+            checkpoint_dir = next(host for host, mount in kwargs['volumes'].items()
+                                  if mount['bind'] == CHECKPOINT_MOUNT)
+            with open(os.path.join(checkpoint_dir, 'core-1.img'), 'wb') as f:
+                f.write(b'image')
+        elif '-XX:CRaCRestoreFrom' in command and self.restore_ok:
+            with open(os.path.join(next(iter(kwargs['volumes'])), RESTORED_FILE), 'w'):
+                pass
+        return super().create(**kwargs)
+
+
+class CracExecutionTestCase(unittest.TestCase):
+    code = 'public class Main { public static void main(String[] a) { System.out.println("hi"); } }'
+
+    def run_twice(self, restore_ok):
+        client = FakeDockerClient(compile_exit_code=0, compile_log='', exit_code=0, output='hi\n')
+        client.containers = CracContainers(restore_ok=restore_ok, compile_exit_code=0, compile_log='',
+                                           exit_code=0, output='hi\n')
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            crac = CracCheckpoint(client, 'java-crac:test', '128m', 0.5, checkpoint_dir=checkpoint_dir)
+            executor = make_executor(client, crac=crac)
+            results = [executor.compile_and_execute(self.code) for _ in range(2)]
+        images = [kwargs['image'] for kwargs, _ in client.containers.created]
+        self.created = client.containers.created
+        return results, images, crac
+
+    def test_runs_restore_one_checkpoint(self):
+        results, images, crac = self.run_twice(restore_ok=True)
+        self.assertTrue(all(result['success'] and result['output'] == 'hi\n' for result in results))
+        # One checkpoint, then one restore per run
+        self.assertEqual(images.count('java-crac:test'), 3)
+        self.assertEqual(crac.stats()['checkpoints'], 1)
+        # Checkpointed and restored as the runner user, never as root
+        self.assertEqual({kwargs['user'] for kwargs, _ in self.created if kwargs['image'] == 'java-crac:test'},
+                         {'runner'})
+
+    def test_crac_mode_needs_unsafe_opt_in(self):
+        client = FakeDockerClient(compile_exit_code=0, compile_log='', exit_code=0, output='hi\n')
+        with patch('app.services.java_executor.Config.JAVA_EXECUTION_MODE', 'crac'):
+            with patch('app.services.java_executor.Config.JAVA_CRAC_ALLOW_UNSAFE', False):
+                with self.assertRaises(RuntimeError):
+                    make_executor(client)
+            with patch('app.services.java_executor.Config.JAVA_CRAC_ALLOW_UNSAFE', True):
+                self.assertIsNotNone(make_executor(client).crac)
+
+    def test_failed_restore_falls_back_to_fresh_jvm(self):
+        results, images, crac = self.run_twice(restore_ok=False)
+        self.assertTrue(all(result['success'] and result['output'] == 'hi\n' for result in results))
+        self.assertEqual(crac.stats()['invalidated'], 2)
+        self.assertEqual(crac.stats()['checkpoints'], 2)
+
+
+class NamespaceBackendTestCase(unittest.TestCase):
+    """The subprocess flow with JAVA_BACKEND=namespace, using shell scripts as javac/java"""
+
+    def setUp(self):
+        self.sandbox = NamespaceSandbox(128 * 1024 * 1024, 0.5, hidden_paths=[BACKEND_DIR])
+        if not self.sandbox.available():
+            self.skipTest('user namespaces are not available')
+        # Outside /tmp, the backend directory, home and /run, all of which the sandbox covers
+        self.jdk_dir = tempfile.mkdtemp(prefix='fake-jdk-', dir='/var/tmp')
+        self.addCleanup(shutil.rmtree, self.jdk_dir, True)
+        self.javac = self.script('javac', 'printf "\\312\\376\\272\\276" > "$2/Main.class"\n')
+        self.java = self.script('java', 'echo "pid=$$"\nls /tmp\nwc -l < /proc/net/dev\n'
+                                        f'ls {BACKEND_DIR} 2>/dev/null | wc -l\ncat\necho oops >&2\nexit 3\n')
+
+    def script(self, name, body):
+        path = os.path.join(self.jdk_dir, name)
+        with open(path, 'w') as f:
+            f.write('#!/bin/sh\n' + body)
+        os.chmod(path, 0o755)
+        return path
+
+    def test_program_isolated(self):
+        executor = make_executor(FakeDockerClient(), use_docker=False, backend='namespace', sandbox=self.sandbox,
+                                 javac_path=self.javac, java_path=self.java, jvm_flags=[])
+        result = executor.compile_and_execute(
+            'public class Main { public static void main(String[] a) { } }', stdin='ping\n')
+        self.assertFalse(result['success'])
+        # PID namespace, private /tmp, loopback only, backend directory hidden, stdin piped through
+        lines = result['output'].split('\n')
+        self.assertEqual(lines[:4], ['pid=1', 'workspace', '3', '0'])
+        self.assertEqual(sorted(lines[4:6]), ['oops', 'ping'])
+        self.assertEqual(result['errors'][0]['type'], 'runtime_error')
+
+    def test_host_files_out_of_reach(self):
+        workspaces = HostWorkspaceProvider(tempfile.mkdtemp(prefix='workspaces-', dir='/var/tmp'))
+        self.addCleanup(shutil.rmtree, workspaces.base_dir, True)
+        sandbox = NamespaceSandbox(128 * 1024 * 1024, 0.5, hidden_paths=[BACKEND_DIR, workspaces.base_dir])
+        sibling = workspaces.create()
+        self.addCleanup(sibling.cleanup)
+        sibling.write_files({'Main.java': b'class Secret {}'})
+        home = os.path.expanduser('~')
+        escaped = os.path.join(home, f'escaped-{os.getpid()}')
+        self.addCleanup(lambda: os.path.exists(escaped) and os.remove(escaped))
+        java = self.script('java-snoop', f'cat {sibling.path}/Main.java\necho forged > {sibling.path}/Main.java\n'
+                                         f'touch {escaped} 2>/dev/null\nls -A {home} | wc -l\ntouch /var/tmp/x 2>/dev/null || echo ro\n')
+        executor = make_executor(FakeDockerClient(), use_docker=False, backend='namespace', sandbox=sandbox,
+                                 workspaces=workspaces, javac_path=self.javac, java_path=java, jvm_flags=[])
+        result = executor.compile_and_execute('public class Main { public static void main(String[] a) { } }')
+        self.assertNotIn('Secret', result['output'])
+        self.assertEqual(result['output'].split('\n')[-3:], ['0', 'ro', ''])
+        with open(os.path.join(sibling.path, 'Main.java'), 'rb') as f:
+            self.assertEqual(f.read(), b'class Secret {}')
+        self.assertFalse(os.path.exists(escaped))
+
+    def test_stream_chunks_and_exit_code(self):
+        executor = make_executor(FakeDockerClient(), use_docker=False, sandbox=self.sandbox, java_path=self.java)
+        with tempfile.TemporaryDirectory() as code_dir:
+            outcome = {"exit_code": None, "timed_out": False, "error": None}
+            chunks = list(executor._subprocess_output_chunks(code_dir, 'Main', 'ping\n', outcome))
+        stderr = b''.join(data for name, data in chunks if name == 'stderr')
+        self.assertEqual(stderr, b'oops\n')
+        self.assertEqual(outcome['exit_code'], 3)
+
+    def test_backend_environment_not_inherited(self):
+        java = self.script('java-env', 'env\n')
+        executor = make_executor(FakeDockerClient(), use_docker=False, sandbox=self.sandbox, java_path=java)
+        with patch.dict(os.environ, {'SECRET_KEY': 'backend-secret', 'DATABASE_URL': 'postgresql://secret'}):
+            with tempfile.TemporaryDirectory() as code_dir:
+                outcome = {"exit_code": None, "timed_out": False, "error": None}
+                chunks = list(executor._subprocess_output_chunks(code_dir, 'Main', None, outcome))
+        environment = b''.join(data for name, data in chunks if name == 'stdout').decode()
+        self.assertNotIn('secret', environment)
+        self.assertIn('HOME=/tmp', environment.splitlines())
+
+
+class CompiledClassCacheTestCase(unittest.TestCase):
+    def test_lru_eviction_under_byte_budget(self):
+        cache = CompiledClassCache(10)
+        cache.put('a', {'A.class': b'12345'})
+        cache.put('b', {'B.class': b'12345'})
+        self.assertIsNotNone(cache.get('a'))
+        cache.put('c', {'C.class': b'12345'})
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+        stats = cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['bytes'], 10)
+
+    def test_oversized_entry_not_cached(self):
+        cache = CompiledClassCache(4)
+        cache.put('a', {'A.class': b'12345'})
+        self.assertIsNone(cache.get('a'))
+
+
+
+class FakeCompileServer:
+    """Python stand-in speaking the CompileServer.java wire format"""
+
+    def __init__(self, socket_dir, max_jobs):
+        self.socket_path = os.path.join(socket_dir, SOCKET_NAME)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.socket_path)
+        self.server.listen()
+        self.max_jobs = max_jobs
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        for _ in range(self.max_jobs):
+            conn, _ = self.server.accept()
+            with conn:
+                stream = conn.makefile('rb')
+                name = stream.read(struct.unpack('>i', stream.read(4))[0]).decode()
+                source = stream.read(struct.unpack('>i', stream.read(4))[0]).decode()
+                if 'hang' in source:
+                    time.sleep(0.5)
+                    continue
+                if 'slow' in source:
+                    reply = struct.pack('>i', 2) + self.pack('') + struct.pack('>i', 0)
+                elif 'error' in source:
+                    reply = struct.pack('>i', 1) + self.pack(f"{name}.java:1:5: error: ';' expected\n") + struct.pack('>i', 0)
+                else:
+                    body = b'\xca\xfe\xba\xbe'
+                    reply = (struct.pack('>i', 0) + self.pack('') + struct.pack('>i', 1)
+                             + self.pack(f'{name}.class') + struct.pack('>i', len(body)) + body)
+                conn.sendall(reply)
+        self.server.close()
+        os.unlink(self.socket_path)
+
+    def pack(self, value):
+        data = value.encode()
+        return struct.pack('>i', len(data)) + data
+
+    def alive(self):
+        return self.thread.is_alive()
+
+    def retire(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'unix domain sockets required')
+class CompileServerClientTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = CompileServerClient(max_jobs=2, threads=1, compile_timeout=5)
+        self.launches = 0
+
+        def launch():
+            self.launches += 1
+            socket_dir = tempfile.mkdtemp(prefix='codemaster-test-')
+            return FakeCompileServer(socket_dir, self.client.max_jobs), socket_dir
+        self.client._launch = launch
+
+    def tearDown(self):
+        self.client.shutdown()
+
+    def test_compile_returns_class_bytes(self):
+        result = self.client.compile('Main', 'class Main {}')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['classes'], {'Main.class': b'\xca\xfe\xba\xbe'})
+
+    def test_compile_errors_use_javac_layout(self):
+        result = self.client.compile('Main', 'class Main { error }')
+        self.assertFalse(result['success'])
+        self.assertIn("Main.java:1:5: error:", result['diagnostics'])
+
+    def test_server_recycled_after_max_jobs(self):
+        for _ in range(5):
+            self.assertTrue(self.client.compile('Main', 'class Main {}')['success'])
+        self.assertEqual(self.launches, 3)
+        self.assertEqual(self.client.stats()['restarts'], 2)
+
+    def test_server_timeout_retires_generation(self):
+        result = self.client.compile('Main', 'class Main { slow }')
+        self.assertTrue(result['timed_out'])
+        self.assertTrue(self.client.compile('Main', 'class Main {}')['success'])
+        self.assertEqual(self.launches, 2)
+        self.assertEqual(self.client.stats()['timeouts'], 1)
+
+    def test_unanswered_compile_falls_back_to_javac(self):
+        self.client.compile_timeout = 0.1
+        with patch('app.services.compile_server.RESPONSE_GRACE', 0.1):
+            self.assertIsNone(self.client.compile('Main', 'class Main { hang }'))
+        self.assertTrue(self.client.compile('Main', 'class Main {}')['success'])
+        self.assertEqual(self.launches, 2)
+
+    def test_unavailable_server_falls_back(self):
+        def broken_launch():
+            raise OSError('java not found')
+        self.client._launch = broken_launch
+        self.assertIsNone(self.client.compile('Main', 'class Main {}'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from unittest.mock import patch
+from app import create_app
+from app.services.metrics import MetricsRegistry, REGISTRY
+
+
+class MetricsRegistryTestCase(unittest.TestCase):
+    def test_counter_and_histogram_exposition(self):
+        registry = MetricsRegistry()
+        runs = registry.counter('runs_total', 'Runs', ['outcome'])
+        latency = registry.histogram('call_seconds', 'Call latency', ['call'], buckets=(0.1, 1.0))
+        runs.inc(outcome='success')
+        runs.inc(2, outcome='timeout')
+        latency.observe(0.05, call='start')
+        latency.observe(0.5, call='start')
+        text = registry.render()
+        self.assertIn('# TYPE runs_total counter', text)
+        self.assertIn('runs_total{outcome="timeout"} 2', text)
+        self.assertIn('call_seconds_bucket{call="start",le="0.1"} 1', text)
+        self.assertIn('call_seconds_bucket{call="start",le="1.0"} 2', text)
+        self.assertIn('call_seconds_bucket{call="start",le="+Inf"} 2', text)
+        self.assertIn('call_seconds_count{call="start"} 2', text)
+
+    def test_timer_observes_when_block_raises(self):
+        latency = MetricsRegistry().histogram('call_seconds', 'Call latency', ['call'])
+        with self.assertRaises(RuntimeError):
+            with latency.time(call='kill'):
+                raise RuntimeError('gone')
+        self.assertEqual(latency.count(call='kill'), 1)
+
+    def test_labels_must_match(self):
+        registry = MetricsRegistry()
+        runs = registry.counter('runs_total', 'Runs', ['outcome'])
+        with self.assertRaises(ValueError):
+            runs.inc(result='success')
+        with self.assertRaises(ValueError):
+            registry.gauge('runs_total', 'Runs', ['outcome'])
+        self.assertIs(registry.counter('runs_total', 'Runs', ['outcome']), runs)
+
+
+class MetricsEndpointTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+
+    def test_scrape_returns_prometheus_text(self):
+        REGISTRY.counter('codemaster_test_scrapes_total', 'Scrapes seen by the test').inc()
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        body = response.get_data(as_text=True)
+        self.assertIn('codemaster_test_scrapes_total 1', body)
+        self.assertIn('# TYPE codemaster_docker_call_seconds histogram', body)
+
+    def test_token_required_when_configured(self):
+        with patch('app.config.Config.METRICS_TOKEN', 'scrape-secret'):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            response = self.client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+            self.assertEqual(response.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.single_flight import SingleFlight
+
+
+class SingleFlightTestCase(unittest.TestCase):
+    def run_concurrently(self, flight, key, fn, callers):
+        results = [None] * callers
+        errors = [None] * callers
+
+        def call(index):
+            try:
+                results[index] = flight.do(key, fn)
+            except Exception as e:
+                errors[index] = e
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+        for thread in threads:
+            thread.start()
+        # Let every caller join the flight before the leader finishes
+        deadline = time.time() + 2
+        while flight.stats()['calls'] < callers and time.time() < deadline:
+            time.sleep(0.01)
+        self.release.set()
+        for thread in threads:
+            thread.join(timeout=2)
+        return results, errors
+
+    def setUp(self):
+        self.release = threading.Event()
+
+    def test_one_execution_serves_all_waiters(self):
+        flight = SingleFlight()
+        runs = []
+
+        def execute():
+            runs.append(1)
+            self.release.wait(2)
+            return {"output": "hi\n", "errors": []}
+
+        results, errors = self.run_concurrently(flight, 'key', execute, 5)
+        self.assertEqual(errors, [None] * 5)
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True, True])
+        # Every caller gets its own copy
+        results[0][0]["errors"].append("mutated")
+        self.assertTrue(all(result["errors"] == [] for result, _ in results[1:]))
+        stats = flight.stats()
+        self.assertEqual((stats['executions'], stats['coalesced'], stats['in_flight']), (1, 4, 0))
+
+    def test_error_reaches_every_waiter(self):
+        flight = SingleFlight()
+
+        def execute():
+            self.release.wait(2)
+            raise RuntimeError('sandbox down')
+
+        results, errors = self.run_concurrently(flight, 'key', execute, 3)
+        self.assertTrue(all(isinstance(error, RuntimeError) for error in errors))
+        self.assertEqual(flight.do('key', lambda: 'fresh'), ('fresh', False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,342 @@
+import unittest
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+import uuid
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import docker
+from unittest.mock import patch
+from app.asgi import create_asgi_app
+from app.services.job_queue import ExecutionJobQueue
+from app.services.terminal_sessions import TerminalSession, TerminalSessionManager
+from tests.fake_docker_engine import FakeDockerEngine
+
+# Sessions held open at once by the scale test; TERMINAL_SCALE_SESSIONS=5000 for the full run
+SCALE_SESSIONS = int(os.getenv('TERMINAL_SCALE_SESSIONS', 200))
+
+
+class AsgiWebSocket:
+    """Client end of one ASGI WebSocket connection to the app under test"""
+
+    def __init__(self, app, path, query=''):
+        self.to_app = asyncio.Queue()
+        self.from_app = asyncio.Queue()
+        scope = {'type': 'websocket', 'path': path, 'query_string': query.encode(), 'headers': []}
+        self.task = asyncio.ensure_future(app(scope, self.to_app.get, self.from_app.put))
+
+    async def connect(self):
+        await self.to_app.put({'type': 'websocket.connect'})
+        self.assertType(await self.receive(), 'websocket.accept')
+
+    async def send(self, text):
+        await self.to_app.put({'type': 'websocket.receive', 'text': text})
+
+    async def receive(self, timeout=5):
+        return await asyncio.wait_for(self.from_app.get(), timeout)
+
+    async def read_until(self, expected: bytes) -> bytes:
+        received = b''
+        while expected not in received:
+            message = await self.receive()
+            self.assertType(message, 'websocket.send')
+            received += message.get('bytes') or message['text'].encode()
+        return received
+
+    async def disconnect(self):
+        await self.to_app.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.task, 5)
+
+    @staticmethod
+    def assertType(message, expected):
+        if message['type'] != expected:
+            raise AssertionError(f"expected {expected}, got {message}")
+
+
+class SocketPairManager:
+    """TerminalSessionManager stand-in whose containers are socketpairs driven by the test's event loop"""
+    require_auth = False
+    reconnect_grace = 0
+
+    def __init__(self):
+        self.sessions = {}
+        self.attach_ends = {}
+        self.container_ends = {}
+        self.stopped = []
+        self.docker_client = self
+        self.containers = self
+
+    def add_session(self, output_limit=0):
+        session_id = uuid.uuid4().hex
+        self.sessions[session_id] = TerminalSession(session_id, session_id, '/tmp', None, output_limit=output_limit)
+        attach, container = socket.socketpair()
+        attach.setblocking(False)
+        self.attach_ends[session_id] = attach
+        self.container_ends[session_id] = container
+        return session_id
+
+    def get(self, container_id):
+        return type('Container', (), {'status': 'running'})()
+
+    def get_session(self, session_id):
+        return self.sessions.get(session_id)
+
+    def attach_socket(self, session_id):
+        return self.attach_ends[session_id]
+
+    def release_session(self, session_id, stop):
+        session = self.sessions.get(session_id)
+        if session and session.release(stop) and self.reconnect_grace <= 0:
+            self.stop_session(session_id)
+
+    def stop_session(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session:
+            session.active = False
+            session.end_connection()
+            self.attach_ends.pop(session_id).close()
+            self.stopped.append(session_id)
+            # Container removed: the program sees EOF (its event loop owns and closes the socket)
+            try:
+                self.container_ends.pop(session_id).shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass  # already gone: the program saw the attach end close first
+
+
+async def echo_container(sock):
+    """A program that echoes its stdin, on the event loop instead of in a container"""
+    reader, writer = await asyncio.open_connection(sock=sock)
+    try:
+        while True:
+            data = await reader.read(4096)
+            if not data:
+                return
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        writer.close()
+
+
+class TerminalGatewayTestCase(unittest.TestCase):
+    def setUp(self):
+        self.manager = SocketPairManager()
+        self.app = create_asgi_app('testing', terminal_manager=self.manager)
+        self.addCleanup(self.app.executor.shutdown)
+
+    def test_protocol_errors_match_flask_route(self):
+        async def scenario():
+            missing = AsgiWebSocket(self.app, '/ws/terminal')
+            await missing.connect()
+            self.assertEqual((await missing.receive())['text'], 'Missing sessionId')
+            self.assertEqual((await missing.receive())['type'], 'websocket.close')
+
+            invalid = AsgiWebSocket(self.app, '/ws/terminal', 'sessionId=nope')
+            await invalid.connect()
+            self.assertEqual((await invalid.receive())['text'], 'Session invalid')
+
+            jobs = AsgiWebSocket(self.app, '/ws/jobs')
+            await jobs.connect()
+            self.assertEqual(json.loads((await jobs.receive())['text']), {'error': 'Missing jobId'})
+        asyncio.run(scenario())
+
+    def test_http_requests_reach_flask(self):
+        async def scenario():
+            sent = []
+            requests = asyncio.Queue()
+            await requests.put({'type': 'http.request', 'body': b''})
+            scope = {'type': 'http', 'method': 'GET', 'path': '/api/health', 'query_string': b'',
+                     'headers': [(b'host', b'localhost')]}
+
+            async def send(message):
+                sent.append(message)
+            await self.app(scope, requests.get, send)
+            return sent
+        sent = asyncio.run(scenario())
+        self.assertEqual(sent[0]['status'], 200)
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertEqual(json.loads(body)['status'], 'healthy')
+        self.assertFalse(sent[-1].get('more_body'))
+
+    def test_job_watchers_hold_no_threads(self):
+        queue = ExecutionJobQueue(workers=1, max_pending=1, result_ttl=60)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        job = queue.submit(7, lambda: release.wait(30) and {'success': True})
+        owner = type('User', (), {'id': 7})()
+        watchers = self.app.executor._max_workers + 2
+
+        async def health():
+            sent = []
+            requests = asyncio.Queue()
+            await requests.put({'type': 'http.request', 'body': b''})
+            scope = {'type': 'http', 'method': 'GET', 'path': '/api/health', 'query_string': b'',
+                     'headers': [(b'host', b'localhost')]}
+
+            async def send(message):
+                sent.append(message)
+            await asyncio.wait_for(self.app(scope, requests.get, send), 2)
+            return sent[0]['status']
+
+        async def scenario():
+            sockets = [AsgiWebSocket(self.app, '/ws/jobs', f'jobId={job.job_id}&token=t') for _ in range(watchers)]
+            await asyncio.gather(*(ws.connect() for ws in sockets))
+            for ws in sockets:
+                self.assertIn(json.loads((await ws.receive())['text'])['status'], ('queued', 'running'))
+            # More watchers than pool threads, yet HTTP requests are still served
+            self.assertEqual(await health(), 200)
+            release.set()
+            for ws in sockets:
+                self.assertEqual(json.loads((await ws.receive())['text'])['status'], 'completed')
+                self.assertEqual((await ws.receive())['type'], 'websocket.close')
+        with patch('app.asgi.get_job_queue', return_value=queue), \
+                patch('app.asgi.resolve_token_user', return_value=owner):
+            asyncio.run(scenario())
+
+    def test_disconnect_stops_session(self):
+        session_id = self.manager.add_session()
+
+        async def scenario():
+            container = asyncio.ensure_future(echo_container(self.manager.container_ends[session_id]))
+            ws = AsgiWebSocket(self.app, '/ws/terminal', f'sessionId={session_id}')
+            await ws.connect()
+            await ws.send('hi\r')
+            self.assertEqual(await ws.read_until(b'hi\n'), b'hi\n')
+            await ws.disconnect()
+            await asyncio.wait_for(container, 5)
+        asyncio.run(scenario())
+        self.assertEqual(self.manager.stopped, [session_id])
+        self.assertEqual(self.app.terminal.active, 0)
+
+    def test_reconnect_resumes_from_offset(self):
+        self.manager.reconnect_grace = 60
+        session_id = self.manager.add_session()
+        container = self.manager.container_ends[session_id]
+
+        async def scenario():
+            first = AsgiWebSocket(self.app, '/ws/terminal', f'sessionId={session_id}')
+            await first.connect()
+            container.sendall(b'hello ')
+            self.assertEqual(await first.read_until(b'hello '), b'hello ')
+            await first.disconnect()
+            container.sendall(b'world')  # written while no client is connected
+
+            # The client got 3 bytes of 'hello ' before its connection dropped
+            second = AsgiWebSocket(self.app, '/ws/terminal', f'sessionId={session_id}&offset=3')
+            await second.connect()
+            self.assertEqual(await second.read_until(b'world'), b'lo world')
+            await second.disconnect()
+        asyncio.run(scenario())
+        self.assertEqual(self.manager.stopped, [])
+        self.assertEqual(self.manager.sessions[session_id].output.read(0), b'hello world')
+
+    def test_reconnect_takes_over_open_connection(self):
+        self.manager.reconnect_grace = 60
+        session_id = self.manager.add_session()
+
+        async def scenario():
+            container = asyncio.ensure_future(echo_container(self.manager.container_ends[session_id]))
+            first = AsgiWebSocket(self.app, '/ws/terminal', f'sessionId={session_id}')
+            await first.connect()
+            await first.send('a\r')
+            await first.read_until(b'a\n')
+
+            second = AsgiWebSocket(self.app, '/ws/terminal', f'sessionId={session_id}&offset=2')
+            await second.connect()
+            self.assertEqual((await first.receive())['type'], 'websocket.close')
+            await asyncio.wait_for(first.task, 5)
+            await second.send('b\r')
+            self.assertEqual(await second.read_until(b'b\n'), b'b\n')
+            self.assertEqual(self.app.terminal.active, 1)
+
+            self.manager.reconnect_grace = 0
+            await second.disconnect()
+            await asyncio.wait_for(container, 5)
+        asyncio.run(scenario())
+        self.assertEqual(self.manager.stopped, [session_id])
+
+    def test_output_limit_stops_session(self):
+        session_id = self.manager.add_session(output_limit=30)
+        self.manager.container_ends[session_id].sendall(b'z' * 100)
+
+        async def scenario():
+            ws = AsgiWebSocket(self.app, '/ws/terminal', f'sessionId={session_id}')
+            await ws.connect()
+            received = await ws.read_until(b'reached')
+            self.assertEqual((await ws.receive())['type'], 'websocket.close')
+            await asyncio.wait_for(ws.task, 5)
+            return received
+        received = asyncio.run(scenario())
+        self.assertTrue(received.startswith(b'z' * 30 + b'\r\n[Output limit of 30 bytes reached'))
+        self.assertEqual(self.manager.stopped, [session_id])
+
+    def test_sessions_share_one_event_loop(self):
+        session_ids = [self.manager.add_session() for _ in range(SCALE_SESSIONS)]
+        threads_before = threading.active_count()
+
+        async def scenario():
+            containers = [asyncio.ensure_future(echo_container(self.manager.container_ends[session_id]))
+                          for session_id in session_ids]
+            sockets = [AsgiWebSocket(self.app, '/ws/terminal', f'sessionId={session_id}')
+                       for session_id in session_ids]
+            await asyncio.gather(*(ws.connect() for ws in sockets))
+
+            async def round_trip(index, ws):
+                start = time.perf_counter()
+                await ws.send(f'line {index}\r')
+                await ws.read_until(f'line {index}\n'.encode())
+                return time.perf_counter() - start
+            latencies = await asyncio.gather(*(round_trip(index, ws) for index, ws in enumerate(sockets)))
+            # One keystroke while every other session sits idle
+            single = min([await round_trip(index, sockets[-1]) for index in range(20)])
+            # Every session open at once, yet only the setup thread pool exists
+            self.assertEqual(self.app.terminal.active, len(sockets))
+            threads_open = threading.active_count()
+            await asyncio.gather(*(ws.disconnect() for ws in sockets))
+            await asyncio.wait_for(asyncio.gather(*containers), 30)
+            return sorted(latencies), single, threads_open
+
+        latencies, single, threads_open = asyncio.run(scenario())
+        self.assertLessEqual(threads_open - threads_before, self.app.executor._max_workers)
+        self.assertEqual(len(self.manager.stopped), SCALE_SESSIONS)
+        self.assertEqual(self.app.terminal.active, 0)
+        if SCALE_SESSIONS > 200:
+            print(f"\n{SCALE_SESSIONS} sessions: burst echo median {statistics.median(latencies) * 1000:.1f} ms, "
+                  f"max {latencies[-1] * 1000:.1f} ms; idle echo {single * 1000:.2f} ms; threads {threads_open}")
+
+
+class TerminalGatewayEngineTestCase(unittest.TestCase):
+    code = ('public class Main { public static void main(String[] a) { '
+            'System.out.println("ready"); System.in.read(); } }')
+
+    def test_session_through_fake_engine(self):
+        engine = FakeDockerEngine().start()
+        self.addCleanup(engine.stop)
+        client = docker.DockerClient(base_url=engine.base_url)
+        with patch('app.services.terminal_sessions._create_docker_client', return_value=client):
+            manager = TerminalSessionManager()
+        manager.reconnect_grace = 0
+        app = create_asgi_app('testing', terminal_manager=manager)
+        self.addCleanup(app.executor.shutdown)
+        started = manager.start_session(self.code, None)
+        self.assertTrue(started['success'])
+
+        async def scenario():
+            ws = AsgiWebSocket(app, '/ws/terminal', f"sessionId={started['session_id']}")
+            await ws.connect()
+            self.assertEqual(await ws.read_until(b'ready\n'), b'ready\n')
+            await ws.send('hello\r')
+            self.assertEqual(await ws.read_until(b'hello\n'), b'hello\n')
+            await ws.disconnect()
+        asyncio.run(scenario())
+        self.assertIsNone(manager.get_session(started['session_id']))
+        self.assertEqual(engine.stats()['live'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
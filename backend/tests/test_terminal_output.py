@@ -0,0 +1,66 @@
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.metrics import TERMINAL_SESSIONS_REAPED_TOTAL
+from app.services.terminal_output import OutputRing
+from app.services.terminal_sessions import TerminalSession
+
+
+class OutputRingTestCase(unittest.TestCase):
+    def test_reads_from_offset(self):
+        ring = OutputRing(16)
+        ring.write(b'hello ')
+        ring.write(b'world')
+        self.assertEqual((ring.start, ring.end), (0, 11))
+        self.assertEqual(ring.read(0), b'hello world')
+        self.assertEqual(ring.read(6), b'world')
+        self.assertEqual(ring.read(11), b'')
+        self.assertEqual(ring.read_from(6), (b'world', 11))
+
+    def test_wraps_and_keeps_newest_bytes(self):
+        ring = OutputRing(8)
+        ring.write(b'abcdef')
+        ring.write(b'ghij')
+        self.assertEqual((ring.start, ring.end), (2, 10))
+        self.assertEqual(ring.read(0), b'cdefghij')
+        self.assertEqual(ring.read(7), b'hij')
+
+    def test_write_larger_than_capacity(self):
+        ring = OutputRing(4)
+        ring.write(b'x')
+        ring.write(b'0123456789')
+        self.assertEqual((ring.start, ring.end), (7, 11))
+        self.assertEqual(ring.read(0), b'6789')
+
+    def test_many_small_writes_match_stream(self):
+        ring = OutputRing(7)
+        stream = b''
+        for index in range(50):
+            chunk = bytes([65 + index % 26]) * (index % 5)
+            stream += chunk
+            ring.write(chunk)
+            self.assertEqual(ring.read(0), stream[-7:])
+        self.assertEqual(ring.end, len(stream))
+
+
+class SessionOutputLimitTestCase(unittest.TestCase):
+    def test_output_past_limit_truncated_with_notice(self):
+        session = TerminalSession('s', 'c', '/tmp', None, output_limit=10, buffer_size=256)
+        before = TERMINAL_SESSIONS_REAPED_TOTAL.value(reason='output_limit')
+        self.assertTrue(session.record_output(b'12345678'))
+        self.assertFalse(session.record_output(b'90abcdef'))
+        self.assertEqual(session.output_bytes, 10)
+        output = session.output.read(0)
+        self.assertTrue(output.startswith(b'1234567890\r\n[Output limit of 10 bytes reached'))
+        self.assertEqual(TERMINAL_SESSIONS_REAPED_TOTAL.value(reason='output_limit'), before + 1)
+
+    def test_no_limit(self):
+        session = TerminalSession('s', 'c', '/tmp', None, buffer_size=4)
+        self.assertTrue(session.record_output(b'x' * 1000))
+        self.assertEqual(session.output_bytes, 1000)
+        self.assertEqual(session.output.read(0), b'xxxx')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import unittest
+import os
+import socket
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from unittest.mock import patch
+from app.services.metrics import TERMINAL_SESSIONS_REAPED_TOTAL
+from app.services.terminal_sessions import TerminalSession, TerminalSessionManager
+
+
+class SlowRemoveClient:
+    """Docker client whose container removal takes `remove_delay` seconds"""
+
+    def __init__(self, remove_delay=0.0):
+        self.remove_delay = remove_delay
+        self.removed = []
+        self.api = None
+        self.containers = self
+        self._lock = threading.Lock()
+
+    def get(self, container_id):
+        client = self
+
+        class Container:
+            def remove(self, force=False):
+                time.sleep(client.remove_delay)
+                with client._lock:
+                    client.removed.append(container_id)
+        return Container()
+
+
+def make_manager(client, idle_timeout=60, max_runtime=60):
+    with patch('app.services.terminal_sessions._create_docker_client', return_value=client):
+        manager = TerminalSessionManager()
+    manager.idle_timeout = idle_timeout
+    manager.max_runtime = max_runtime
+    return manager
+
+
+def add_session(manager, name):
+    session = TerminalSession(name, f'container-{name}', '/nonexistent', None)
+    manager._add_session(session)
+    return session
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TerminalReaperTestCase(unittest.TestCase):
+    def test_idle_session_reaped_and_touch_defers_it(self):
+        client = SlowRemoveClient()
+        manager = make_manager(client, idle_timeout=0.3)
+        idle = add_session(manager, 'idle')
+        busy = add_session(manager, 'busy')
+        for _ in range(4):
+            time.sleep(0.1)
+            busy.touch()
+
+        self.assertEqual(client.removed, ['container-idle'])
+        self.assertFalse(idle.active)
+        self.assertIs(manager.get_session('busy'), busy)
+        self.assertTrue(wait_for(lambda: manager.get_session('busy') is None, timeout=2))
+        self.assertEqual(client.removed, ['container-idle', 'container-busy'])
+
+    def test_max_runtime_ignores_activity(self):
+        client = SlowRemoveClient()
+        manager = make_manager(client, idle_timeout=60, max_runtime=0.2)
+        before = TERMINAL_SESSIONS_REAPED_TOTAL.value(reason='max_runtime')
+        session = add_session(manager, 'long')
+        start = time.time()
+        while manager.get_session('long') and time.time() - start < 2:
+            session.touch()
+            time.sleep(0.02)
+        self.assertIsNone(manager.get_session('long'))
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(TERMINAL_SESSIONS_REAPED_TOTAL.value(reason='max_runtime'), before + 1)
+
+    def test_one_thread_for_all_sessions(self):
+        manager = make_manager(SlowRemoveClient())
+        # Compared by identity: threads left by earlier tests may still be exiting
+        threads_before = set(threading.enumerate())
+        for index in range(500):
+            add_session(manager, f's{index}')
+        self.assertEqual(len(set(threading.enumerate()) - threads_before), 1)
+        self.assertEqual(len(manager._deadlines), 500)
+
+    def test_earlier_deadline_wakes_reaper(self):
+        client = SlowRemoveClient()
+        manager = make_manager(client, idle_timeout=30)
+        add_session(manager, 'late')
+        time.sleep(0.05)  # reaper now waits ~30s for 'late'
+        manager.idle_timeout = 0.1
+        add_session(manager, 'early')
+        self.assertTrue(wait_for(lambda: manager.get_session('early') is None, timeout=1))
+        self.assertIsNotNone(manager.get_session('late'))
+
+    def test_disconnected_session_reaped_after_grace(self):
+        client = SlowRemoveClient()
+        manager = make_manager(client)
+        manager.reconnect_grace = 0.2
+        before = TERMINAL_SESSIONS_REAPED_TOTAL.value(reason='reconnect_grace')
+        left = add_session(manager, 'left')
+        returned = add_session(manager, 'returned')
+        for session in (left, returned):
+            stop = threading.Event().set
+            session.take_over(stop)
+            manager.release_session(session.session_id, stop)
+        returned.take_over(threading.Event().set)
+
+        self.assertTrue(wait_for(lambda: manager.get_session('left') is None, timeout=2))
+        time.sleep(0.2)
+        self.assertIs(manager.get_session('returned'), returned)
+        self.assertEqual(client.removed, ['container-left'])
+        self.assertEqual(TERMINAL_SESSIONS_REAPED_TOTAL.value(reason='reconnect_grace'), before + 1)
+
+    def test_no_grace_stops_on_disconnect(self):
+        client = SlowRemoveClient()
+        manager = make_manager(client)
+        manager.reconnect_grace = 0
+        session = add_session(manager, 'gone')
+        stop = threading.Event().set
+        session.take_over(stop)
+        manager.release_session('gone', lambda: None)  # a replaced connection: no effect
+        self.assertIs(manager.get_session('gone'), session)
+        manager.release_session('gone', stop)
+        self.assertIsNone(manager.get_session('gone'))
+        self.assertEqual(client.removed, ['container-gone'])
+
+    def test_batch_removed_in_parallel(self):
+        client = SlowRemoveClient(remove_delay=0.2)
+        manager = make_manager(client, idle_timeout=0.1)
+        for index in range(16):
+            add_session(manager, f's{index}')
+        start = time.time()
+        self.assertTrue(wait_for(lambda: len(client.removed) == 16))
+        # 16 removals of 0.2s each: 3.2s one at a time, ~0.4s on REAP_WORKERS threads
+        self.assertLess(time.time() - start, 1.5)
+        self.assertEqual(manager.sessions, {})
+
+
+class SlowAttachApi:
+    """Docker API client whose attach takes long enough for concurrent connects to overlap"""
+
+    def __init__(self):
+        self.opened = []
+
+    def attach_socket(self, container_id, params=None):
+        time.sleep(0.1)
+        attach, container = socket.socketpair()
+        self.opened.append((attach, container))
+        return attach
+
+
+class TerminalAttachTestCase(unittest.TestCase):
+    def test_concurrent_connects_share_one_stream(self):
+        manager = make_manager(SlowRemoveClient())
+        manager.api_client = api = SlowAttachApi()
+        add_session(manager, 'shared')
+        sockets = []
+        threads = [threading.Thread(target=lambda: sockets.append(manager.attach_socket('shared')))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(api.opened), 1)
+        self.assertEqual({id(sock) for sock in sockets}, {id(api.opened[0][0])})
+        manager.stop_session('shared')
+        self.assertEqual(api.opened[0][0].fileno(), -1)
+        api.opened[0][1].close()
+        self.assertIsNone(manager.attach_socket('shared'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -39,6 +39,8 @@ const TerminalComponent = ({ className, wsUrl, output, dataTestId }) => {
   const isUnmountingRef = useRef(false);
   const disableReconnectRef = useRef(false);
   const lastOutputRef = useRef('');
+  // Program output bytes received so far; a reconnect asks the server for the rest
+  const receivedBytesRef = useRef(0);
 
   const resolvedUrl = useMemo(() => resolveWebSocketUrl(wsUrl), [wsUrl]);
 
@@ -119,6 +121,7 @@ const TerminalComponent = ({ className, wsUrl, output, dataTestId }) => {
     }
     isUnmountingRef.current = false;
     disableReconnectRef.current = false;
+    receivedBytesRef.current = 0;
     const decoder = new TextDecoder('utf-8');
     const maskedUrl = resolvedUrl.replace(/token=[^&]+/, 'token=***');
     console.log('[Terminal] Connecting to WebSocket:', {
@@ -133,7 +136,11 @@ const TerminalComponent = ({ className, wsUrl, output, dataTestId }) => {
       if (reconnectTimerRef.current) {
         window.clearTimeout(reconnectTimerRef.current);
       }
-      const socket = new WebSocket(resolvedUrl);
+      const offset = receivedBytesRef.current;
+      const url = offset > 0
+        ? `${resolvedUrl}${resolvedUrl.includes('?') ? '&' : '?'}offset=${offset}`
+        : resolvedUrl;
+      const socket = new WebSocket(url);
       socket.binaryType = 'arraybuffer';
       socketRef.current = socket;
 
@@ -171,8 +178,10 @@ const TerminalComponent = ({ className, wsUrl, output, dataTestId }) => {
              terminalRef.current.write(event.data);
           }
         } else if (event.data instanceof ArrayBuffer) {
+          receivedBytesRef.current += event.data.byteLength;
           terminalRef.current.write(decoder.decode(event.data));
         } else if (event.data instanceof Blob) {
+          receivedBytesRef.current += event.data.size;
           event.data.arrayBuffer().then((buffer) => {
             if (terminalRef.current) {
               terminalRef.current.write(decoder.decode(buffer));